@@ -11,14 +11,145 @@ AI agents should call claude commands directly and use this for queries only.
 """
 
 import argparse
+import base64
+import ctypes
+import ctypes.util
+import gzip
+import heapq
+import io
 import json
+import re
+import sqlite3
 import sys
 import time
 import os
+import select
+import shutil
 import signal
-from datetime import datetime
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Set, Tuple
+
+DEFAULT_JOBS = os.cpu_count() or 1
+
+# Large buffered reads for forward scans of transcripts
+SCAN_BUFFER_SIZE = 1024 * 1024
+
+# Below this size json.loads is cheaper than probing a line
+PROBE_MIN_LINE = 4096
+
+# From this size message lines are decoded without their tool output bodies
+# (below it a full decode is as fast, even with orjson)
+LAZY_DECODE_MIN_LINE = 512 * 1024
+
+# Claude CLI version the conversation parser was tested with
+SUPPORTED_VERSION = "2.0.37"
+
+# Messages per page for show-conversation --page
+DEFAULT_PAGE_SIZE = 20
+
+# Seconds between checks when inotify is unavailable (and safety re-check interval otherwise)
+POLL_INTERVAL = 0.5
+WATCH_RECHECK_INTERVAL = 5.0
+
+# Grace period after a task looks ready, to catch immediate crashes
+STARTUP_SETTLE_SECONDS = 0.5
+
+# Transcripts indexed per batch (and commit) when updating the search index
+SEARCH_BATCH_FILES = 64
+
+# Estimated list prices in USD per million tokens (input, cache write, cache read, output),
+# the first pattern found in the model name wins; unknown models are reported without a cost.
+# Opus 3, 4 and 4.1 (claude-3-opus-*, claude-opus-4[-1][-date]) kept the old price
+MODEL_PRICES = (
+    (r'3-opus|opus-4(?:-1)?(?:-\d{8})?(?![-.]?\d)', (15.00, 18.75, 1.50, 75.00)),
+    (r'opus', (5.00, 6.25, 0.50, 25.00)),
+    ('sonnet', (3.00, 3.75, 0.30, 15.00)),
+    ('haiku-4', (1.00, 1.25, 0.10, 5.00)),
+    ('haiku', (0.80, 1.00, 0.08, 4.00)),
+)
+
+# Allowed lag between an event's timestamp and the file mtime when bounding keys by mtime
+MTIME_SLACK_SECONDS = 60
+
+# File timestamps come from a coarse kernel clock; list cursors start this much
+# before the scan so a write racing the scan is reported again rather than lost
+CURSOR_SLACK_NS = 1_000_000_000
+
+# Transcript file names: live sessions, and sessions compressed by archive
+TRANSCRIPT_SUFFIX = '.jsonl'
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
+
+# Optional fast JSON backends, preferred in this order when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# zstd for archived transcripts: the stdlib module (Python 3.14+) or the zstandard package
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _stdlib_dumps(obj, indent: bool = False) -> str:
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def _orjson_dumps(obj, indent: bool = False) -> str:
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+
+
+def available_json_backends() -> Dict[str, Tuple[Callable, Callable]]:
+    """Installed JSON backends as name -> (loads, dumps), fastest first."""
+    backends = {}
+    if orjson is not None:
+        backends['orjson'] = (orjson.loads, _orjson_dumps)
+    if simdjson is not None:
+        # pysimdjson only parses; encoding goes through the best other backend
+        backends['simdjson'] = (simdjson.loads, _orjson_dumps if orjson is not None else _stdlib_dumps)
+    backends['json'] = (json.loads, _stdlib_dumps)
+    return backends
+
+
+def select_json_backend(name: Optional[str] = None) -> str:
+    """
+    Bind json_loads/json_dumps to a backend.
+
+    Args:
+        name: Backend name (orjson, simdjson, json); defaults to the fastest installed one
+
+    Returns:
+        Name of the selected backend
+    """
+    global json_loads, json_dumps, JSON_BACKEND
+    backends = available_json_backends()
+    if name and name not in backends:
+        print(f"WARNING: JSON backend '{name}' is not installed, using {next(iter(backends))}", file=sys.stderr)
+        name = None
+    JSON_BACKEND = name or next(iter(backends))
+    json_loads, json_dumps = backends[JSON_BACKEND]
+    return JSON_BACKEND
+
+
+json_loads = json.loads
+json_dumps = _stdlib_dumps
+JSON_BACKEND = 'json'
+select_json_backend(os.environ.get('CLAUDE_HELPER_JSON'))
 
 
 def time_ago(timestamp_str: str) -> str:
@@ -63,332 +194,3169 @@ def time_ago(timestamp_str: str) -> str:
         return "unknown time ago"
 
 
-def escape_path(path: str) -> str:
-    """
-    Escape a filesystem path the way Claude does for project directories.
+def escape_path(path: str) -> str:
+    """
+    Escape a filesystem path the way Claude does for project directories.
+
+    Args:
+        path: Absolute path to escape
+
+    Returns:
+        Escaped path suitable for ~/.claude/projects/ lookup
+    """
+    # Convert /path/to/dir to -path-to-dir
+    if path.startswith('/'):
+        path = path[1:]  # Remove leading slash
+    return '-' + path.replace('/', '-')
+
+
+def transcript_session_id(name: str) -> Optional[str]:
+    """Session ID of a transcript file name (.jsonl, .jsonl.gz or .jsonl.zst), None for other files."""
+    for suffix in ('',) + COMPRESSED_SUFFIXES:
+        if name.endswith(TRANSCRIPT_SUFFIX + suffix):
+            return name[:len(name) - len(TRANSCRIPT_SUFFIX + suffix)]
+    return None
+
+
+def session_id_of(session_file: Path) -> str:
+    """Session ID of a transcript path."""
+    return transcript_session_id(session_file.name) or session_file.stem
+
+
+def is_compressed(session_file) -> bool:
+    """True for transcripts compressed by archive (read-only, never appended to)."""
+    return str(session_file).endswith(COMPRESSED_SUFFIXES)
+
+
+def open_session_file(session_file: Path, buffering: int = SCAN_BUFFER_SIZE):
+    """
+    Open a transcript for binary reading, decompressing .gz and .zst on the fly.
+
+    Compressed streams support forward seeks only (by decompressing up to
+    the offset), which is all the sequential readers need.
+
+    Raises:
+        OSError: If the file cannot be opened, or it is .zst and neither
+            compression.zstd nor the zstandard package is available
+    """
+    name = str(session_file)
+    if name.endswith('.gz'):
+        return gzip.open(session_file, 'rb')
+    if name.endswith('.zst'):
+        if zstd is not None:
+            return zstd.open(session_file, 'rb')
+        if zstandard is not None:
+            reader = zstandard.ZstdDecompressor().stream_reader(open(session_file, 'rb'), closefd=True)
+            return io.BufferedReader(reader, SCAN_BUFFER_SIZE)
+        raise OSError(f"{session_file}: reading .zst needs Python 3.14+ or the zstandard package")
+    return open(session_file, 'rb', buffering=buffering)
+
+
+def compress_transcript(session_file: Path, fmt: str = 'gz') -> Path:
+    """
+    Replace a transcript with a compressed copy that keeps its mtime.
+
+    The copy is written to a temporary name and renamed into place; the
+    original is only removed if it did not change while being compressed.
+
+    Args:
+        session_file: Plain .jsonl transcript
+        fmt: 'gz' or 'zst'
+
+    Returns:
+        Path of the compressed file
+
+    Raises:
+        OSError: If compression fails, zstd is unavailable or the file changed meanwhile
+    """
+    target = session_file.with_name(f"{session_file.name}.{fmt}")
+    tmp = session_file.with_name(f".{target.name}.{os.getpid()}.tmp")
+    before = session_file.stat()
+    try:
+        with open(session_file, 'rb') as src:
+            if fmt == 'gz':
+                dst = gzip.open(tmp, 'wb', compresslevel=6)
+            elif zstd is not None:
+                dst = zstd.open(tmp, 'wb')
+            elif zstandard is not None:
+                dst = zstandard.ZstdCompressor(level=10).stream_writer(open(tmp, 'wb'), closefd=True)
+            else:
+                raise OSError("writing .zst needs Python 3.14+ or the zstandard package")
+            with dst:
+                shutil.copyfileobj(src, dst, SCAN_BUFFER_SIZE)
+        after = session_file.stat()
+        if (after.st_ino, after.st_size, after.st_mtime_ns) != (before.st_ino, before.st_size, before.st_mtime_ns):
+            raise OSError(f"{session_file} changed while being compressed")
+        os.utime(tmp, ns=(before.st_atime_ns, before.st_mtime_ns))
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    session_file.unlink()
+    return target
+
+
+def get_cache_dir() -> Path:
+    """Directory for helper-owned caches (honours XDG_CACHE_HOME)."""
+    base = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / ".cache")
+    return Path(base) / "claude-helper"
+
+
+def run_parallel(func: Callable, items: List, jobs: int = 1, use_processes: bool = False) -> List:
+    """
+    Apply func to every item on a worker pool, preserving input order.
+
+    Threads suit I/O-bound work such as head/tail reads; processes suit
+    JSON-heavy full scans that would otherwise serialize on the GIL.
+    With a single job (or item) everything runs inline.
+
+    Args:
+        func: Module-level callable (must be picklable for processes)
+        items: Work items
+        jobs: Maximum number of workers
+        use_processes: Use a process pool instead of a thread pool
+
+    Returns:
+        List of results in the same order as items
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    workers = min(jobs, len(items))
+    if use_processes:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items, chunksize=max(1, len(items) // (workers * 4))))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def imap_parallel(func: Callable, items: List, jobs: int = 1, use_processes: bool = False):
+    """
+    Lazily apply func to every item on a worker pool, yielding results in input order.
+
+    Like run_parallel, but each result is yielded as soon as it and all
+    earlier ones are done, so callers can stream output. Work not yet started
+    is cancelled if the caller stops iterating early.
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    workers = min(jobs, len(items))
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    executor = executor_class(max_workers=workers)
+    try:
+        futures = [executor.submit(func, item) for item in items]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_lines_reverse(path: Path, block_size: int = 64 * 1024):
+    """
+    Yield non-empty lines of a file from the last to the first.
+
+    Reads fixed-size blocks backwards from EOF, so stopping early costs only
+    the size of the tail that was consumed.
+
+    Args:
+        path: File to read
+        block_size: Bytes to read per seek
+
+    Yields:
+        Raw lines (bytes, without the trailing newline)
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        # Chunks of the line being assembled, rightmost first
+        pending = []
+        while pos > 0:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            block = f.read(read_size)
+
+            nl = block.rfind(b'\n')
+            if nl == -1:
+                pending.append(block)
+                continue
+
+            pending.append(block[nl + 1:])
+            line = b''.join(reversed(pending))
+            if line:
+                yield line
+
+            segments = block[:nl].split(b'\n')
+            for segment in reversed(segments[1:]):
+                if segment:
+                    yield segment
+            pending = [segments[0]]
+
+        line = b''.join(reversed(pending))
+        if line:
+            yield line
+
+
+# One flat "key": scalar pair followed by its separator
+_FLAT_PAIR_RE = re.compile(
+    rb'\s*"([^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*"|true|false|null|-?[0-9][0-9.eE+-]*)\s*([,}])'
+)
+
+
+def _string_start(line: bytes, close: int) -> int:
+    """Index of the opening quote of the JSON string whose closing quote is at `close` (-1 if none)."""
+    end = close
+    while True:
+        quote = line.rfind(b'"', 0, end)
+        if quote < 0:
+            return -1
+        backslashes = 0
+        while quote - backslashes - 1 >= 0 and line[quote - backslashes - 1] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return quote
+        end = quote
+
+
+def probe_event(line: bytes, keys: Optional[Tuple[str, ...]] = None) -> Dict:
+    """
+    Read flat top-level scalar fields from both ends of a JSON line without decoding it.
+
+    Walks "key": scalar pairs forward from the opening brace and backward from the
+    closing brace, stopping at the first object/array value on each side. Large
+    nested payloads (message bodies, tool results) are never touched, so the cost
+    does not depend on line length. Keys that sit between two containers are not
+    reported; callers fall back to json.loads when a needed key is missing.
+
+    Args:
+        line: One raw transcript line
+        keys: Only decode these keys and stop once all are found (default: all)
+
+    Returns:
+        Dict of the top-level scalar fields that could be read (empty if the line
+        does not look like a complete JSON object)
+    """
+    fields = {}
+    stripped = line.strip()
+    if len(stripped) < 2 or stripped[0] != 0x7B or stripped[-1] != 0x7D:
+        return fields
+    wanted = len(keys) if keys else -1
+
+    # Forward from '{'
+    pos = 1
+    while True:
+        match = _FLAT_PAIR_RE.match(stripped, pos)
+        if not match:
+            break
+        key = match.group(1).decode()
+        if keys is None or key in keys:
+            try:
+                fields[key] = json_loads(match.group(2))
+            except ValueError:
+                return fields
+            if len(fields) == wanted:
+                return fields
+        if match.group(3) == b'}':
+            return fields
+        pos = match.end()
+
+    # Backward from '}'
+    pos = len(stripped) - 2
+    while pos > 0:
+        while stripped[pos] in b' \t\r\n':
+            pos -= 1
+        if stripped[pos] == 0x22:
+            start = _string_start(stripped, pos)
+        elif stripped[pos] in b'}]':
+            break
+        else:
+            start = stripped.rfind(b':', 0, pos) + 1
+        if start <= 0:
+            break
+        value = stripped[start:pos + 1]
+
+        colon = start - 1
+        while colon > 0 and stripped[colon] != 0x3A:
+            if stripped[colon] not in b' \t\r\n':
+                return fields
+            colon -= 1
+        key_end = colon - 1
+        while key_end > 0 and stripped[key_end] in b' \t\r\n':
+            key_end -= 1
+        if stripped[key_end] != 0x22:
+            break
+        key_start = _string_start(stripped, key_end)
+        if key_start <= 0:
+            break
+        key = stripped[key_start + 1:key_end].decode()
+        if (keys is None or key in keys) and key not in fields:
+            try:
+                fields[key] = json_loads(value)
+            except ValueError:
+                break
+            if len(fields) == wanted:
+                return fields
+
+        pos = key_start - 1
+        while pos > 0 and stripped[pos] in b' \t\r\n':
+            pos -= 1
+        if stripped[pos] != 0x2C:
+            break
+        pos -= 1
+
+    return fields
+
+
+def event_type_of(line: bytes) -> Optional[str]:
+    """
+    Top-level event type of a transcript line, decoding the line only when needed.
+
+    Lines that contain neither "user" nor "assistant" as a JSON string are
+    rejected by a substring check; the rest are resolved with probe_event and
+    only fall back to json.loads when the probe cannot see the type.
+
+    Returns:
+        'user', 'assistant', another type string, or None for other/invalid lines
+    """
+    if b'"user"' not in line and b'"assistant"' not in line:
+        return None
+    event_type = probe_event(line, ('type',)).get('type') if len(line) >= PROBE_MIN_LINE else None
+    if event_type is None:
+        try:
+            event_type = json_loads(line).get('type')
+        except:
+            return None
+    return event_type
+
+
+def may_be_malformed(line: bytes) -> bool:
+    """
+    True if a line event_type_of returned None for may not be valid JSON.
+
+    event_type_of answers None both for lines that are no message and for
+    lines it could not decode. Lines that are not a complete JSON object, or
+    that mention "user"/"assistant" yet have no type event_type_of could
+    read, may be malformed and are worth decoding to find out.
+    """
+    if not line.strip():
+        return False
+    if not line.lstrip().startswith(b'{') or not line.endswith((b'}', b'}\n', b'}\r\n')):
+        return True
+    return b'"user"' in line or b'"assistant"' in line
+
+
+def read_last_user_timestamp(session_file: Path) -> Optional[str]:
+    """Return the timestamp of the last user event, reading the file from its end."""
+    try:
+        for line in iter_lines_reverse(session_file):
+            if event_type_of(line) != 'user':
+                continue
+            fields = probe_event(line, ('timestamp',))
+            if 'timestamp' in fields:
+                return fields['timestamp']
+            try:
+                return json_loads(line).get('timestamp')
+            except:
+                continue
+    except:
+        pass
+    return None
+
+
+def read_first_timestamp(session_file: Path) -> Optional[str]:
+    """Return the timestamp of the first event that has one."""
+    try:
+        with open_session_file(session_file, buffering=-1) as f:
+            for line in f:
+                fields = probe_event(line, ('timestamp',))
+                if fields.get('timestamp'):
+                    return fields['timestamp']
+                try:
+                    timestamp = json_loads(line).get('timestamp')
+                except:
+                    continue
+                if timestamp:
+                    return timestamp
+    except:
+        pass
+    return None
+
+
+def scan_session_file(session_file: Path) -> Dict:
+    """
+    Extract all per-file session metadata in a single streaming pass.
+
+    The file is read in binary with large buffers. Lines are classified with
+    event_type_of, so most assistant and tool_result payloads are never decoded;
+    full json.loads is only used for the few head lines that carry the first
+    timestamp, cwd and first prompt, and for the last user event.
+
+    Args:
+        session_file: Path to the session .jsonl file
+
+    Returns:
+        Dict with first_timestamp, last_user_timestamp, cwd, first_prompt,
+        event_count, user_count and assistant_count
+    """
+    first_user_msg = None
+    timestamp = None
+    last_user_line = None
+    session_cwd = None
+    event_count = 0
+    user_count = 0
+    assistant_count = 0
+
+    with open_session_file(session_file) as f:
+        for line in f:
+            event_count += 1
+            event_type = event_type_of(line)
+
+            # Count event types
+            if event_type == 'user':
+                user_count += 1
+                last_user_line = line
+            elif event_type == 'assistant':
+                assistant_count += 1
+
+            needs_head = not timestamp or not session_cwd
+            needs_prompt = not first_user_msg and event_type == 'user'
+            if not needs_head and not needs_prompt:
+                continue
+
+            if needs_head and not needs_prompt:
+                fields = probe_event(line, ('timestamp', 'cwd'))
+                if not timestamp and fields.get('timestamp'):
+                    timestamp = fields['timestamp']
+                if not session_cwd and fields.get('cwd'):
+                    session_cwd = fields['cwd']
+                if timestamp and session_cwd:
+                    continue
+
+            try:
+                event = json_loads(line)
+            except:
+                continue
+            if not isinstance(event, dict):
+                continue
+
+            # Get first timestamp
+            if not timestamp:
+                timestamp = event.get('timestamp')
+
+            # Get cwd
+            if not session_cwd:
+                session_cwd = event.get('cwd')
+
+            # Get first user message (not meta)
+            if needs_prompt and not event.get('isMeta'):
+                msg = event.get('message', {})
+                content = msg.get('content', '')
+                if isinstance(content, str) and content:
+                    first_user_msg = content.strip()[:200]
+                elif isinstance(content, list) and content:
+                    for item in content:
+                        if isinstance(item, dict) and item.get('type') == 'text':
+                            first_user_msg = item.get('text', '').strip()[:200]
+                            break
+
+    last_user_ts = None
+    if last_user_line is not None:
+        fields = probe_event(last_user_line, ('timestamp',))
+        if 'timestamp' in fields:
+            last_user_ts = fields['timestamp']
+        else:
+            try:
+                last_user_ts = json_loads(last_user_line).get('timestamp')
+            except:
+                pass
+
+    return {
+        'first_timestamp': timestamp,
+        'last_user_timestamp': last_user_ts,
+        'cwd': session_cwd,
+        'first_prompt': first_user_msg,
+        'event_count': event_count,
+        'user_count': user_count,
+        'assistant_count': assistant_count,
+    }
+
+
+def _full_scan_job(path: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """Worker entry point: full metadata scan, returning (metadata, error)."""
+    try:
+        return scan_session_file(Path(path)), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _ranking_scan_job(path: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """Worker entry point: head/tail probe for ranking fields, returning (metadata, error)."""
+    session_file = Path(path)
+    if is_compressed(session_file):
+        # No reading from the end of a compressed stream; archived files are scanned once
+        return _full_scan_job(path)
+    return {
+        'first_timestamp': read_first_timestamp(session_file),
+        'last_user_timestamp': read_last_user_timestamp(session_file),
+        'cwd': None,
+        'first_prompt': None,
+        'event_count': None,
+        'user_count': None,
+        'assistant_count': None,
+    }, None
+
+
+def extract_search_rows(session_file: Path, offset: int = 0) -> Tuple[List[Tuple[str, str, str, str]], int]:
+    """
+    Searchable messages in a transcript from byte offset on.
+
+    Only complete lines are read, so an append in progress is picked up by
+    the next call starting at the returned offset.
+
+    Args:
+        session_file: Transcript to read
+        offset: Line-aligned byte offset to start at
+
+    Returns:
+        ([(timestamp, role, text, tool names)], offset after the last complete line)
+    """
+    rows = []
+    pos = offset
+    with open_session_file(session_file) as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            pos += len(line)
+            if not is_message_line(line):
+                continue
+            try:
+                message = parse_message(decode_message_line(line))
+            except Exception:
+                continue
+            if message is None:
+                continue
+            tools = ' '.join(tool['name'] for tool in message['tool_uses'])
+            if message['text'] or tools:
+                rows.append((message['timestamp'], message['type'], message['text'], tools))
+    return rows, pos
+
+
+def _search_scan_job(item: Tuple[str, int]) -> Tuple[Optional[List], int, Optional[str]]:
+    """Worker entry point: extract searchable rows, returning (rows, new offset, error)."""
+    path, offset = item
+    try:
+        rows, pos = extract_search_rows(Path(path), offset)
+        return rows, pos, None
+    except Exception as e:
+        return None, offset, str(e)
+
+
+# --where FIELD=VALUE, FIELD!=VALUE or FIELD~REGEX
+_WHERE_RE = re.compile(r'^([A-Za-z0-9_.]+)(!=|=|~)(.*)$', re.DOTALL)
+
+# Shorthand first path components that select message.content items by type
+CONTENT_ALIASES = ('tool_use', 'tool_result', 'text', 'thinking')
+
+
+def parse_where(expression: str) -> Tuple[Tuple[str, ...], str, str]:
+    """
+    Split a --where expression into (field path, operator, value).
+
+    Raises:
+        ValueError: If the expression is not FIELD=VALUE, FIELD!=VALUE or FIELD~REGEX
+    """
+    match = _WHERE_RE.match(expression)
+    if not match:
+        raise ValueError(f"Invalid --where '{expression}' (expected FIELD=VALUE, FIELD!=VALUE or FIELD~REGEX)")
+    field, op, value = match.groups()
+    if op == '~':
+        re.compile(value)
+    return tuple(field.split('.')), op, value
+
+
+def parse_time_bound(value: str) -> Tuple[str, float]:
+    """
+    Resolve a --since/--until value to (ISO timestamp, epoch seconds).
+
+    Accepts relative ages (30m, 12h, 7d, 2w) or ISO timestamps/dates in UTC.
+
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    match = re.fullmatch(r'(\d+)([smhdw])', value.strip())
+    if match:
+        unit = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}[match.group(2)]
+        moment = datetime.now(timezone.utc) - timedelta(**{unit: int(match.group(1))})
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z", moment.timestamp()
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}' (use e.g. 2d, 12h, 2025-11-10 or 2025-11-10T12:00:00Z)")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return value, moment.timestamp()
+
+
+def new_list_cursor() -> str:
+    """
+    Opaque cursor for list --since-cursor, taken before the listing it belongs to.
+
+    Encodes a modification-time watermark: a later listing with this cursor
+    reports every transcript whose mtime is at or after it.
+    """
+    watermark = time.time_ns() - CURSOR_SLACK_NS
+    return base64.urlsafe_b64encode(json.dumps({'v': 1, 'mtime_ns': watermark}).encode()).decode().rstrip('=')
+
+
+def parse_list_cursor(cursor: str) -> int:
+    """
+    Watermark (mtime in ns) of a cursor made by new_list_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if data.get('v') != 1:
+            raise ValueError
+        return int(data['mtime_ns'])
+    except Exception:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def resolve_field(event: Dict, path: Tuple[str, ...]) -> List:
+    """
+    All values at a dotted path in an event.
+
+    Lists are searched element-wise, so message.content.type yields the type
+    of every content item. A leading tool_use, tool_result, text or thinking
+    selects the message.content items of that type (tool_use.name).
+    """
+    if path[0] in CONTENT_ALIASES:
+        message = event.get('message')
+        content = message.get('content') if isinstance(message, dict) else None
+        nodes = [item for item in content if isinstance(item, dict) and item.get('type') == path[0]] \
+            if isinstance(content, list) else []
+        path = path[1:]
+    elif path == ('session_id',) and 'session_id' not in event:
+        return [event['sessionId']] if 'sessionId' in event else []
+    else:
+        nodes = [event]
+
+    for part in path:
+        found = []
+        for node in nodes:
+            if isinstance(node, dict) and part in node:
+                value = node[part]
+                if isinstance(value, list):
+                    found.extend(value)
+                else:
+                    found.append(value)
+        nodes = found
+    return nodes
+
+
+def _field_text(value) -> str:
+    """Comparison form of a field value: strings as-is, everything else as compact JSON."""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def event_matches(event: Dict, predicates: List[Tuple[Tuple[str, ...], str, str]]) -> bool:
+    """True if the event satisfies every (path, op, value) predicate."""
+    for path, op, value in predicates:
+        texts = [_field_text(found) for found in resolve_field(event, path)]
+        if op == '=':
+            if value not in texts:
+                return False
+        elif op == '!=':
+            if value in texts:
+                return False
+        elif not any(re.search(value, text) for text in texts):
+            return False
+    return True
+
+
+def query_needles(predicates: List[Tuple[Tuple[str, ...], str, str]]) -> List[bytes]:
+    """
+    Byte strings every matching line must contain.
+
+    An equality on a string field can only hold if the JSON-encoded string
+    occurs in the raw line, so lines without it are skipped before json.loads.
+    """
+    needles = []
+    for path, op, value in predicates:
+        if op == '=' and path != ('session_id',):
+            needles.append(json.dumps(value, ensure_ascii=False).encode())
+            if value in ('true', 'false', 'null') or re.fullmatch(r'-?[0-9][0-9.eE+-]*', value):
+                # Could also be a JSON literal; fall back to the bare token
+                needles[-1] = value.encode()
+    return needles
+
+
+def query_session_file(session_file: Path, predicates: List, since: Optional[str] = None,
+                       until: Optional[str] = None, fields: Optional[List[str]] = None) -> List[str]:
+    """
+    Matching events of one transcript as NDJSON lines.
+
+    Args:
+        session_file: Transcript to scan
+        predicates: Parsed --where predicates
+        since: Only events with timestamp >= since (ISO)
+        until: Only events with timestamp <= until (ISO, compared at its precision)
+        fields: Dotted paths to project (default: the whole event)
+
+    Returns:
+        Output lines (without newlines)
+    """
+    needles = query_needles(predicates)
+    paths = [tuple(field.split('.')) for field in fields] if fields else None
+    output = []
+    with open_session_file(session_file) as f:
+        for line in f:
+            if any(needle not in line for needle in needles):
+                continue
+            try:
+                event = json_loads(line)
+            except Exception:
+                continue
+            if not isinstance(event, dict):
+                continue
+            if since or until:
+                timestamp = event.get('timestamp')
+                if not isinstance(timestamp, str):
+                    continue
+                if since and timestamp < since:
+                    continue
+                if until and timestamp[:len(until)] > until:
+                    continue
+            if predicates and not event_matches(event, predicates):
+                continue
+
+            if paths is None:
+                output.append(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+                continue
+            if 'session_id' not in event:
+                event['session_id'] = event.get('sessionId', session_id_of(session_file))
+            projected = {}
+            for field, path in zip(fields, paths):
+                values = resolve_field(event, path)
+                projected[field] = values[0] if len(values) == 1 else (values or None)
+            output.append(json_dumps(projected))
+    return output
+
+
+def _query_job(item: Tuple) -> Tuple[Optional[List[str]], Optional[str]]:
+    """Worker entry point: query one transcript, returning (lines, error)."""
+    path, predicates, since, until, fields = item
+    try:
+        return query_session_file(Path(path), predicates, since, until, fields), None
+    except Exception as e:
+        return None, str(e)
+
+
+# Token counters of message.usage, in the order they are stored
+USAGE_FIELDS = ('input_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens', 'output_tokens')
+
+# Assistant message head: "message":{"model":"...","id":"..."
+_MESSAGE_HEAD_RE = re.compile(rb'"message":\{"model":"([^"\\]*)","id":"([^"\\]*)"')
+
+
+def read_usage(line: bytes) -> Optional[Tuple[str, str, Tuple[int, ...], str, Optional[str]]]:
+    """
+    Token usage of an assistant transcript line.
+
+    Long lines are not decoded: the message head, the flat counters at the
+    start of the usage object and the event's flat fields are read directly,
+    with json.loads as the fallback when the layout is unexpected.
+
+    Returns:
+        (message id, model, counts in USAGE_FIELDS order, timestamp, cwd), or
+        None if the line is not an assistant event with usage
+    """
+    if len(line) >= PROBE_MIN_LINE:
+        head = _MESSAGE_HEAD_RE.search(line, 0, PROBE_MIN_LINE)
+        start = line.rfind(b'"usage":{')
+        if head and start >= 0:
+            counters = {}
+            pos = start + len(b'"usage":{')
+            while True:
+                match = _FLAT_PAIR_RE.match(line, pos)
+                if not match:
+                    break
+                counters[match.group(1).decode()] = match.group(2)
+                if match.group(3) == b'}':
+                    break
+                pos = match.end()
+            fields = probe_event(line, ('type', 'timestamp', 'cwd'))
+            if all(key in counters for key in USAGE_FIELDS) and 'timestamp' in fields:
+                if fields.get('type') != 'assistant':
+                    return None
+                try:
+                    counts = tuple(int(counters[key]) for key in USAGE_FIELDS)
+                except ValueError:
+                    counts = None
+                if counts is not None:
+                    return head.group(2).decode(), head.group(1).decode(), counts, fields['timestamp'], fields.get('cwd')
+
+    try:
+        event = json_loads(line)
+    except Exception:
+        return None
+    message = event.get('message')
+    if event.get('type') != 'assistant' or not isinstance(message, dict):
+        return None
+    usage = message.get('usage')
+    if not isinstance(usage, dict):
+        return None
+    counts = tuple(int(usage.get(key) or 0) for key in USAGE_FIELDS)
+    return message.get('id') or '', message.get('model') or 'unknown', counts, event.get('timestamp') or '', event.get('cwd')
+
+
+def extract_usage(session_file: Path, offset: int = 0, last_message_id: Optional[str] = None) -> Tuple[Dict, int, Optional[str], Optional[str]]:
+    """
+    Sum token usage per (day, model) over a transcript from byte offset on.
+
+    Claude writes one assistant event per content block and repeats the
+    message's usage on each, so every message ID is counted once.
+
+    Args:
+        session_file: Transcript to read
+        offset: Line-aligned byte offset to start at
+        last_message_id: Last message ID counted before offset
+
+    Returns:
+        ({(day, model): [messages, *counts]}, offset after the last complete
+        line, last message ID counted, first cwd seen)
+    """
+    totals = {}
+    seen = {last_message_id} if last_message_id else set()
+    cwd = None
+    pos = offset
+    with open_session_file(session_file) as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            pos += len(line)
+            if b'"usage"' not in line or b'"assistant"' not in line:
+                continue
+            usage = read_usage(line)
+            if usage is None:
+                continue
+            message_id, model, counts, timestamp, line_cwd = usage
+            cwd = cwd or line_cwd
+            if message_id in seen:
+                continue
+            if message_id:
+                seen.add(message_id)
+                last_message_id = message_id
+            row = totals.setdefault((timestamp[:10], model), [0] * (len(USAGE_FIELDS) + 1))
+            row[0] += 1
+            for i, count in enumerate(counts, 1):
+                row[i] += count
+    return totals, pos, last_message_id, cwd
+
+
+def _usage_scan_job(item: Tuple[str, int, Optional[str]]) -> Tuple[Optional[Tuple], Optional[str]]:
+    """Worker entry point: extract usage totals, returning (result, error)."""
+    path, offset, last_message_id = item
+    try:
+        return extract_usage(Path(path), offset, last_message_id), None
+    except Exception as e:
+        return None, str(e)
+
+
+def estimate_cost(model: str, counts: Tuple[int, ...]) -> Optional[float]:
+    """Estimated USD cost of token counts (USAGE_FIELDS order) at MODEL_PRICES, None if unpriced."""
+    for pattern, prices in MODEL_PRICES:
+        if re.search(pattern, model):
+            return sum(count * price for count, price in zip(counts, prices)) / 1e6
+    return None
+
+
+def parse_timestamp(timestamp: str) -> Optional[float]:
+    """Epoch seconds of an ISO transcript timestamp, None if it cannot be parsed."""
+    try:
+        moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def extract_tool_calls(session_file: Path, since: Optional[str] = None) -> List[Tuple[str, Optional[float], bool]]:
+    """
+    Pair every tool_use in a transcript with its tool_result.
+
+    Latency is the wall-clock gap between the assistant event carrying the
+    tool_use and the user event carrying the result with the same ID.
+
+    Args:
+        session_file: Transcript to read
+        since: Ignore tool calls issued before this ISO timestamp
+
+    Returns:
+        [(tool name, latency in seconds or None if no result yet, is_error)]
+        in the order the calls were issued
+    """
+    calls = {}
+    with open_session_file(session_file) as f:
+        for line in f:
+            if b'"tool_use"' not in line and b'"tool_result"' not in line:
+                continue
+            if event_type_of(line) not in ('user', 'assistant'):
+                continue
+            try:
+                message = parse_message(decode_message_line(line))
+            except Exception:
+                continue
+            if message is None:
+                continue
+            timestamp = message['timestamp']
+            for tool_use in message['tool_uses']:
+                if since and timestamp < since:
+                    continue
+                calls[tool_use['id']] = [tool_use['name'], parse_timestamp(timestamp), None, False]
+            for tool_result in message['tool_results']:
+                call = calls.get(tool_result['tool_use_id'])
+                if call is None or call[2] is not None:
+                    continue
+                finished = parse_timestamp(timestamp)
+                if call[1] is not None and finished is not None:
+                    call[2] = max(0.0, finished - call[1])
+                call[3] = bool(tool_result['is_error'])
+    return [(name, latency, is_error) for name, _, latency, is_error in calls.values()]
+
+
+def _tool_calls_job(item: Tuple[str, Optional[str]]) -> Tuple[Optional[List], Optional[str]]:
+    """Worker entry point: pair tool calls of one transcript, returning (calls, error)."""
+    path, since = item
+    try:
+        return extract_tool_calls(Path(path), since), None
+    except Exception as e:
+        return None, str(e)
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize_tool_calls(calls: List[Tuple[str, Optional[float], bool]]) -> List[Dict]:
+    """
+    Per-tool call counts, error rate and latency percentiles.
+
+    Returns:
+        One dict per tool, slowest p95 first
+    """
+    by_tool = {}
+    for name, latency, is_error in calls:
+        by_tool.setdefault(name, []).append((latency, is_error))
+
+    stats = []
+    for name, entries in by_tool.items():
+        latencies = sorted(latency for latency, _ in entries if latency is not None)
+        completed = len(latencies)
+        errors = sum(1 for latency, is_error in entries if latency is not None and is_error)
+        p50, p95 = percentile(latencies, 50), percentile(latencies, 95)
+        stats.append({
+            'tool': name,
+            'calls': len(entries),
+            'completed': completed,
+            'errors': errors,
+            'error_rate': round(errors / completed, 4) if completed else None,
+            'p50_s': round(p50, 3) if p50 is not None else None,
+            'p95_s': round(p95, 3) if p95 is not None else None,
+            'max_s': round(latencies[-1], 3) if latencies else None,
+            'total_s': round(sum(latencies), 3),
+        })
+    stats.sort(key=lambda row: (row['p95_s'] or 0, row['calls']), reverse=True)
+    return stats
+
+
+def iter_session_messages(session_file: Path, since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Lazily yield the messages of one transcript for a merged timeline.
+
+    Only one line is held at a time, so merging many sessions keeps memory
+    proportional to the number of sessions, not their size.
+
+    Yields:
+        (timestamp, session ID, message) for messages inside [since, until]
+    """
+    session_id = session_id_of(session_file)
+    with open_session_file(session_file) as f:
+        for line in f:
+            if event_type_of(line) not in ('user', 'assistant'):
+                continue
+            try:
+                message = parse_message(decode_message_line(line))
+            except Exception:
+                continue
+            if message is None or not message['timestamp']:
+                continue
+            timestamp = message['timestamp']
+            if since and timestamp < since:
+                continue
+            if until and timestamp[:len(until)] > until:
+                # Transcripts are appended in time order, so nothing later can qualify
+                return
+            yield timestamp, session_id, message
+
+
+def benchmark_json(paths: List[Path], max_mb: int = 256) -> List[Dict]:
+    """
+    Measure transcript decode throughput of every installed JSON backend.
+
+    Lines are loaded into memory first so only decoding is timed.
+
+    Args:
+        paths: Transcript files to sample, in order
+        max_mb: Stop sampling after this many megabytes
+
+    Returns:
+        One result dict per backend (bytes, lines, seconds, mb_per_s, seconds_per_gb)
+    """
+    budget = max_mb * 1024 * 1024
+    lines = []
+    total = 0
+    for path in paths:
+        if total >= budget:
+            break
+        try:
+            with open_session_file(path) as f:
+                for line in f:
+                    lines.append(line)
+                    total += len(line)
+                    if total >= budget:
+                        break
+        except OSError as e:
+            print(f"WARNING: Cannot read {path}: {e}", file=sys.stderr)
+
+    results = []
+    if not total:
+        return results
+
+    for name, (loads, _) in available_json_backends().items():
+        errors = 0
+        start = time.perf_counter()
+        for line in lines:
+            try:
+                loads(line)
+            except ValueError:
+                errors += 1
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        results.append({
+            'backend': name,
+            'bytes': total,
+            'lines': len(lines),
+            'errors': errors,
+            'seconds': round(elapsed, 4),
+            'mb_per_s': round(total / elapsed / 1e6, 1),
+            'seconds_per_gb': round(elapsed * 1e9 / total, 2),
+        })
+    return results
+
+class SessionIndex:
+    """
+    Persistent SQLite cache of per-file session metadata.
+
+    Rows are keyed by file path and are only trusted while the file's size and
+    mtime are unchanged, so a refresh re-reads just the files that changed.
+    """
+
+    SCHEMA_VERSION = 4
+
+    TABLES = ('sessions', 'dirs', 'session_paths', 'search_files', 'search_fts', 'usage_files', 'usage')
+
+    # Directories modified this recently may still change within the same mtime tick
+    RACY_MTIME_NS = 2 * 10**9
+
+    COLUMNS = (
+        'file_path', 'size', 'mtime_ns', 'session_id', 'cwd', 'first_prompt', 'first_timestamp',
+        'last_user_timestamp', 'event_count', 'user_count', 'assistant_count',
+    )
+
+    def __init__(self, db_path: Path, jobs: int = 1):
+        self.db_path = db_path
+        self.jobs = jobs
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(db_path), timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self._init_schema()
+        except (sqlite3.Error, OSError) as e:
+            # Cache is an optimization only - keep working without persistence
+            print(f"WARNING: Session index unavailable ({e}), using in-memory index", file=sys.stderr)
+            self.conn = sqlite3.connect(":memory:")
+            self._init_schema()
+
+    def _init_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            for table in self.TABLES:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                file_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                session_id TEXT NOT NULL,
+                cwd TEXT,
+                first_prompt TEXT,
+                first_timestamp TEXT,
+                last_user_timestamp TEXT,
+                event_count INTEGER,
+                user_count INTEGER,
+                assistant_count INTEGER
+            )
+        """)
+        # Directory mtimes seen by the last sync; unchanged dirs are not re-listed
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                dir_path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_paths (
+                file_path TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                dir_path TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS session_paths_id ON session_paths (session_id)")
+        # Full-text search: bytes of each transcript already indexed, and the messages
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_files (
+                file_path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                offset INTEGER NOT NULL
+            )
+        """)
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                    text, tools,
+                    session_id UNINDEXED, file_path UNINDEXED, timestamp UNINDEXED, role UNINDEXED
+                )
+            """)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5
+            self.has_fts = False
+        # Token usage: bytes of each transcript already counted, and sums per day and model
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage_files (
+                file_path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                last_message_id TEXT,
+                session_id TEXT NOT NULL,
+                cwd TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                file_path TEXT NOT NULL,
+                day TEXT NOT NULL,
+                model TEXT NOT NULL,
+                messages INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                cache_creation_tokens INTEGER NOT NULL,
+                cache_read_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                PRIMARY KEY (file_path, day, model)
+            )
+        """)
+        self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def refresh(self, session_files: List[Path], full: bool = True) -> List[Dict]:
+        """
+        Return index rows for the given files, rescanning only changed files.
+
+        With full=False only the ranking fields (first and last-user timestamps)
+        are guaranteed; they are read from the head and tail of changed files
+        instead of scanning them completely. Such partial rows have
+        event_count = None and are upgraded by a later full refresh.
+        Changed files with a current compaction summary are answered from it.
+        Files that disappear between listing and stat are skipped.
+
+        Args:
+            session_files: Session .jsonl files to look up
+            full: Whether every metadata field is required
+
+        Returns:
+            List of row dicts in the same order as session_files
+        """
+        placeholders = ', '.join(self.COLUMNS)
+        # One slot per file: a cached row, or the stat result of a file to rescan
+        slots = []
+        pending = []
+        for session_file in session_files:
+            try:
+                st = session_file.stat()
+            except OSError:
+                continue
+
+            path = str(session_file)
+            cached = self.conn.execute(
+                f"SELECT {placeholders} FROM sessions WHERE file_path = ?", (path,)
+            ).fetchone()
+            if cached and cached[1] == st.st_size and cached[2] == st.st_mtime_ns:
+                cached_row = dict(zip(self.COLUMNS, cached))
+                if not full or cached_row['event_count'] is not None:
+                    slots.append(cached_row)
+                    continue
+
+            summary = load_session_summary(session_file, st)
+            if summary is not None:
+                # Compacted and unchanged since: no need to open the transcript
+                slots.append((session_file, st, ({c: summary.get(c) for c in self.COLUMNS[4:]}, None)))
+                continue
+            slots.append((session_file, st, None))
+            pending.append(path)
+
+        # Full scans are JSON-bound (processes); head/tail probes are I/O-bound (threads)
+        job = _full_scan_job if full else _ranking_scan_job
+        results = iter(run_parallel(job, pending, jobs=self.jobs, use_processes=full))
+
+        rows = []
+        changed = False
+        for slot in slots:
+            if isinstance(slot, dict):
+                rows.append(slot)
+                continue
+
+            session_file, st, result = slot
+            metadata, error = result or next(results)
+            if error is not None:
+                print(f"WARNING: Failed to parse {session_file}: {error}", file=sys.stderr)
+                continue
+
+            row = {
+                'file_path': str(session_file),
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+                'session_id': session_id_of(session_file),
+                **metadata,
+            }
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO sessions ({placeholders}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                tuple(row[c] for c in self.COLUMNS)
+            )
+            rows.append(row)
+            changed = True
+
+        if changed:
+            self.conn.commit()
+        return rows
+
+    def lookup_session(self, session_id: str, projects_dir: Path) -> Optional[Path]:
+        """
+        Resolve a session ID to its transcript path.
+
+        Answers from the id->path map when the recorded file still exists;
+        otherwise re-lists only project directories whose mtime changed and
+        tries again.
+
+        Args:
+            session_id: Session ID (transcript file stem)
+            projects_dir: ~/.claude/projects
+
+        Returns:
+            Path of the session file, or None if no such session exists
+        """
+        for _ in range(2):
+            for (path,) in self.conn.execute(
+                "SELECT file_path FROM session_paths WHERE session_id = ?", (session_id,)
+            ).fetchall():
+                if os.path.exists(path):
+                    return Path(path)
+            if not self.sync_session_paths(projects_dir):
+                break
+        return None
+
+    def sync_session_paths(self, projects_dir: Path) -> bool:
+        """
+        Bring the id->path map up to date with the project directories.
+
+        A directory's mtime changes whenever an entry is created, renamed or
+        removed, so only project directories with a new mtime are listed.
+
+        Returns:
+            True if anything changed
+        """
+        known = dict(self.conn.execute("SELECT dir_path, mtime_ns FROM dirs"))
+        seen = set()
+        changed = False
+        # Racy mtimes are recorded as 0 so the directory is listed again next time
+        racy_after = time.time_ns() - self.RACY_MTIME_NS
+
+        root = str(projects_dir)
+        try:
+            root_mtime = projects_dir.stat().st_mtime_ns
+        except OSError:
+            return False
+        if known.get(root) == root_mtime:
+            project_dirs = [d for d in known if d != root]
+        else:
+            project_dirs = [entry.path for entry in os.scandir(root) if entry.is_dir()]
+            self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (root, root_mtime if root_mtime < racy_after else 0))
+            changed = True
+        seen.add(root)
+
+        for project_dir in project_dirs:
+            try:
+                mtime = os.stat(project_dir).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(project_dir)
+            if known.get(project_dir) == mtime:
+                continue
+
+            self.conn.execute("DELETE FROM session_paths WHERE dir_path = ?", (project_dir,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO session_paths VALUES (?, ?, ?)",
+                [
+                    (entry.path, transcript_session_id(entry.name), project_dir)
+                    for entry in os.scandir(project_dir)
+                    if transcript_session_id(entry.name) is not None
+                ]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (project_dir, mtime if mtime < racy_after else 0))
+            changed = True
+
+        for gone in set(known) - seen:
+            self.conn.execute("DELETE FROM dirs WHERE dir_path = ?", (gone,))
+            self.conn.execute("DELETE FROM session_paths WHERE dir_path = ?", (gone,))
+            changed = True
+
+        if changed:
+            self.conn.commit()
+        return changed
+
+    def sync_search(self, session_files: List[Path], under: Path) -> int:
+        """
+        Bring the full-text index up to date with the given transcripts.
+
+        Each file is indexed from the offset recorded last time, so only
+        appended messages are read. Replaced (new inode) or truncated files
+        are re-indexed from the start; files below `under` that are no longer
+        listed are dropped. Compressed transcripts are indexed in one go and
+        recorded with their file size as the offset.
+
+        Returns:
+            Number of files that were (re)indexed
+        """
+        known = {path: (inode, offset) for path, inode, offset in self.conn.execute(
+            "SELECT file_path, inode, offset FROM search_files"
+        )}
+        pending = []
+        listed = set()
+        for session_file in session_files:
+            path = str(session_file)
+            listed.add(path)
+            try:
+                st = session_file.stat()
+            except OSError:
+                continue
+            inode, offset = known.get(path, (None, 0))
+            if inode == st.st_ino and offset == st.st_size:
+                continue
+            if inode is not None and (inode != st.st_ino or offset > st.st_size or is_compressed(path)):
+                self.conn.execute("DELETE FROM search_fts WHERE file_path = ?", (path,))
+                offset = 0
+            pending.append((path, offset, st.st_ino, st.st_size))
+
+        prefix = str(under) + os.sep
+        for gone in [path for path in known if path.startswith(prefix) and path not in listed]:
+            self.conn.execute("DELETE FROM search_fts WHERE file_path = ?", (gone,))
+            self.conn.execute("DELETE FROM search_files WHERE file_path = ?", (gone,))
+
+        # Batches bound the rows held in memory on a first full build
+        for start in range(0, len(pending), SEARCH_BATCH_FILES):
+            batch = pending[start:start + SEARCH_BATCH_FILES]
+            results = run_parallel(_search_scan_job, [(path, offset) for path, offset, _, _ in batch],
+                                   jobs=self.jobs, use_processes=True)
+            for (path, offset, inode, size), (rows, pos, error) in zip(batch, results):
+                if error is not None:
+                    print(f"WARNING: Failed to index {path}: {error}", file=sys.stderr)
+                    continue
+                if is_compressed(path):
+                    # Compressed files are complete; their size marks them as fully indexed
+                    pos = size
+                session_id = session_id_of(Path(path))
+                self.conn.executemany(
+                    "INSERT INTO search_fts (text, tools, session_id, file_path, timestamp, role) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(text, tools, session_id, path, timestamp, role) for timestamp, role, text, tools in rows]
+                )
+                self.conn.execute("INSERT OR REPLACE INTO search_files VALUES (?, ?, ?)", (path, inode, pos))
+            self.conn.commit()
+        self.conn.commit()
+        return len(pending)
+
+    def search(self, query: str, limit: int = 20, under: Optional[Path] = None,
+               include_tools: bool = False, raw: bool = False) -> List[Dict]:
+        """
+        Ranked full-text search over indexed messages.
+
+        Args:
+            query: Words to find (all must match), or an FTS5 expression if raw
+            limit: Maximum number of hits
+            under: Only return hits from transcripts below this directory
+            include_tools: Also match tool names
+            raw: Pass query to FTS5 unchanged (phrases, OR, NEAR, prefix*)
+
+        Returns:
+            Hits (session_id, timestamp, role, snippet, score), best first
+
+        Raises:
+            sqlite3.OperationalError: If a raw query is not valid FTS5 syntax
+        """
+        if not raw:
+            query = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+        if not query:
+            return []
+        columns = '{text tools}' if include_tools else 'text'
+        sql = (
+            "SELECT session_id, timestamp, role, snippet(search_fts, -1, '[', ']', '…', 16), bm25(search_fts) "
+            "FROM search_fts WHERE search_fts MATCH ?"
+        )
+        params = [f"{columns} : ({query})"]
+        if under is not None:
+            prefix = str(under) + os.sep
+            sql += " AND substr(file_path, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        sql += " ORDER BY rank, timestamp DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                'session_id': session_id,
+                'timestamp': timestamp,
+                'role': role,
+                'snippet': snippet.replace('\n', ' '),
+                'score': round(-score, 3),
+            }
+            for session_id, timestamp, role, snippet, score in self.conn.execute(sql, params)
+        ]
+
+    def sync_usage(self, session_files: List[Path], under: Path) -> int:
+        """
+        Bring the token usage totals up to date with the given transcripts.
+
+        Works like sync_search: each file is read from the offset recorded
+        last time and its new totals are added to the stored ones. Replaced
+        or truncated files are recounted, from their compaction summary when
+        it is current; files below `under` that are no longer listed are
+        dropped.
+
+        Returns:
+            Number of files that were (re)counted
+        """
+        known = {path: (inode, offset, last_id) for path, inode, offset, last_id in self.conn.execute(
+            "SELECT file_path, inode, offset, last_message_id FROM usage_files"
+        )}
+        pending = []
+        listed = set()
+        for session_file in session_files:
+            path = str(session_file)
+            listed.add(path)
+            try:
+                st = session_file.stat()
+            except OSError:
+                continue
+            inode, offset, last_id = known.get(path, (None, 0, None))
+            if inode == st.st_ino and offset == st.st_size:
+                continue
+            summary = load_session_summary(session_file, st)
+            if summary is not None:
+                # Compacted: take the totals of the whole file from the summary
+                self.conn.execute("DELETE FROM usage WHERE file_path = ?", (path,))
+                totals = {(day, model): counts for day, model, *counts in summary['usage']}
+                self._store_usage(path, st.st_ino, st.st_size, summary['usage_last_message_id'],
+                                  summary['usage_cwd'], totals)
+                continue
+            if inode is not None and (inode != st.st_ino or offset > st.st_size or is_compressed(path)):
+                self.conn.execute("DELETE FROM usage WHERE file_path = ?", (path,))
+                offset, last_id = 0, None
+            pending.append((path, offset, last_id, st.st_ino, st.st_size))
+
+        prefix = str(under) + os.sep
+        for gone in [path for path in known if path.startswith(prefix) and path not in listed]:
+            self.conn.execute("DELETE FROM usage WHERE file_path = ?", (gone,))
+            self.conn.execute("DELETE FROM usage_files WHERE file_path = ?", (gone,))
+
+        for start in range(0, len(pending), SEARCH_BATCH_FILES):
+            batch = pending[start:start + SEARCH_BATCH_FILES]
+            results = run_parallel(_usage_scan_job, [(path, offset, last_id) for path, offset, last_id, _, _ in batch],
+                                   jobs=self.jobs, use_processes=True)
+            for (path, offset, last_id, inode, size), (result, error) in zip(batch, results):
+                if error is not None:
+                    print(f"WARNING: Failed to read usage from {path}: {error}", file=sys.stderr)
+                    continue
+                totals, pos, last_id, cwd = result
+                if is_compressed(path):
+                    pos = size
+                self._store_usage(path, inode, pos, last_id, cwd, totals)
+            self.conn.commit()
+        self.conn.commit()
+        return len(pending)
+
+    def _store_usage(self, path: str, inode: int, pos: int, last_id: Optional[str], cwd: Optional[str], totals: Dict):
+        """Add per (day, model) totals of a transcript and record how far it was read."""
+        self.conn.executemany(
+            """
+            INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (file_path, day, model) DO UPDATE SET
+                messages = messages + excluded.messages,
+                input_tokens = input_tokens + excluded.input_tokens,
+                cache_creation_tokens = cache_creation_tokens + excluded.cache_creation_tokens,
+                cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+                output_tokens = output_tokens + excluded.output_tokens
+            """,
+            [(path, day, model, *counts) for (day, model), counts in totals.items()]
+        )
+        self.conn.execute(
+            """
+            INSERT INTO usage_files VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (file_path) DO UPDATE SET
+                inode = excluded.inode, offset = excluded.offset,
+                last_message_id = excluded.last_message_id,
+                cwd = COALESCE(usage_files.cwd, excluded.cwd)
+            """,
+            (path, inode, pos, last_id, session_id_of(Path(path)), cwd)
+        )
+
+    def usage_report(self, group_by: str = 'session', since: Optional[str] = None, until: Optional[str] = None,
+                     under: Optional[Path] = None, session_id: Optional[str] = None) -> List[Dict]:
+        """
+        Aggregate stored token usage.
+
+        Args:
+            group_by: 'session', 'cwd', 'day', 'month' or 'model'
+            since: First day to include (YYYY-MM-DD)
+            until: Last day to include (YYYY-MM-DD)
+            under: Only transcripts below this directory
+            session_id: Only this session
+
+        Returns:
+            One dict per group with message and token totals and estimated cost
+        """
+        key = {
+            'session': "f.session_id",
+            'cwd': "COALESCE(f.cwd, '')",
+            'day': "u.day",
+            'month': "substr(u.day, 1, 7)",
+            'model': "u.model",
+        }[group_by]
+        sql = f"""
+            SELECT {key}, u.model, SUM(u.messages), SUM(u.input_tokens), SUM(u.cache_creation_tokens),
+                   SUM(u.cache_read_tokens), SUM(u.output_tokens), MIN(u.day), MAX(u.day)
+            FROM usage u JOIN usage_files f ON f.file_path = u.file_path
+            WHERE 1 = 1
+        """
+        params = []
+        if since:
+            sql += " AND u.day >= ?"
+            params.append(since)
+        if until:
+            sql += " AND u.day <= ?"
+            params.append(until)
+        if under is not None:
+            prefix = str(under) + os.sep
+            sql += " AND substr(u.file_path, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        if session_id:
+            sql += " AND f.session_id = ?"
+            params.append(session_id)
+        sql += f" GROUP BY {key}, u.model"
+
+        groups = {}
+        for group, model, messages, *rest in self.conn.execute(sql, params):
+            counts, first_day, last_day = tuple(rest[:4]), rest[4], rest[5]
+            entry = groups.setdefault(group, {
+                group_by: group, 'messages': 0, 'input_tokens': 0, 'cache_creation_tokens': 0,
+                'cache_read_tokens': 0, 'output_tokens': 0, 'estimated_cost_usd': 0.0,
+                'unpriced_models': [], 'first_day': first_day, 'last_day': last_day,
+            })
+            entry['messages'] += messages
+            for name, count in zip(('input_tokens', 'cache_creation_tokens', 'cache_read_tokens', 'output_tokens'), counts):
+                entry[name] += count
+            cost = estimate_cost(model, counts)
+            if cost is None:
+                if any(counts):
+                    entry['unpriced_models'].append(model)
+            else:
+                entry['estimated_cost_usd'] += cost
+            entry['first_day'] = min(entry['first_day'], first_day)
+            entry['last_day'] = max(entry['last_day'], last_day)
+
+        rows = list(groups.values())
+        for row in rows:
+            row['estimated_cost_usd'] = round(row['estimated_cost_usd'], 4)
+        if group_by in ('day', 'month'):
+            rows.sort(key=lambda row: row[group_by])
+        else:
+            rows.sort(key=lambda row: (row['estimated_cost_usd'], row['output_tokens']), reverse=True)
+        return rows
+
+    def prune(self, existing_files: List[Path], under: Path):
+        """Drop rows for files below `under` that no longer exist."""
+        existing = {str(f) for f in existing_files}
+        prefix = str(under) + os.sep
+        stale = [
+            (path,) for (path,) in self.conn.execute("SELECT file_path FROM sessions")
+            if path.startswith(prefix) and path not in existing
+        ]
+        if stale:
+            self.conn.executemany("DELETE FROM sessions WHERE file_path = ?", stale)
+            self.conn.commit()
+
+    def rename_transcript(self, old: Path, old_stat: os.stat_result, new: Path):
+        """
+        Move the rows of a transcript that was compressed in place to its new path.
+
+        Rows that were current for the old file describe the new one as well,
+        so they are kept (with the new file's size and inode) instead of being
+        rebuilt on the next sync; stale rows are dropped.
+        """
+        old_path, new_path = str(old), str(new)
+        st = new.stat()
+        cached = self.conn.execute(
+            "SELECT size, mtime_ns FROM sessions WHERE file_path = ?", (old_path,)
+        ).fetchone()
+        self.conn.execute("DELETE FROM sessions WHERE file_path = ?", (new_path,))
+        if cached == (old_stat.st_size, old_stat.st_mtime_ns):
+            self.conn.execute(
+                "UPDATE sessions SET file_path = ?, size = ?, mtime_ns = ? WHERE file_path = ?",
+                (new_path, st.st_size, st.st_mtime_ns, old_path)
+            )
+        else:
+            self.conn.execute("DELETE FROM sessions WHERE file_path = ?", (old_path,))
+        self.conn.execute(
+            "UPDATE OR REPLACE session_paths SET file_path = ? WHERE file_path = ?", (new_path, old_path)
+        )
+
+        for files, rows in (('search_files', 'search_fts' if self.has_fts else None), ('usage_files', 'usage')):
+            current = self.conn.execute(
+                f"SELECT 1 FROM {files} WHERE file_path = ? AND inode = ? AND offset = ?",
+                (old_path, old_stat.st_ino, old_stat.st_size)
+            ).fetchone()
+            for path in (new_path,) if current else (old_path, new_path):
+                self.conn.execute(f"DELETE FROM {files} WHERE file_path = ?", (path,))
+                if rows:
+                    self.conn.execute(f"DELETE FROM {rows} WHERE file_path = ?", (path,))
+            if current:
+                self.conn.execute(
+                    f"UPDATE {files} SET file_path = ?, inode = ?, offset = ? WHERE file_path = ?",
+                    (new_path, st.st_ino, st.st_size, old_path)
+                )
+                if rows:
+                    self.conn.execute(f"UPDATE {rows} SET file_path = ? WHERE file_path = ?", (new_path, old_path))
+        self.conn.commit()
+
+
+def session_sort_key(row: Dict) -> tuple:
+    """Sort key for index rows: sessions with user messages first, then by last user timestamp.
+
+    Returns a tuple (has_user_message, timestamp_str) to ensure proper sorting:
+    - Sessions with user messages sort before those without
+    - Among sessions with messages, timestamps sort chronologically
+    """
+    last_user_ts = row.get('last_user_timestamp')
+    return (1 if last_user_ts else 0, last_user_ts or '')
+
+
+def mtime_key_bound(mtime_ns: int) -> tuple:
+    """
+    Upper bound of session_sort_key for a file with the given mtime.
+
+    An event is written after its timestamp is taken, so the last user
+    timestamp of a file cannot be (much) newer than the file's mtime.
+    """
+    bound = datetime.fromtimestamp(mtime_ns / 1e9 + MTIME_SLACK_SECONDS, timezone.utc)
+    return (1, bound.strftime('%Y-%m-%dT%H:%M:%S.') + f"{bound.microsecond // 1000:03d}Z")
+
+
+def warn_unsupported_version(version: str):
+    """Warn on stderr when a transcript comes from an untested Claude CLI version."""
+    if version != SUPPORTED_VERSION:
+        print(f"⚠️  WARNING: Conversation was created with Claude CLI version {version}", file=sys.stderr)
+        print(f"⚠️  Supported version is {SUPPORTED_VERSION}. Parsing may be inaccurate.\n", file=sys.stderr)
+
+
+# Next string or structural character; scalars between them are passed over
+_JSON_STRUCTURE_RE = re.compile(rb'["{}\[\],]')
+
+# Rest of a JSON string up to and including its closing quote. Possessive
+# quantifiers (Python 3.11+) keep the regex engine from saving a backtracking
+# state per escape sequence
+try:
+    _STRING_REST_RE = re.compile(rb'[^"\\]*+(?:\\.[^"\\]*+)*+"')
+except re.error:
+    _STRING_REST_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"')
+
+
+def _string_end(line: bytes, open_quote: int) -> int:
+    """
+    Index just past the closing quote of the JSON string opening at `open_quote` (-1 if none).
+
+    Jumps from quote to quote with bytes.find, which is fastest when escaped
+    quotes are rare (most file dumps); strings dense with them are finished
+    with a regex instead of thousands of Python-level steps.
+    """
+    pos = open_quote + 1
+    steps = 0
+    while True:
+        quote = line.find(b'"', pos)
+        if quote < 0:
+            return -1
+        backslashes = 0
+        while line[quote - backslashes - 1] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return quote + 1
+        pos = quote + 1
+        steps += 1
+        if steps >= 256 and pos - open_quote < steps * 64:
+            match = _STRING_REST_RE.match(line, pos)
+            return match.end() if match else -1
+
+
+def _is_tool_output(stack: List[list]) -> bool:
+    """True if the value about to start is top-level toolUseResult or message.content[*].content."""
+    if len(stack) == 1:
+        return stack[0][1] == b'"toolUseResult"'
+    return (len(stack) == 4 and stack[0][1] == b'"message"' and stack[1][1] == b'"content"'
+            and not stack[2][0] and stack[3][0] and stack[3][1] == b'"content"')
+
+
+def strip_tool_output(line: bytes) -> bytes:
+    """
+    Copy of a transcript line with tool output bodies replaced by null.
+
+    Tool result bodies (message.content[*].content) and the raw tool output
+    copy (toolUseResult) are what makes transcript lines megabytes long, yet
+    parse_message only needs the IDs and error flags around them. The line is
+    walked string by string and container by container without decoding
+    anything but member names, so the skipped values are never built.
+
+    Returns:
+        The shortened line, or the line itself if it is not well-formed
+    """
+    parts = []
+    last = 0
+    stack = []  # [is_object, raw key of the current member] per open container
+    expect_key = False
+    skip_start = skip_depth = 0
+    pos = 0
+    while True:
+        match = _JSON_STRUCTURE_RE.search(line, pos)
+        if match is None:
+            break
+        start = match.start()
+        char = line[start]
+        pos = start + 1
+        if char == 0x22:
+            pos = _string_end(line, start)
+            if pos < 0:
+                return line
+            if skip_depth:
+                continue
+            if expect_key:
+                stack[-1][1] = line[start:pos]
+                expect_key = False
+            elif _is_tool_output(stack):
+                parts += (line[last:start], b'null')
+                last = pos
+        elif skip_depth:
+            if char in b'{[':
+                skip_depth += 1
+            elif char in b'}]':
+                skip_depth -= 1
+                if not skip_depth:
+                    parts += (line[last:skip_start], b'null')
+                    last = pos
+        elif char in b'{[':
+            if stack and _is_tool_output(stack):
+                skip_start, skip_depth = start, 1
+            else:
+                stack.append([char == 0x7B, None])
+                expect_key = char == 0x7B
+        elif char in b'}]':
+            if not stack:
+                return line
+            stack.pop()
+            expect_key = False
+        else:
+            expect_key = bool(stack) and stack[-1][0]
+    if stack or skip_depth or not parts:
+        return line
+    parts.append(line[last:])
+    return b''.join(parts)
+
+
+def decode_message_line(line: bytes) -> Dict:
+    """
+    Decode a transcript line for parse_message.
+
+    Long lines carrying tool output are shortened with strip_tool_output
+    first, so show-conversation, tool-stats, timeline and search neither
+    decode nor hold the tool result bodies.
+
+    Raises:
+        ValueError: If the line is not valid JSON
+    """
+    if len(line) >= LAZY_DECODE_MIN_LINE and (b'"tool_result"' in line or b'"toolUseResult"' in line):
+        line = strip_tool_output(line)
+    return json_loads(line)
+
+
+def parse_message(event: Dict) -> Optional[Dict]:
+    """
+    Convert a transcript event into a conversation message.
+
+    Args:
+        event: Decoded transcript event
+
+    Returns:
+        Message dict (type, timestamp, text, tool_uses, tool_results), or None
+        for events that are not user/assistant messages or are meta messages
+    """
+    event_type = event.get('type')
+
+    if event_type not in ('user', 'assistant'):
+        return None
+
+    # Skip meta messages
+    if event.get('isMeta'):
+        return None
+
+    timestamp = event.get('timestamp', '')
+    message = event.get('message', {})
+    content = message.get('content', '')
+
+    # Extract text from content
+    text_parts = []
+    tool_uses = []
+    tool_results = []
+
+    if isinstance(content, str):
+        text_parts.append(content)
+    elif isinstance(content, list):
+        for item in content:
+            if isinstance(item, dict):
+                item_type = item.get('type')
+                if item_type == 'text':
+                    text_parts.append(item.get('text', ''))
+                elif item_type == 'tool_use':
+                    tool_uses.append({
+                        'name': item.get('name', 'unknown'),
+                        'id': item.get('id', '')
+                    })
+                elif item_type == 'tool_result':
+                    tool_results.append({
+                        'tool_use_id': item.get('tool_use_id', ''),
+                        'is_error': item.get('is_error', False)
+                    })
+
+    return {
+        'type': event_type,
+        'timestamp': timestamp,
+        'text': '\n'.join(text_parts).strip(),
+        'tool_uses': tool_uses,
+        'tool_results': tool_results
+    }
+
+
+def write_message(msg: Dict, number: int, output_format: str = 'markdown'):
+    """Print one conversation message as markdown or an ndjson line, then flush."""
+    if output_format == 'ndjson':
+        print(json_dumps(msg))
+    else:
+        role = "👤 User" if msg['type'] == 'user' else "🤖 Assistant"
+        print(f"## {number}. {role}")
+        if msg['timestamp']:
+            print(f"*{msg['timestamp']}*\n")
+
+        if msg['text']:
+            print(msg['text'])
+
+        if msg['tool_uses']:
+            print(f"\n**Tools called:** {', '.join(t['name'] for t in msg['tool_uses'])}")
+
+        if msg['tool_results']:
+            error_count = sum(1 for t in msg['tool_results'] if t['is_error'])
+            if error_count:
+                print(f"\n**Tool results:** {len(msg['tool_results'])} results ({error_count} errors)")
+            else:
+                print(f"\n**Tool results:** {len(msg['tool_results'])} results")
+
+        print("\n" + "─" * 80 + "\n")
+    sys.stdout.flush()
+
+
+def log_parse_error(session_id: str, location, line: bytes, error: Exception):
+    """Append details of a malformed transcript line to /tmp/claude-helper-parse-errors.log."""
+    import traceback
+    text = line.decode('utf-8', errors='replace')
+    with open('/tmp/claude-helper-parse-errors.log', 'a') as f:
+        f.write(f"\n{'='*60}\n")
+        f.write(f"Timestamp: {datetime.now().isoformat()}\n")
+        f.write(f"Session: {session_id}\n")
+        f.write(f"Line: {location}\n")
+        f.write(f"Error: {str(error)}\n")
+        f.write(f"Content: {text[:200]}...\n" if len(text) > 200 else f"Content: {text}\n")
+        f.write(traceback.format_exc())
+        f.write(f"{'='*60}\n")
+
+
+# Sidecar message offset index: magic, inode, bytes scanned, message count, then u64 offsets
+OFFSETS_MAGIC = b'CHMSGIX1'
+OFFSETS_HEADER = struct.Struct('<8sQQQ')
+
+
+def is_message_line(line: bytes) -> bool:
+    """True if show-conversation would render this line as a message."""
+    if event_type_of(line) not in ('user', 'assistant'):
+        return False
+    if b'"isMeta"' not in line:
+        return True
+    try:
+        return not json_loads(line).get('isMeta')
+    except:
+        return False
+
+
+def load_message_offsets(session_file: Path, session_id: str) -> Tuple[array, int]:
+    """
+    Byte offsets of every message line in a transcript.
+
+    Offsets are kept in a sidecar file under the cache dir together with the
+    number of bytes already scanned. Transcripts are append-only, so later
+    calls only scan the bytes added since; a replaced or truncated file is
+    rescanned from the start. A trailing line without its newline is left for
+    the next call. Offsets of compressed transcripts count decompressed bytes;
+    such files never change, so a sidecar for the same inode is used as is.
+
+    Args:
+        session_file: Transcript to index
+        session_id: Session ID (names the sidecar)
+
+    Returns:
+        (array('Q') of line start offsets in file order, bytes of complete lines indexed)
+    """
+    sidecar = get_cache_dir() / "offsets" / f"{session_id}.idx"
+    stat = session_file.stat()
+    compressed = is_compressed(session_file)
+    offsets = array('Q')
+    scanned = 0
+
+    try:
+        with open(sidecar, 'rb') as f:
+            magic, inode, size, count = OFFSETS_HEADER.unpack(f.read(OFFSETS_HEADER.size))
+            if magic == OFFSETS_MAGIC and inode == stat.st_ino and (compressed or size <= stat.st_size):
+                offsets.fromfile(f, count)
+                scanned = size
+    except (OSError, EOFError, struct.error):
+        offsets = array('Q')
+        scanned = 0
+    if compressed and scanned:
+        return offsets, scanned
+
+    with open_session_file(session_file) as f:
+        if scanned:
+            # The scanned prefix must still end on a line boundary
+            f.seek(scanned - 1)
+            if f.read(1) != b'\n':
+                offsets = array('Q')
+                scanned = 0
+        f.seek(scanned)
+        pos = scanned
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            if is_message_line(line):
+                offsets.append(pos)
+            pos += len(line)
+
+    if pos == scanned:
+        return offsets, pos
+
+    try:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(OFFSETS_HEADER.pack(OFFSETS_MAGIC, stat.st_ino, pos, len(offsets)))
+            offsets.tofile(f)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass
+    return offsets, pos
+
+
+# Compaction summaries written by compact; bumped whenever their fields change
+SUMMARY_VERSION = 1
+
+
+def summary_path(session_id: str) -> Path:
+    """Sidecar file holding the compaction summary of a session."""
+    return get_cache_dir() / "summaries" / f"{session_id}.json"
+
+
+def read_version_and_last_prompt(session_file: Path) -> Tuple[Optional[str], Optional[str]]:
+    """Claude CLI version of a transcript (first event that records one) and its last user prompt."""
+    version = None
+    last_prompt = None
+    with open_session_file(session_file) as f:
+        for line in f:
+            if version is None:
+                version = probe_event(line, ('version',)).get('version')
+                if version is None and len(line) < PROBE_MIN_LINE and b'"version"' in line:
+                    try:
+                        version = json_loads(line).get('version')
+                    except:
+                        pass
+            if event_type_of(line) != 'user' or b'"tool_result"' in line:
+                continue
+            try:
+                event = json_loads(line)
+            except:
+                continue
+            if not isinstance(event, dict) or event.get('isMeta'):
+                continue
+            content = event.get('message', {}).get('content', '')
+            if isinstance(content, str) and content.strip():
+                last_prompt = content.strip()[:200]
+            elif isinstance(content, list):
+                for item in content:
+                    if isinstance(item, dict) and item.get('type') == 'text' and item.get('text', '').strip():
+                        last_prompt = item['text'].strip()[:200]
+                        break
+    return version, last_prompt
+
+
+def build_session_summary(session_file: Path) -> Dict:
+    """
+    Everything the metadata commands need from a transcript, in one dict.
+
+    Built with the same scanners the commands use, so answers from a summary
+    match a scan of the raw file. The size and mtime are taken before
+    reading: if the file grows meanwhile, the summary is simply never used.
+    """
+    st = session_file.stat()
+    metadata = scan_session_file(session_file)
+    calls = extract_tool_calls(session_file)
+    totals, _, last_message_id, usage_cwd = extract_usage(session_file)
+    version, last_prompt = read_version_and_last_prompt(session_file)
+    return {
+        'summary_version': SUMMARY_VERSION,
+        'session_id': session_id_of(session_file),
+        'file_path': str(session_file),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        **metadata,
+        'last_prompt': last_prompt,
+        'version': version,
+        'tool_calls': [list(call) for call in calls],
+        'tool_stats': summarize_tool_calls(calls),
+        'usage': [[day, model, *counts] for (day, model), counts in totals.items()],
+        'usage_last_message_id': last_message_id,
+        'usage_cwd': usage_cwd,
+    }
+
+
+def _summary_job(path: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """Worker entry point: build one compaction summary, returning (summary, error)."""
+    try:
+        return build_session_summary(Path(path)), None
+    except Exception as e:
+        return None, str(e)
+
+
+def write_session_summary(summary: Dict):
+    """Store a compaction summary (atomically replacing an older one)."""
+    sidecar = summary_path(summary['session_id'])
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(json_dumps(summary))
+    os.replace(tmp, sidecar)
+
+
+def load_session_summary(session_file: Path, st: os.stat_result) -> Optional[Dict]:
+    """
+    Compaction summary of a transcript, if one was written for its current contents.
+
+    Args:
+        session_file: Transcript (names the sidecar)
+        st: Current stat of the transcript; size and mtime must match the summary
+
+    Returns:
+        Summary dict, or None if there is none or the transcript changed since
+    """
+    try:
+        with open(summary_path(session_id_of(session_file)), 'rb') as f:
+            summary = json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(summary, dict) or summary.get('summary_version') != SUMMARY_VERSION \
+            or summary.get('size') != st.st_size or summary.get('mtime_ns') != st.st_mtime_ns:
+        return None
+    return summary
+
+
+def move_session_summary(old_stat: os.stat_result, new_file: Path):
+    """Point a current summary at the compressed file that replaced its transcript."""
+    summary = load_session_summary(new_file, old_stat)
+    if summary is None:
+        return
+    st = new_file.stat()
+    summary.update(file_path=str(new_file), size=st.st_size, mtime_ns=st.st_mtime_ns)
+    try:
+        write_session_summary(summary)
+    except OSError:
+        pass
+
+
+def select_message_range(total: int, tail: Optional[int] = None, first: Optional[int] = None,
+                         last: Optional[int] = None, page: Optional[int] = None,
+                         page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[int, int]:
+    """
+    Resolve show-conversation selection options to a slice of message indexes.
+
+    Args:
+        total: Number of messages in the session
+        tail: Last N messages
+        first: First message number to show (1-based, inclusive)
+        last: Last message number to show (1-based, inclusive)
+        page: Page number (1-based) of page_size messages
+
+    Returns:
+        (start, stop) 0-based half-open range, clamped to [0, total]
+    """
+    if tail is not None:
+        start, stop = total - tail, total
+    elif page is not None:
+        start = (page - 1) * page_size
+        stop = start + page_size
+    else:
+        start = (first or 1) - 1
+        stop = last if last is not None else total
+    start = max(0, min(start, total))
+    return start, max(start, min(stop, total))
+
+
+class FileWatcher:
+    """
+    Block until watched files or directories change.
+
+    Uses inotify (through ctypes) on Linux and falls back to sleeping for
+    POLL_INTERVAL elsewhere or when inotify cannot be set up. Either way the
+    caller re-checks the files after wait() returns, so a missed or
+    coalesced event only delays, never loses, an update.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    def __init__(self):
+        self.fd = -1
+        self._libc = None
+        self._paths = {}
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd >= 0:
+            self.fd = fd
+            self._libc = libc
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self.fd >= 0
+
+    def add(self, path: Path) -> bool:
+        """Watch a file or directory; returns False if it cannot be watched."""
+        if not self.uses_inotify:
+            return False
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), self.WATCH_MASK)
+        if wd < 0:
+            return False
+        self._paths[wd] = Path(path)
+        return True
+
+    def wait(self, timeout: float, extra_fds: Tuple[int, ...] = ()) -> bool:
+        """
+        Wait up to timeout seconds for a change.
+
+        Args:
+            timeout: Maximum seconds to block
+            extra_fds: Other descriptors that should also end the wait when
+                readable (e.g. a pidfd that signals process exit)
+
+        Returns:
+            True if inotify or an extra fd reported an event, False on timeout
+            or when polling
+        """
+        if not self.uses_inotify:
+            timeout = min(timeout, POLL_INTERVAL)
+            if not extra_fds:
+                time.sleep(max(0.0, timeout))
+                return False
+        fds = ([self.fd] if self.uses_inotify else []) + list(extra_fds)
+        ready, _, _ = select.select(fds, [], [], max(0.0, timeout))
+        if self.fd not in ready:
+            return bool(ready)
+        # Drain queued events; callers re-check state rather than decode them
+        while True:
+            try:
+                if not os.read(self.fd, 64 * 1024):
+                    break
+            except BlockingIOError:
+                break
+        return True
+
+    def wait_events(self, timeout: float) -> Optional[List[Tuple[Path, int]]]:
+        """
+        Wait up to timeout seconds and report what changed.
+
+        Returns:
+            [(path, mask)] where path is the watched file or the entry inside a
+            watched directory; [] on timeout; None when polling or after the
+            kernel queue overflowed (callers must re-check everything)
+        """
+        if not self.uses_inotify:
+            time.sleep(max(0.0, min(timeout, POLL_INTERVAL)))
+            return None
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return []
+        events = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            pos = 0
+            # struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+            while pos + 16 <= len(data):
+                wd, mask, _, name_len = struct.unpack_from('iIII', data, pos)
+                name = data[pos + 16:pos + 16 + name_len].rstrip(b'\0')
+                pos += 16 + name_len
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                base = self._paths.get(wd)
+                if base is not None:
+                    events.append((base / os.fsdecode(name) if name else base, mask))
+        return None if overflow else events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ClaudeHelper:
+    """Read-only helper to query Claude CLI session data"""
+
+    def __init__(self, jobs: int = DEFAULT_JOBS):
+        self.claude_dir = Path.home() / ".claude"
+        self.projects_dir = self.claude_dir / "projects"
+        self.history_file = self.claude_dir / "history.jsonl"
+        self.jobs = jobs
+        self._index = None
+
+    @property
+    def index(self) -> SessionIndex:
+        """Session metadata index, opened on first use."""
+        if self._index is None:
+            self._index = SessionIndex(get_cache_dir() / "index.sqlite", jobs=self.jobs)
+        return self._index
+
+    def _scan_session_entries(self, cwd: Optional[str] = None) -> List[Tuple[Path, int]]:
+        """
+        Find session files with their mtimes, optionally limited to one project directory.
+
+        Uses os.scandir, so no transcript is opened.
+
+        Args:
+            cwd: Optional working directory to filter sessions by
+
+        Returns:
+            List of (transcript path, mtime_ns) pairs (agent sidechains excluded)
+        """
+        if cwd:
+            # Search in specific project directory
+            escaped_path = escape_path(os.path.abspath(cwd))
+            project_dirs = [self.projects_dir / escaped_path]
+        else:
+            # Search all project directories
+            project_dirs = [p for p in self.projects_dir.iterdir() if p.is_dir()]
+
+        entries = []
+        for project_dir in project_dirs:
+            try:
+                with os.scandir(project_dir) as it:
+                    for entry in it:
+                        if transcript_session_id(entry.name) is None or entry.name.startswith('agent-'):
+                            continue
+                        try:
+                            entries.append((Path(entry.path), entry.stat().st_mtime_ns))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return entries
+
+    def _find_session_files(self, cwd: Optional[str] = None) -> List[Path]:
+        """Session files, optionally limited to one project directory (agent sidechains excluded)."""
+        return [path for path, _ in self._scan_session_entries(cwd)]
+
+    def _top_sessions(self, k: int, cwd: Optional[str] = None) -> Tuple[List[Dict], int]:
+        """
+        Select the k most recently active sessions without ranking every file.
+
+        Candidates are visited in mtime order, newest first, and ranked on a
+        bounded min-heap of size k. Because a file's mtime bounds its last user
+        timestamp, the walk stops as soon as the next candidate's bound cannot
+        beat the k-th best key, so expensive timestamp extraction only runs for
+        files that could enter the top k.
+
+        Args:
+            k: Number of sessions to select
+            cwd: Optional working directory to filter sessions by
+
+        Returns:
+            (ranking rows newest first, total number of session files)
+        """
+        entries = self._scan_session_entries(cwd)
+        if not cwd:
+            self.index.prune([path for path, _ in entries], self.projects_dir)
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        if k <= 0:
+            return [], len(entries)
+
+        # Min-heap of (key, -position, row); among equal keys the older file is evicted first
+        heap = []
+        batch_size = max(k, self.jobs * 2)
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            if len(heap) == k and mtime_key_bound(batch[0][1]) < heap[0][0]:
+                break
+
+            positions = {str(path): start + i for i, (path, _) in enumerate(batch)}
+            for row in self.index.refresh([path for path, _ in batch], full=False):
+                item = (session_sort_key(row), -positions[row['file_path']], row)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, item)
+
+        ranked = sorted(heap, key=lambda item: item[:2], reverse=True)
+        return [row for _, _, row in ranked], len(entries)
+
+    def get_latest_session_id(self, nth: int = 1, show_time: bool = False, cwd: Optional[str] = None) -> Optional[str]:
+        """
+        Extract the Nth most recent session ID from claude storage.
+
+        Args:
+            nth: Which session to get (1 = most recent, 2 = second most recent, etc.)
+            show_time: If True, include time ago in output
+            cwd: Optional working directory to filter sessions by
+
+        Returns:
+            Session ID string or None if not found
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            print("Is Claude CLI installed and initialized?", file=sys.stderr)
+            return None
+
+        try:
+            rows, total = self._top_sessions(max(nth, 1), cwd)
+
+            if not total:
+                print("ERROR: No session files found", file=sys.stderr)
+                return None
+
+            if nth > len(rows):
+                print(f"ERROR: Only {min(total, len(rows))} sessions exist, cannot get #{nth}", file=sys.stderr)
+                return None
+
+            row = rows[nth - 1]
+            session_id = row['session_id']
+            timestamp = row['first_timestamp']
+
+            if timestamp and show_time:
+                time_str = time_ago(timestamp)
+                return f"{session_id}; started {time_str}"
+            return session_id
+
+        except Exception as e:
+            print(f"ERROR: Failed to extract session ID: {e}", file=sys.stderr)
+            return None
+
+    def get_session_id_for_pid(self, pid: int) -> Optional[str]:
+        """
+        Session ID of the transcript a running claude process writes to.
+
+        Uses the transcript the process (or a child) has open; otherwise the
+        one created after the process started that no other running claude
+        process in the same directory accounts for (see assign_transcripts).
+
+        Args:
+            pid: Process ID of the claude command
+
+        Returns:
+            Session ID string or None if it cannot be determined
+        """
+        transcript = find_transcript_for_pid(pid, self.projects_dir)
+        return session_id_of(transcript) if transcript else None
+
+    def list_sessions(self, limit: int = 20, cwd: Optional[str] = None) -> List[Dict]:
+        """
+        List recent claude sessions with metadata.
+
+        Args:
+            limit: Maximum number of sessions to return
+            cwd: Optional working directory to filter sessions by
+
+        Returns:
+            List of session dictionaries with metadata
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return []
+
+        try:
+            rows, _ = self._top_sessions(max(limit, 0), cwd)
+            # Only the sessions being shown need a full scan
+            rows = self.index.refresh([Path(row['file_path']) for row in rows])
+            return [self._list_entry(row) for row in rows]
+
+        except Exception as e:
+            print(f"ERROR: Failed to list sessions: {e}", file=sys.stderr)
+            return []
+
+    def list_changed_sessions(self, since_mtime_ns: int, cwd: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        List sessions added or changed since a list cursor was taken.
+
+        Transcripts are append-only, so a file is unchanged exactly when its
+        mtime is older than the cursor's watermark; only the directory entries
+        are stat'ed and just the changed files are looked up in the index.
+
+        Args:
+            since_mtime_ns: Watermark from parse_list_cursor
+            cwd: Optional working directory to filter sessions by
+
+        Returns:
+            Changed sessions, most recently active first (as list_sessions),
+            or None on error
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
+
+        try:
+            changed = [path for path, mtime_ns in self._scan_session_entries(cwd) if mtime_ns >= since_mtime_ns]
+            rows = self.index.refresh(changed)
+            rows.sort(key=lambda row: (session_sort_key(row), row['mtime_ns']), reverse=True)
+            return [self._list_entry(row) for row in rows]
+
+        except Exception as e:
+            print(f"ERROR: Failed to list sessions: {e}", file=sys.stderr)
+            return None
+
+    @staticmethod
+    def _list_entry(row: Dict) -> Dict:
+        """Session dictionary printed by list for an index row."""
+        timestamp = row['first_timestamp']
+        return {
+            'session_id': row['session_id'],
+            'timestamp': timestamp,
+            'time_ago': time_ago(timestamp) if timestamp else 'unknown',
+            'cwd': row['cwd'] or 'unknown',
+            'first_prompt': (row['first_prompt'] or '')[:100] or 'N/A',
+            'event_count': row['event_count'],
+            'file_path': row['file_path'],
+            'modified_at': datetime.fromtimestamp(row['mtime_ns'] / 1e9).isoformat()
+        }
+
+    def get_session_info(self, session_id: str) -> Optional[Dict]:
+        """
+        Get detailed info about a specific session.
+
+        Args:
+            session_id: The session ID to look up
+
+        Returns:
+            Session metadata dict or None if not found
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
+
+        try:
+            session_file = self.index.lookup_session(session_id, self.projects_dir)
+            rows = self.index.refresh([session_file]) if session_file else []
+            if rows:
+                row = rows[0]
+                timestamp = row['first_timestamp']
+
+                info = {
+                    'session_id': session_id,
+                    'timestamp': timestamp,
+                    'time_ago': time_ago(timestamp) if timestamp else 'unknown',
+                    'cwd': row['cwd'] or 'unknown',
+                    'first_prompt': row['first_prompt'] or 'N/A',
+                    'event_count': row['event_count'],
+                    'user_messages': row['user_count'],
+                    'assistant_messages': row['assistant_count'],
+                    'file_path': row['file_path'],
+                    'modified_at': datetime.fromtimestamp(row['mtime_ns'] / 1e9).isoformat()
+                }
+                summary = load_session_summary(session_file, session_file.stat())
+                if summary is not None:
+                    # Only kept for compacted sessions
+                    info['last_prompt'] = summary['last_prompt'] or 'N/A'
+                    info['version'] = summary['version']
+                    info['tool_calls'] = len(summary['tool_calls'])
+                return info
+
+            print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
+            return None
+
+        except Exception as e:
+            print(f"ERROR: Failed to get session info: {e}", file=sys.stderr)
+            return None
+
+    def get_usage(self, group_by: str = 'session', since: Optional[str] = None, until: Optional[str] = None,
+                  cwd: Optional[str] = None, session_id: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Token usage and estimated cost, aggregated per session, cwd, day, month or model.
+
+        Totals live in the index and are updated incrementally first, so
+        only messages appended since the last call are read.
+
+        Args:
+            group_by: 'session', 'cwd', 'day', 'month' or 'model'
+            since: Earliest day (relative age or ISO date)
+            until: Latest day (relative age or ISO date)
+            cwd: Only sessions of this working directory
+            session_id: Only this session
+
+        Returns:
+            List of aggregate dicts, or None on error
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
+
+        try:
+            since_day = parse_time_bound(since)[0][:10] if since else None
+            until_day = parse_time_bound(until)[0][:10] if until else None
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return None
+
+        session_files = [path for path, _ in self._scan_session_entries()]
+        self.index.sync_usage(session_files, self.projects_dir)
+        under = self.projects_dir / escape_path(os.path.abspath(cwd)) if cwd else None
+        return self.index.usage_report(group_by, since_day, until_day, under, session_id)
+
+    def _select_session_entries(self, session_ids: Optional[List[str]] = None, cwd: Optional[str] = None,
+                                since_epoch: Optional[float] = None) -> Optional[List[Tuple[Path, int]]]:
+        """
+        Transcripts to scan for multi-session commands, oldest first.
+
+        Args:
+            session_ids: Explicit sessions (takes precedence over cwd)
+            cwd: Only sessions of this working directory
+            since_epoch: Skip files last modified before this time
+
+        Returns:
+            List of (path, mtime_ns), or None if a session ID is unknown
+        """
+        if session_ids:
+            entries = []
+            for session_id in session_ids:
+                session_file = self.index.lookup_session(session_id, self.projects_dir)
+                if not session_file:
+                    print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
+                    return None
+                entries.append((session_file, session_file.stat().st_mtime_ns))
+        else:
+            entries = self._scan_session_entries(cwd)
+
+        if since_epoch is not None:
+            # A file's mtime is at least its last event's time (give or take the slack)
+            cutoff_ns = int((since_epoch - MTIME_SLACK_SECONDS) * 1e9)
+            entries = [entry for entry in entries if entry[1] >= cutoff_ns]
+        entries.sort(key=lambda entry: entry[1])
+        return entries
+
+    def tool_stats(self, session_ids: Optional[List[str]] = None, cwd: Optional[str] = None,
+                   since: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Per-tool latency (p50/p95/max) and error rate from paired tool_use/tool_result events.
 
-    Args:
-        path: Absolute path to escape
+        Compacted sessions contribute the calls stored in their summary.
 
-    Returns:
-        Escaped path suitable for ~/.claude/projects/ lookup
-    """
-    # Convert /path/to/dir to -path-to-dir
-    if path.startswith('/'):
-        path = path[1:]  # Remove leading slash
-    return '-' + path.replace('/', '-')
+        Args:
+            session_ids: Only these sessions (default: all, or those of cwd)
+            cwd: Only sessions of this working directory
+            since: Only tool calls issued at or after this time (relative age or ISO)
 
+        Returns:
+            Per-tool stats (see summarize_tool_calls), or None on error
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
 
-class ClaudeHelper:
-    """Read-only helper to query Claude CLI session data"""
+        try:
+            since_ts, since_epoch = parse_time_bound(since) if since else (None, None)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return None
 
-    def __init__(self):
-        self.claude_dir = Path.home() / ".claude"
-        self.projects_dir = self.claude_dir / "projects"
-        self.history_file = self.claude_dir / "history.jsonl"
+        entries = self._select_session_entries(session_ids, cwd, since_epoch)
+        if entries is None:
+            return None
 
-    def get_latest_session_id(self, nth: int = 1, show_time: bool = False, cwd: Optional[str] = None) -> Optional[str]:
+        calls = []
+        to_scan = []
+        for path, _ in entries:
+            try:
+                summary = load_session_summary(path, path.stat())
+            except OSError:
+                continue
+            # Usable unless calls before `since` would have to be left out
+            if summary is not None and (not since_ts or (summary['first_timestamp'] or '') >= since_ts):
+                calls.extend(tuple(call) for call in summary['tool_calls'])
+            else:
+                to_scan.append(path)
+
+        items = [(str(path), since_ts) for path in to_scan]
+        for path, (file_calls, error) in zip(to_scan, imap_parallel(_tool_calls_job, items, jobs=self.jobs, use_processes=True)):
+            if error is not None:
+                print(f"WARNING: Failed to read {path}: {error}", file=sys.stderr)
+                continue
+            calls.extend(file_calls)
+        return summarize_tool_calls(calls)
+
+    def show_timeline(self, session_ids: Optional[List[str]] = None, cwd: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None,
+                      limit: Optional[int] = None, output_format: str = 'text') -> bool:
         """
-        Extract the Nth most recent session ID from claude storage.
+        Print the messages of several sessions interleaved by timestamp.
+
+        Each transcript is read by its own lazy iterator and the iterators are
+        combined with a heap-based k-way merge (heapq.merge), so output
+        starts immediately and memory is bounded by the number of sessions.
 
         Args:
-            nth: Which session to get (1 = most recent, 2 = second most recent, etc.)
-            show_time: If True, include time ago in output
-            cwd: Optional working directory to filter sessions by
+            session_ids: Sessions to merge (default: those of cwd)
+            cwd: Merge all sessions of this working directory
+            since: Earliest message time (relative age or ISO)
+            until: Latest message time (relative age or ISO)
+            limit: Stop after this many messages
+            output_format: 'text' (one line per message) or 'ndjson'
 
         Returns:
-            Session ID string or None if not found
+            True if successful, False otherwise
         """
         if not self.projects_dir.exists():
             print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
-            print("Is Claude CLI installed and initialized?", file=sys.stderr)
-            return None
+            return False
 
         try:
-            # Find all session files
-            session_files = []
-
-            if cwd:
-                # Search in specific project directory
-                escaped_path = escape_path(os.path.abspath(cwd))
-                project_dir = self.projects_dir / escaped_path
-                if project_dir.exists():
-                    session_files = [f for f in project_dir.glob("*.jsonl") if not f.name.startswith('agent-')]
+            since_ts, since_epoch = parse_time_bound(since) if since else (None, None)
+            until_ts, _ = parse_time_bound(until) if until else (None, None)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return False
+
+        entries = self._select_session_entries(session_ids, cwd or os.getcwd(), since_epoch)
+        if entries is None:
+            return False
+        if not entries:
+            print("ERROR: No sessions found", file=sys.stderr)
+            return False
+
+        streams = [iter_session_messages(path, since_ts, until_ts) for path, _ in entries]
+        for count, (timestamp, session_id, message) in enumerate(heapq.merge(*streams, key=lambda item: item[0]), 1):
+            if output_format == 'ndjson':
+                print(json_dumps({'session_id': session_id, **message}))
             else:
-                # Search all project directories
-                for project_dir in self.projects_dir.iterdir():
-                    if project_dir.is_dir():
-                        session_files.extend([f for f in project_dir.glob("*.jsonl") if not f.name.startswith('agent-')])
+                role = "👤 User" if message['type'] == 'user' else "🤖 Assistant"
+                summary = ' '.join(message['text'].split())
+                if len(summary) > 100:
+                    summary = summary[:97] + '...'
+                if message['tool_uses']:
+                    summary += f" [tools: {', '.join(t['name'] for t in message['tool_uses'])}]"
+                if message['tool_results']:
+                    errors = sum(1 for t in message['tool_results'] if t['is_error'])
+                    summary += f" [{len(message['tool_results'])} results{f', {errors} errors' if errors else ''}]"
+                print(f"{timestamp}  {session_id[:8]}  {role:<12} {summary.strip()}")
+            sys.stdout.flush()
+            if limit is not None and count >= limit:
+                break
+        return True
+
+    def compact_sessions(self, session_ids: Optional[List[str]] = None, cwd: Optional[str] = None,
+                         min_bytes: int = 0, force: bool = False) -> Optional[List[Dict]]:
+        """
+        Write compaction summaries for finished sessions.
 
-            if not session_files:
-                print("ERROR: No session files found", file=sys.stderr)
-                return None
+        A summary holds the index fields, last prompt, CLI version, tool calls
+        and token usage of a transcript. info, list, usage and tool-stats
+        read it instead of the transcript for as long as the transcript's
+        size and mtime are unchanged. Sessions of running claude processes
+        are skipped (they would outdate the summary at once), as are sessions
+        that already have a current one unless force is set.
 
-            # Sort by last user message timestamp, newest first
-            def get_last_user_timestamp(session_file: Path) -> tuple:
-                """Extract the timestamp of the last user message from a session file.
-                
-                Returns a tuple (has_user_message, timestamp_str) to ensure proper sorting:
-                - Sessions with user messages sort before those without
-                - Among sessions with messages, timestamps sort chronologically
-                """
-                last_user_ts = None
-                try:
-                    with open(session_file, 'r') as f:
-                        for line in f:
-                            try:
-                                event = json.loads(line)
-                                if event.get('type') == 'user':
-                                    last_user_ts = event.get('timestamp')
-                            except:
-                                pass
-                except:
-                    pass
-                # Return tuple: (1, timestamp) for sessions with messages, (0, '') for others
-                # This ensures sessions with messages always sort first
-                return (1 if last_user_ts else 0, last_user_ts or '')
-            
-            session_files.sort(key=get_last_user_timestamp, reverse=True)
-
-            if nth > len(session_files):
-                print(f"ERROR: Only {len(session_files)} sessions exist, cannot get #{nth}", file=sys.stderr)
-                return None
+        Args:
+            session_ids: Only these sessions (default: all, or those of cwd)
+            cwd: Only sessions of this working directory
+            min_bytes: Skip transcripts smaller than this
+            force: Rebuild summaries that are still current
+
+        Returns:
+            One dict per compacted session (session_id, size, event_count, tool_calls), or None on error
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
 
-            target_file = session_files[nth - 1]
+        entries = self._select_session_entries(session_ids, cwd)
+        if entries is None:
+            return None
+        live = live_transcripts(self.projects_dir) or set()
 
-            # Extract session ID from filename (it's the UUID before .jsonl)
-            session_id = target_file.stem
+        targets = []
+        for path, _ in entries:
+            if str(path) in live:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_size < min_bytes or (not force and load_session_summary(path, st) is not None):
+                continue
+            targets.append(path)
+
+        compacted = []
+        results = run_parallel(_summary_job, [str(path) for path in targets], jobs=self.jobs, use_processes=True)
+        for path, (summary, error) in zip(targets, results):
+            if error is not None:
+                print(f"WARNING: Failed to summarize {path}: {error}", file=sys.stderr)
+                continue
+            try:
+                write_session_summary(summary)
+            except OSError as e:
+                print(f"WARNING: Failed to write summary of {path}: {e}", file=sys.stderr)
+                continue
+            compacted.append({
+                'session_id': summary['session_id'], 'size': summary['size'],
+                'event_count': summary['event_count'], 'tool_calls': len(summary['tool_calls']),
+            })
+        return compacted
+
+    def archive_sessions(self, older_than: str, fmt: str = 'gz', dry_run: bool = False,
+                         cwd: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Compress transcripts that have not been written to for a while.
 
-            # Get timestamp from first event
-            with open(target_file, 'r') as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        timestamp = data.get('timestamp')
-                        if timestamp:
-                            if show_time:
-                                time_str = time_ago(timestamp)
-                                return f"{session_id}; started {time_str}"
-                            return session_id
-                    except:
-                        continue
+        Each file is replaced by <session_id>.jsonl.<fmt> with the same mtime.
+        Index rows that were up to date move along with it, so already indexed
+        sessions are not rescanned. Transcripts of running claude processes
+        are left alone.
 
-            # If no timestamp found, return just the ID
-            return session_id
+        Args:
+            older_than: Last modification before this (relative age or ISO date)
+            fmt: 'gz' or 'zst'
+            dry_run: Only report what would be compressed
+            cwd: Only sessions of this working directory
 
-        except Exception as e:
-            print(f"ERROR: Failed to extract session ID: {e}", file=sys.stderr)
+        Returns:
+            One dict per transcript (session_id, path, size, compressed_size), or None on error
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
+        if fmt == 'zst' and zstd is None and zstandard is None:
+            print("ERROR: --format zst needs Python 3.14+ or the zstandard package", file=sys.stderr)
+            return None
+        try:
+            cutoff_ns = int(parse_time_bound(older_than)[1] * 1e9)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
             return None
 
-    def list_sessions(self, limit: int = 20, cwd: Optional[str] = None) -> List[Dict]:
+        live = live_transcripts(self.projects_dir) or set()
+        candidates = [
+            path for path, mtime_ns in self._scan_session_entries(cwd)
+            if mtime_ns < cutoff_ns and not is_compressed(path) and str(path) not in live
+        ]
+        candidates.sort()
+        if dry_run:
+            return [
+                {'session_id': session_id_of(path), 'path': str(path), 'size': path.stat().st_size, 'compressed_size': None}
+                for path in candidates
+            ]
+
+        archived = []
+        for path in candidates:
+            try:
+                before = path.stat()
+                target = compress_transcript(path, fmt)
+            except OSError as e:
+                print(f"WARNING: Failed to archive {path}: {e}", file=sys.stderr)
+                continue
+            self.index.rename_transcript(path, before, target)
+            move_session_summary(before, target)
+            archived.append({
+                'session_id': session_id_of(target), 'path': str(target),
+                'size': before.st_size, 'compressed_size': target.stat().st_size,
+            })
+        return archived
+
+    def watch_sessions(self, idle_seconds: float = 60.0, cwd: Optional[str] = None) -> bool:
         """
-        List recent claude sessions with metadata.
+        Stream session lifecycle events as NDJSON until interrupted.
+
+        One inotify instance watches the projects directory (for new project
+        directories) and every project directory; each wake-up reads only the
+        bytes appended to the transcripts that changed. Without inotify, or
+        after the event queue overflowed, the directories are re-listed
+        instead. Sessions that already exist are followed from their current
+        end without emitting events for past turns.
+
+        Events (all carry event, session_id and time):
+            created     a new transcript appeared (with its path)
+            user        a prompt typed by the user (timestamp, text preview)
+            assistant   a new assistant message (timestamp, message_id)
+            idle        no writes for idle_seconds (once per quiet period)
+            closed      no running claude process writes to the session any
+                        more and it was not written in the last
+                        WATCH_RECHECK_INTERVAL seconds (at most once per session)
 
         Args:
-            limit: Maximum number of sessions to return
-            cwd: Optional working directory to filter sessions by
+            idle_seconds: Quiet period before an idle event
+            cwd: Only watch sessions of this working directory
 
         Returns:
-            List of session dictionaries with metadata
+            True when stopped with Ctrl-C, False if the projects directory is missing
         """
         if not self.projects_dir.exists():
             print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
-            return []
+            return False
+        only_dir = self.projects_dir / escape_path(os.path.abspath(cwd)) if cwd else None
+        sessions = {}
 
-        try:
-            # Find all session files
-            session_files = []
-
-            if cwd:
-                # Search in specific project directory
-                escaped_path = escape_path(os.path.abspath(cwd))
-                project_dir = self.projects_dir / escaped_path
-                if project_dir.exists():
-                    session_files = [f for f in project_dir.glob("*.jsonl") if not f.name.startswith('agent-')]
-            else:
-                # Search all project directories
-                for project_dir in self.projects_dir.iterdir():
-                    if project_dir.is_dir():
-                        session_files.extend([f for f in project_dir.glob("*.jsonl") if not f.name.startswith('agent-')])
-
-            if not session_files:
-                return []
-
-            # Sort by last user message timestamp, newest first
-            def get_last_user_timestamp(session_file: Path) -> tuple:
-                """Extract the timestamp of the last user message from a session file.
-                
-                Returns a tuple (has_user_message, timestamp_str) to ensure proper sorting:
-                - Sessions with user messages sort before those without
-                - Among sessions with messages, timestamps sort chronologically
-                """
-                last_user_ts = None
-                try:
-                    with open(session_file, 'r') as f:
-                        for line in f:
-                            try:
-                                event = json.loads(line)
-                                if event.get('type') == 'user':
-                                    last_user_ts = event.get('timestamp')
-                            except:
-                                pass
-                except:
-                    pass
-                # Return tuple: (1, timestamp) for sessions with messages, (0, '') for others
-                # This ensures sessions with messages always sort first
-                return (1 if last_user_ts else 0, last_user_ts or '')
-            
-            session_files.sort(key=get_last_user_timestamp, reverse=True)
-
-            sessions = []
-            for session_file in session_files[:limit]:
-                try:
-                    session_id = session_file.stem
-                    first_user_msg = None
-                    timestamp = None
-                    session_cwd = None
-                    event_count = 0
-
-                    with open(session_file, 'r') as f:
-                        for line in f:
-                            event_count += 1
-                            try:
-                                event = json.loads(line)
-
-                                # Get first timestamp
-                                if not timestamp:
-                                    timestamp = event.get('timestamp')
-
-                                # Get cwd
-                                if not session_cwd:
-                                    session_cwd = event.get('cwd')
-
-                                # Get first user message (not meta)
-                                if not first_user_msg and event.get('type') == 'user' and not event.get('isMeta'):
-                                    msg = event.get('message', {})
-                                    content = msg.get('content', '')
-                                    if isinstance(content, str) and content:
-                                        first_user_msg = content.strip()[:100]
-                                    elif isinstance(content, list) and content:
-                                        for item in content:
-                                            if isinstance(item, dict) and item.get('type') == 'text':
-                                                first_user_msg = item.get('text', '').strip()[:100]
-                                                break
-                            except:
-                                continue
+        def emit(event: str, state: Dict, **fields):
+            now = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+            print(json_dumps({'event': event, 'session_id': state['session_id'], 'time': now, **fields}))
+            sys.stdout.flush()
 
-                    sessions.append({
-                        'session_id': session_id,
-                        'timestamp': timestamp,
-                        'time_ago': time_ago(timestamp) if timestamp else 'unknown',
-                        'cwd': session_cwd or 'unknown',
-                        'first_prompt': first_user_msg or 'N/A',
-                        'event_count': event_count,
-                        'file_path': str(session_file),
-                        'modified_at': datetime.fromtimestamp(session_file.stat().st_mtime).isoformat()
-                    })
-                except Exception as e:
-                    print(f"WARNING: Failed to parse {session_file}: {e}", file=sys.stderr)
+        def track(path: Path, existing: bool):
+            try:
+                st = path.stat()
+            except OSError:
+                return
+            state = {
+                'session_id': session_id_of(path), 'inode': st.st_ino, 'pos': 0, 'size': 0,
+                'active': time.monotonic(), 'idle': False, 'open': True, 'closed': False, 'message_id': None,
+            }
+            if existing:
+                # Follow from the start of the last (possibly incomplete) line
+                state['pos'] = state['size'] = st.st_size
+                if st.st_size:
+                    with open(path, 'rb') as f:
+                        f.seek(max(0, st.st_size - 64 * 1024))
+                        tail = f.read()
+                    nl = tail.rfind(b'\n')
+                    state['pos'] = st.st_size - len(tail) + nl + 1 if nl >= 0 else st.st_size
+                quiet = time.time() - st.st_mtime
+                state['active'] -= quiet
+                state['idle'] = quiet >= idle_seconds
+            sessions[str(path)] = state
+            if not existing:
+                emit('created', state, path=str(path))
+
+        def read_new(path: str, state: Dict):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+            if st.st_ino != state['inode'] or st.st_size < state['pos']:
+                # Replaced or truncated: start over
+                state['inode'], state['pos'], state['size'] = st.st_ino, 0, 0
+            if st.st_size == state['size']:
+                return
+            state['size'] = st.st_size
+            with open(path, 'rb') as f:
+                f.seek(state['pos'])
+                data = f.read()
+            if not data:
+                return
+            state['active'], state['idle'] = time.monotonic(), False
+            # Each process is paired with one transcript, so one still written
+            # after /clear or a resume may look unowned; close it only once
+            state['open'] = not state['closed']
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].split(b'\n')[:-1]:
+                turn = turn_event(line)
+                if turn is None:
                     continue
+                kind, fields = turn
+                if kind == 'assistant':
+                    # Assistant messages are written one content block per line
+                    if fields['message_id'] and fields['message_id'] == state['message_id']:
+                        continue
+                    state['message_id'] = fields['message_id']
+                emit(kind, state, **fields)
+            state['pos'] += end
 
-            return sessions
+        def scan_dir(project_dir: Path, existing: bool):
+            try:
+                with os.scandir(project_dir) as it:
+                    names = [entry.name for entry in it]
+            except OSError:
+                return
+            for name in names:
+                if not name.endswith('.jsonl') or name.startswith('agent-'):
+                    continue
+                key = str(project_dir / name)
+                if key not in sessions:
+                    track(project_dir / name, existing)
+                if key in sessions:
+                    read_new(key, sessions[key])
+
+        def project_dirs() -> List[Path]:
+            if only_dir is not None:
+                return [only_dir] if only_dir.is_dir() else []
+            return [Path(entry.path) for entry in os.scandir(self.projects_dir) if entry.is_dir()]
+
+        def rescan(watcher: FileWatcher, existing: bool = False):
+            for project_dir in project_dirs():
+                watcher.add(project_dir)
+                scan_dir(project_dir, existing)
+            for path in [path for path in sessions if not os.path.exists(path)]:
+                del sessions[path]
 
-        except Exception as e:
-            print(f"ERROR: Failed to list sessions: {e}", file=sys.stderr)
-            return []
+        try:
+            with FileWatcher() as watcher:
+                watcher.add(self.projects_dir)
+                rescan(watcher, existing=True)
+                live = live_transcripts(self.projects_dir)
+                if live is not None:
+                    for path, state in sessions.items():
+                        state['open'] = path in live
+                last_check = time.monotonic()
+
+                while True:
+                    now = time.monotonic()
+                    deadlines = [state['active'] + idle_seconds for state in sessions.values() if not state['idle']]
+                    timeout = min([WATCH_RECHECK_INTERVAL] + [deadline - now for deadline in deadlines])
+                    events = watcher.wait_events(max(0.0, timeout))
+
+                    if events is None:
+                        rescan(watcher)
+                    else:
+                        for path, mask in events:
+                            if mask & FileWatcher.IN_ISDIR:
+                                if mask & (FileWatcher.IN_CREATE | FileWatcher.IN_MOVED_TO) and path.parent == self.projects_dir \
+                                        and (only_dir is None or path == only_dir):
+                                    watcher.add(path)
+                                    scan_dir(path, existing=False)
+                                continue
+                            if not path.name.endswith('.jsonl') or path.name.startswith('agent-'):
+                                continue
+                            if only_dir is not None and path.parent != only_dir:
+                                continue
+                            key = str(path)
+                            if mask & (FileWatcher.IN_DELETE | FileWatcher.IN_MOVED_FROM):
+                                state = sessions.pop(key, None)
+                                if state and state['open']:
+                                    emit('closed', state)
+                                continue
+                            if key not in sessions:
+                                track(path, existing=False)
+                            if key in sessions:
+                                read_new(key, sessions[key])
+
+                    now = time.monotonic()
+                    for state in sessions.values():
+                        if not state['idle'] and now - state['active'] >= idle_seconds:
+                            state['idle'] = True
+                            emit('idle', state, seconds=int(now - state['active']))
+
+                    if now - last_check >= WATCH_RECHECK_INTERVAL:
+                        last_check = now
+                        if any(state['open'] for state in sessions.values()):
+                            live = live_transcripts(self.projects_dir)
+                            if live is not None:
+                                for path, state in sessions.items():
+                                    if state['open'] and path not in live and now - state['active'] >= WATCH_RECHECK_INTERVAL:
+                                        state['open'], state['closed'] = False, True
+                                        emit('closed', state)
+        except KeyboardInterrupt:
+            return True
 
-    def get_session_info(self, session_id: str) -> Optional[Dict]:
+    def query_events(self, predicates: List, since: Optional[str] = None, until: Optional[str] = None,
+                     fields: Optional[List[str]] = None, cwd: Optional[str] = None,
+                     session_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> bool:
         """
-        Get detailed info about a specific session.
+        Stream events matching field predicates across sessions as NDJSON.
+
+        Transcripts are scanned in parallel (oldest first) and each file's
+        matches are printed as soon as it and all earlier files are done.
+        Files last modified before --since are skipped without being opened.
 
         Args:
-            session_id: The session ID to look up
+            predicates: Parsed --where predicates (all must hold)
+            since: Earliest event timestamp (relative age or ISO)
+            until: Latest event timestamp (relative age or ISO)
+            fields: Dotted paths to output instead of whole events
+            cwd: Only sessions of this working directory
+            session_ids: Only these sessions
+            limit: Stop after this many events
 
         Returns:
-            Session metadata dict or None if not found
+            True if successful, False otherwise
         """
         if not self.projects_dir.exists():
             print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
-            return None
+            return False
 
         try:
-            # Search for session file in all project directories
-            for project_dir in self.projects_dir.iterdir():
-                if not project_dir.is_dir():
-                    continue
+            since_ts, since_epoch = parse_time_bound(since) if since else (None, None)
+            until_ts, _ = parse_time_bound(until) if until else (None, None)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return False
 
-                session_file = project_dir / f"{session_id}.jsonl"
-                if session_file.exists():
-                    # Parse session file
-                    first_user_msg = None
-                    timestamp = None
-                    session_cwd = None
-                    event_count = 0
-                    user_count = 0
-                    assistant_count = 0
-
-                    with open(session_file, 'r') as f:
-                        for line in f:
-                            event_count += 1
-                            try:
-                                event = json.loads(line)
-                                event_type = event.get('type')
-
-                                # Count event types
-                                if event_type == 'user':
-                                    user_count += 1
-                                elif event_type == 'assistant':
-                                    assistant_count += 1
-
-                                # Get first timestamp
-                                if not timestamp:
-                                    timestamp = event.get('timestamp')
-
-                                # Get cwd
-                                if not session_cwd:
-                                    session_cwd = event.get('cwd')
-
-                                # Get first user message (not meta)
-                                if not first_user_msg and event_type == 'user' and not event.get('isMeta'):
-                                    msg = event.get('message', {})
-                                    content = msg.get('content', '')
-                                    if isinstance(content, str) and content:
-                                        first_user_msg = content.strip()[:200]
-                                    elif isinstance(content, list) and content:
-                                        for item in content:
-                                            if isinstance(item, dict) and item.get('type') == 'text':
-                                                first_user_msg = item.get('text', '').strip()[:200]
-                                                break
-                            except:
-                                continue
+        entries = self._select_session_entries(session_ids, cwd, since_epoch)
+        if entries is None:
+            return False
+
+        items = [(str(path), predicates, since_ts, until_ts, fields) for path, _ in entries]
+        emitted = 0
+        for (path, _), (lines, error) in zip(entries, imap_parallel(_query_job, items, jobs=self.jobs, use_processes=True)):
+            if error is not None:
+                print(f"WARNING: Failed to query {path}: {error}", file=sys.stderr)
+                continue
+            for line in lines:
+                print(line)
+                emitted += 1
+                if limit is not None and emitted >= limit:
+                    sys.stdout.flush()
+                    return True
+            sys.stdout.flush()
+        return True
+
+    def search_sessions(self, query: str, limit: int = 20, cwd: Optional[str] = None,
+                        include_tools: bool = False, raw: bool = False) -> Optional[List[Dict]]:
+        """
+        Full-text search across all session transcripts.
 
-                    return {
-                        'session_id': session_id,
-                        'timestamp': timestamp,
-                        'time_ago': time_ago(timestamp) if timestamp else 'unknown',
-                        'cwd': session_cwd or 'unknown',
-                        'first_prompt': first_user_msg or 'N/A',
-                        'event_count': event_count,
-                        'user_messages': user_count,
-                        'assistant_messages': assistant_count,
-                        'file_path': str(session_file),
-                        'modified_at': datetime.fromtimestamp(session_file.stat().st_mtime).isoformat()
-                    }
+        The FTS index is updated incrementally before querying, so only
+        messages appended since the last search are read.
 
-            print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
+        Args:
+            query: Words to search for (or FTS5 syntax with raw)
+            limit: Maximum number of hits
+            cwd: Only search sessions of this working directory
+            include_tools: Also match tool names
+            raw: Treat query as an FTS5 expression
+
+        Returns:
+            List of hits, or None on error
+        """
+        if not self.projects_dir.exists():
+            print("ERROR: ~/.claude/projects/ directory not found", file=sys.stderr)
+            return None
+        if not self.index.has_fts:
+            print("ERROR: search requires SQLite with FTS5 support", file=sys.stderr)
             return None
 
-        except Exception as e:
-            print(f"ERROR: Failed to get session info: {e}", file=sys.stderr)
+        try:
+            session_files = [path for path, _ in self._scan_session_entries()]
+            self.index.sync_search(session_files, self.projects_dir)
+            under = self.projects_dir / escape_path(os.path.abspath(cwd)) if cwd else None
+            return self.index.search(query, limit, under, include_tools, raw)
+        except sqlite3.OperationalError as e:
+            print(f"ERROR: Invalid search query: {e}", file=sys.stderr)
             return None
 
-    def show_conversation(self, session_id: str, output_format: str = 'markdown') -> bool:
+    def show_conversation(self, session_id: str, output_format: str = 'markdown',
+                          tail: Optional[int] = None, first: Optional[int] = None,
+                          last: Optional[int] = None, page: Optional[int] = None,
+                          page_size: int = DEFAULT_PAGE_SIZE, follow: bool = False) -> bool:
         """
         Display conversation from a session in readable format.
 
+        Streams in a single pass: each message is written (and flushed) as soon
+        as its line is parsed, so memory stays bounded and output starts
+        immediately when piped to head or less. When a range is requested the
+        message offset index is used to seek straight to the selected lines.
+        With follow, keeps running after the current end of the file and
+        prints messages as they are appended, until interrupted.
+
         Args:
             session_id: The session ID to show
             output_format: 'markdown' or 'ndjson'
+            tail: Only show the last N messages
+            first: First message number to show (1-based)
+            last: Last message number to show (1-based, inclusive)
+            page: Page number to show (1-based)
+            page_size: Messages per page
+            follow: Keep streaming newly appended messages
 
         Returns:
             True if successful, False otherwise
@@ -399,116 +3367,101 @@ class ClaudeHelper:
 
         try:
             # Find session file
-            session_file = None
-            for project_dir in self.projects_dir.iterdir():
-                if not project_dir.is_dir():
-                    continue
-                candidate = project_dir / f"{session_id}.jsonl"
-                if candidate.exists():
-                    session_file = candidate
-                    break
+            session_file = self.index.lookup_session(session_id, self.projects_dir)
 
             if not session_file:
                 print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
                 return False
+            if follow and is_compressed(session_file):
+                print("ERROR: --follow is not possible for an archived (compressed) session", file=sys.stderr)
+                return False
 
-            # First pass: extract version safely
             version = None
-            try:
-                with open(session_file, 'r') as f:
-                    for line in f:
-                        try:
-                            event = json.loads(line)
-                            if event.get('version'):
-                                version = event['version']
-                                break
-                        except:
-                            continue
-            except Exception as e:
-                print(f"WARNING: Could not extract version: {e}", file=sys.stderr)
-
-            # Check version
-            if version and version != "2.0.37":
-                print(f"⚠️  WARNING: Conversation was created with Claude CLI version {version}", file=sys.stderr)
-                print(f"⚠️  Supported version is 2.0.37. Parsing may be inaccurate.\n", file=sys.stderr)
-
-            # Parse conversation
-            messages = []
+            header = f"\n# Conversation: {session_id}\n"
+            header_printed = output_format == 'ndjson'
+            message_count = 0
             skipped_lines = 0
-            line_number = 0
             try:
-                with open(session_file, 'r') as f:
-                    for line in f:
-                        line_number += 1
-                        try:
-                            event = json.loads(line)
-                            event_type = event.get('type')
-
-                            if event_type not in ('user', 'assistant'):
-                                continue
+                end_pos = 0
+                if any(option is not None for option in (tail, first, last, page)):
+                    offsets, end_pos = load_message_offsets(session_file, session_id)
+                    start, stop = select_message_range(len(offsets), tail, first, last, page, page_size)
+                    pages = -(-len(offsets) // page_size)
+                    if page is not None and page > max(pages, 1):
+                        print(f"ERROR: Page {page} is out of range; session has {len(offsets)} messages "
+                              f"in {pages} page(s) of {page_size}", file=sys.stderr)
+                        return False
+                    if start < stop:
+                        header = f"\n# Conversation: {session_id} (messages {start + 1}-{stop} of {len(offsets)})\n"
+                    lines = self._read_lines_at(session_file, offsets, start, stop)
+                    numbers = range(start + 1, stop + 1)
+                    total = len(offsets)
+                else:
+                    lines = self._read_lines(session_file)
+                    numbers = None
+
+                for location, line in lines:
+                    if numbers is None:
+                        # A trailing partial line is left for follow mode to complete
+                        if follow and not line.endswith(b'\n'):
+                            break
+                        end_pos += len(line)
+
+                    # Version comes from the first event that has one
+                    if version is None:
+                        version = probe_event(line, ('version',)).get('version')
+                        if version is None and len(line) < PROBE_MIN_LINE:
+                            try:
+                                version = json_loads(line).get('version')
+                            except:
+                                pass
+                        if version:
+                            warn_unsupported_version(version)
+                        else:
+                            version = None
 
-                            # Skip meta messages
-                            if event.get('isMeta'):
-                                continue
+                    if numbers is None:
+                        event_type = event_type_of(line)
+                        # Lines the prefilter cannot classify are decoded so malformed ones are reported
+                        if event_type not in ('user', 'assistant') and not (event_type is None and may_be_malformed(line)):
+                            continue
 
-                            timestamp = event.get('timestamp', '')
-                            message = event.get('message', {})
-                            content = message.get('content', '')
-
-                            # Extract text from content
-                            text_parts = []
-                            tool_uses = []
-                            tool_results = []
-
-                            if isinstance(content, str):
-                                text_parts.append(content)
-                            elif isinstance(content, list):
-                                for item in content:
-                                    if isinstance(item, dict):
-                                        item_type = item.get('type')
-                                        if item_type == 'text':
-                                            text_parts.append(item.get('text', ''))
-                                        elif item_type == 'tool_use':
-                                            tool_uses.append({
-                                                'name': item.get('name', 'unknown'),
-                                                'id': item.get('id', '')
-                                            })
-                                        elif item_type == 'tool_result':
-                                            tool_results.append({
-                                                'tool_use_id': item.get('tool_use_id', ''),
-                                                'is_error': item.get('is_error', False)
-                                            })
-
-                            messages.append({
-                                'type': event_type,
-                                'timestamp': timestamp,
-                                'text': '\n'.join(text_parts).strip(),
-                                'tool_uses': tool_uses,
-                                'tool_results': tool_results
-                            })
+                    message_count += 1
+                    try:
+                        message = parse_message(decode_message_line(line))
+                    except Exception as e:
+                        # Log malformed line
+                        skipped_lines += 1
+                        log_parse_error(session_id, location, line, e)
+                        message = None
+
+                    if message is None:
+                        if numbers is None:
+                            message_count -= 1
+                        continue
 
-                        except Exception as e:
-                            # Log malformed line
-                            skipped_lines += 1
-                            import traceback
-                            with open('/tmp/claude-helper-parse-errors.log', 'a') as f:
-                                f.write(f"\n{'='*60}\n")
-                                f.write(f"Timestamp: {datetime.now().isoformat()}\n")
-                                f.write(f"Session: {session_id}\n")
-                                f.write(f"Line: {line_number}\n")
-                                f.write(f"Error: {str(e)}\n")
-                                f.write(f"Content: {line[:200]}...\n" if len(line) > 200 else f"Content: {line}\n")
-                                f.write(traceback.format_exc())
-                                f.write(f"{'='*60}\n")
-                            continue
+                    if not header_printed:
+                        print(header)
+                        header_printed = True
+                    number = numbers[message_count - 1] if numbers is not None else message_count
+                    write_message(message, number, output_format)
+
+                if follow:
+                    if not header_printed:
+                        print(header)
+                        sys.stdout.flush()
+                        header_printed = True
+                    if numbers is None:
+                        total = message_count
+                    return self._follow_conversation(session_file, session_id, end_pos, total, output_format)
 
             except Exception as e:
                 error_msg = f"Error parsing conversation: {e}"
-                if version and version != "2.0.37":
+                if version and version != SUPPORTED_VERSION:
                     print(f"\n❌ PARSING FAILED: This conversation uses Claude CLI version {version}", file=sys.stderr)
-                    print(f"❌ Current parser was tested with version 2.0.37 only.", file=sys.stderr)
+                    print(f"❌ Current parser was tested with version {SUPPORTED_VERSION} only.", file=sys.stderr)
                     print(f"❌ Debug info written to /tmp/claude-helper-error.log\n", file=sys.stderr)
-                    
+
                     # Log error details
                     import traceback
                     with open('/tmp/claude-helper-error.log', 'a') as f:
@@ -522,78 +3475,438 @@ class ClaudeHelper:
                 else:
                     print(f"ERROR: {error_msg}", file=sys.stderr)
                 return False
-            
+
+            if not header_printed:
+                print(header)
+
             # Warn about skipped lines
             if skipped_lines > 0:
                 print(f"\n⚠️  WARNING: Skipped {skipped_lines} malformed line(s) during parsing", file=sys.stderr)
                 print(f"⚠️  Details written to /tmp/claude-helper-parse-errors.log\n", file=sys.stderr)
 
-            # Output
-            if output_format == 'ndjson':
-                for msg in messages:
-                    print(json.dumps(msg))
-            else:  # markdown
-                print(f"\n# Conversation: {session_id}\n")
-                for i, msg in enumerate(messages, 1):
-                    role = "👤 User" if msg['type'] == 'user' else "🤖 Assistant"
-                    print(f"## {i}. {role}")
-                    if msg['timestamp']:
-                        print(f"*{msg['timestamp']}*\n")
-                    
-                    if msg['text']:
-                        print(msg['text'])
-                    
-                    if msg['tool_uses']:
-                        print(f"\n**Tools called:** {', '.join(t['name'] for t in msg['tool_uses'])}")
-                    
-                    if msg['tool_results']:
-                        error_count = sum(1 for t in msg['tool_results'] if t['is_error'])
-                        if error_count:
-                            print(f"\n**Tool results:** {len(msg['tool_results'])} results ({error_count} errors)")
-                        else:
-                            print(f"\n**Tool results:** {len(msg['tool_results'])} results")
-                    
-                    print("\n" + "─" * 80 + "\n")
+            return True
+
+        except Exception as e:
+            print(f"ERROR: Failed to show conversation: {e}", file=sys.stderr)
+            return False
+
+    def _follow_conversation(self, session_file: Path, session_id: str, pos: int,
+                             count: int, output_format: str) -> bool:
+        """
+        Print messages appended to a transcript after byte pos until interrupted.
+
+        Only the new bytes are read on each wake-up; an incomplete last line is
+        buffered until its newline arrives.
+
+        Args:
+            session_file: Transcript to follow
+            session_id: Session ID (for parse error logs)
+            pos: Offset of the first byte not yet processed (a line start)
+            count: Number of messages already shown/numbered before pos
+            output_format: 'markdown' or 'ndjson'
+
+        Returns:
+            True when stopped with Ctrl-C
+        """
+        pending = b''
+        try:
+            with FileWatcher() as watcher, open(session_file, 'rb') as f:
+                watcher.add(session_file)
+                while True:
+                    f.seek(pos + len(pending))
+                    data = f.read()
+                    if not data:
+                        if os.stat(session_file).st_size < pos + len(pending):
+                            print("⚠️  WARNING: Transcript was truncated; following from the start", file=sys.stderr)
+                            pos, pending, count = 0, b'', 0
+                            continue
+                        watcher.wait(WATCH_RECHECK_INTERVAL)
+                        continue
+
+                    chunk = pending + data
+                    lines = chunk.split(b'\n')
+                    pending = lines.pop()
+                    for line in lines:
+                        line_start = pos
+                        pos += len(line) + 1
+                        if not is_message_line(line) and not (event_type_of(line) is None and may_be_malformed(line)):
+                            continue
+                        try:
+                            message = parse_message(decode_message_line(line))
+                        except Exception as e:
+                            log_parse_error(session_id, f"byte {line_start}", line, e)
+                            continue
+                        if message is None:
+                            continue
+                        count += 1
+                        write_message(message, count, output_format)
+        except KeyboardInterrupt:
+            return True
+
+    @staticmethod
+    def _read_lines(session_file: Path):
+        """Yield (line number, line) for every line of a transcript."""
+        with open_session_file(session_file) as f:
+            for line_number, line in enumerate(f, 1):
+                yield line_number, line
+
+    @staticmethod
+    def _read_lines_at(session_file: Path, offsets: array, start: int, stop: int):
+        """Yield (location, line) for the lines at offsets[start:stop]."""
+        with open_session_file(session_file, buffering=-1) as f:
+            for offset in offsets[start:stop]:
+                f.seek(offset)
+                yield f"byte {offset}", f.readline()
+
+
+def process_alive(pid: int) -> bool:
+    """True if the process exists and is not a zombie."""
+    try:
+        os.kill(pid, 0)  # Signal 0 just checks if process exists
+    except (ProcessLookupError, OSError):
+        return False
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            # State follows the parenthesised command name
+            return f.read().rsplit(b')', 1)[1].split()[0] != b'Z'
+    except (OSError, IndexError):
+        return True
+
+
+def process_cwd(pid: int) -> Optional[str]:
+    """Working directory of a process (Linux /proc only)."""
+    try:
+        return os.readlink(f"/proc/{pid}/cwd")
+    except OSError:
+        return None
+
+
+def process_start_time(pid: int) -> Optional[float]:
+    """
+    Epoch seconds at which a process started (Linux /proc only).
+
+    Truncated to clock ticks, so never later than the real start.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            # starttime (field 22, clock ticks after boot) follows the parenthesised command name
+            ticks = int(f.read().rsplit(b')', 1)[1].split()[19])
+        if hasattr(time, 'CLOCK_BOOTTIME'):
+            boot_time = time.time() - time.clock_gettime(time.CLOCK_BOOTTIME)
+        else:
+            with open("/proc/stat", 'rb') as f:
+                boot_time = next(int(line.split()[1]) for line in f if line.startswith(b'btime '))
+    except (OSError, IndexError, ValueError, StopIteration):
+        return None
+    return boot_time + ticks / os.sysconf('SC_CLK_TCK')
+
+
+def iter_process_tree(pid: int):
+    """Yield pid and all of its descendants (Linux /proc only)."""
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        yield current
+        try:
+            tids = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for tid in tids:
+            try:
+                with open(f"/proc/{current}/task/{tid}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except (OSError, ValueError):
+                continue
+
+
+def find_open_transcript(pid: int, root: Path) -> Optional[Path]:
+    """
+    Transcript under root that pid (or one of its children) has open.
+
+    Reads the /proc/<pid>/fd symlinks, so the cost depends on the number of
+    open descriptors rather than the number of transcripts on disk.
+
+    Args:
+        pid: Process to inspect
+        root: Directory transcripts live under
+
+    Returns:
+        Path of the open .jsonl file, or None if none is open (or /proc is unavailable)
+    """
+    prefix = str(root) + os.sep
+    for proc in iter_process_tree(pid):
+        try:
+            fds = os.listdir(f"/proc/{proc}/fd")
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(f"/proc/{proc}/fd/{fd}")
+            except OSError:
+                continue
+            if target.startswith(prefix) and target.endswith('.jsonl') and not os.path.basename(target).startswith('agent-'):
+                return Path(target)
+    return None
+
+
+def running_claude_pids(cwd: Optional[str] = None) -> Optional[List[int]]:
+    """
+    PIDs of running claude processes (matched on the first two argv entries).
+
+    Args:
+        cwd: Only processes running in this working directory
+
+    Returns:
+        List of PIDs, or None where /proc is unavailable
+    """
+    try:
+        pids = [name for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return None
+    found = []
+    for pid in pids:
+        if cwd is not None and process_cwd(int(pid)) != cwd:
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                argv = f.read().split(b'\0')
+        except OSError:
+            continue
+        if any(os.path.basename(arg) == b'claude' or arg.endswith(b'/claude/cli.js') or b'claude-code' in arg
+               for arg in argv[:2]):
+            found.append(int(pid))
+    return found
+
+
+def assign_transcripts(pids: List[int], projects_dir: Path) -> Dict[int, Path]:
+    """
+    Transcript each of the given claude processes writes to, where it can be told.
+
+    Claude appends to its transcript without keeping it open, so an open file
+    only settles it while a write is in progress. Otherwise the processes of a
+    project directory are paired, in start order, with the transcripts created
+    after they started: each takes the earliest-created one that no process
+    has claimed yet. A process left without one (e.g. it resumed an older
+    session) gets the transcript written since its start only if exactly one
+    such transcript is unclaimed.
+
+    Args:
+        pids: Claude processes to resolve (others running in the same
+            directories should be included, or their transcripts may be taken)
+        projects_dir: ~/.claude/projects
+
+    Returns:
+        {pid: transcript path} for the processes that could be resolved
+    """
+    assigned = {}
+    by_dir = {}
+    for pid in pids:
+        path = find_open_transcript(pid, projects_dir)
+        if path is not None:
+            assigned[pid] = path
+            continue
+        cwd = process_cwd(pid)
+        start = process_start_time(pid)
+        if cwd and start is not None:
+            by_dir.setdefault(projects_dir / escape_path(cwd), []).append((start, pid))
+    claimed = set(assigned.values())
+
+    for project_dir, procs in by_dir.items():
+        procs.sort()
+        # (creation time, mtime, path) of unclaimed transcripts written since the first start
+        written = []
+        try:
+            with os.scandir(project_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.jsonl') or entry.name.startswith('agent-'):
+                        continue
+                    mtime = entry.stat().st_mtime
+                    path = Path(entry.path)
+                    if mtime >= procs[0][0] and path not in claimed:
+                        written.append((parse_timestamp(read_first_timestamp(path)), mtime, path))
+        except OSError:
+            continue
+        created = sorted((ctime, str(path), path) for ctime, _, path in written if ctime is not None)
+
+        unresolved = []
+        for start, pid in procs:
+            match = next((path for ctime, _, path in created if ctime >= start and path not in claimed), None)
+            if match is None:
+                unresolved.append((start, pid))
+                continue
+            assigned[pid] = match
+            claimed.add(match)
+        for start, pid in unresolved:
+            rest = [path for _, mtime, path in written if mtime >= start and path not in claimed]
+            if len(rest) == 1:
+                assigned[pid] = rest[0]
+                claimed.add(rest[0])
+    return assigned
+
+
+def find_transcript_for_pid(pid: int, projects_dir: Path) -> Optional[Path]:
+    """
+    Transcript a claude process (or a claude child of it) writes to, None if unknown.
+
+    An open transcript settles it from /proc/<pid>/fd alone. Otherwise it is
+    resolved together with the other claude processes running in the same
+    directory, so sessions started side by side are told apart (see
+    assign_transcripts). That costs one pass over /proc, a stat of each
+    transcript in the process's project directory and a read of the first
+    line of those written since the earliest of those processes started;
+    other project directories are not looked at.
+    """
+    path = find_open_transcript(pid, projects_dir)
+    if path is not None:
+        return path
+    cwd = process_cwd(pid)
+    if not cwd:
+        return None
+    tree = set(iter_process_tree(pid))
+    others = [other for other in running_claude_pids(cwd) or [] if other not in tree]
+    return assign_transcripts(others + [pid], projects_dir).get(pid)
+
+
+def live_transcripts(projects_dir: Path) -> Optional[set]:
+    """
+    Transcripts that running claude processes are writing to.
+
+    Returns:
+        Set of transcript path strings, or None where /proc is unavailable
+    """
+    pids = running_claude_pids()
+    if pids is None:
+        return None
+    return {str(path) for path in assign_transcripts(pids, projects_dir).values()}
+
+
+def turn_event(line: bytes) -> Optional[Tuple[str, Dict]]:
+    """
+    Classify a transcript line for the watch event stream.
+
+    Returns:
+        ('user', fields) for a prompt typed by the user, ('assistant', fields)
+        for an assistant message (once per message ID is up to the caller),
+        or None for tool results, meta messages and other events
+    """
+    if not is_message_line(line):
+        return None
+    try:
+        event = decode_message_line(line)
+    except Exception:
+        return None
+    message = parse_message(event)
+    if message is None:
+        return None
+    if message['type'] == 'user':
+        if message['tool_results'] or not message['text'].strip():
+            return None
+        text = ' '.join(message['text'].split())
+        return 'user', {'timestamp': message['timestamp'], 'text': text[:200]}
+    fields = {'timestamp': message['timestamp'], 'message_id': (event.get('message') or {}).get('id')}
+    return 'assistant', fields
 
-            return True
 
-        except Exception as e:
-            print(f"ERROR: Failed to show conversation: {e}", file=sys.stderr)
-            return False
+def open_pidfd(pid: int) -> Optional[int]:
+    """A descriptor that becomes readable when pid exits, where supported."""
+    try:
+        return os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return None
 
 
-def ensure_start(pid: int, log_path: str) -> bool:
+def ensure_start(pid: int, log_path: str, timeout: float = 10.0) -> bool:
     """
     Verify that a claude task started successfully.
 
+    Instead of sleeping for a fixed time, watches the log file and the
+    task's project directory and returns as soon as the outcome is known:
+    the process is alive and has written log output or created its session
+    transcript, or the process has exited. timeout bounds the wait.
+
     Checks:
-    1. Process is still alive after sleep
+    1. Process is still alive (or completed with output)
     2. Log file exists and has content (or task completed)
     3. No startup errors in first lines
 
     Args:
         pid: Process ID to check
         log_path: Path to log file
+        timeout: Maximum seconds to wait for the task to become ready
 
     Returns:
         True if all checks pass, False otherwise
     """
     log_file = Path(log_path)
     start_time = datetime.now()
+    started = time.monotonic()
 
-    # Sleep 10 seconds to let process initialize and session file be written
-    print(f"⌛ Waiting 10 seconds for initialization...", file=sys.stderr)
-    time.sleep(10)
+    helper = ClaudeHelper()
+    project_dir = helper.projects_dir / escape_path(process_cwd(pid) or os.getcwd())
 
-    # Check if process is still alive
-    try:
-        os.kill(pid, 0)  # Signal 0 just checks if process exists
-        is_alive = True
-    except (ProcessLookupError, OSError):
-        is_alive = False
+    def list_transcripts() -> Set[str]:
+        try:
+            with os.scandir(project_dir) as it:
+                return {entry.name for entry in it
+                        if entry.name.endswith('.jsonl') and not entry.name.startswith('agent-')}
+        except OSError:
+            return set()
+
+    # Writes to transcripts that already existed may come from other agents
+    # in the same directory, so only transcripts created since the launch count
+    known = list_transcripts()
+
+    def new_transcripts() -> List[str]:
+        return sorted(list_transcripts() - known)
+
+    print(f"⌛ Waiting up to {timeout:g} seconds for initialization...", file=sys.stderr)
+
+    pidfd = open_pidfd(pid)
+    ready_reason = None
+    ready_after = None
+    open_transcript = None
+    with FileWatcher() as watcher:
+        # Directory watches also report writes to the files inside them
+        watcher.add(log_file.parent)
+        watcher.add(helper.projects_dir)
+        project_watched = watcher.add(project_dir)
+        settle_until = None
+        while True:
+            is_alive = process_alive(pid)
+            has_logs = log_file.exists() and log_file.stat().st_size > 0
+            if is_alive:
+                open_transcript = find_open_transcript(pid, helper.projects_dir) or open_transcript
+            created = new_transcripts()
+            now = time.monotonic()
+
+            if ready_reason is None:
+                if not is_alive:
+                    ready_reason = "process exited"
+                elif has_logs or created or open_transcript:
+                    ready_reason = "log output" if has_logs else "session transcript written"
+                    settle_until = now + STARTUP_SETTLE_SECONDS
+                if ready_reason:
+                    ready_after = now - started
+
+            if not is_alive or (settle_until is not None and now >= settle_until):
+                break
+            if ready_reason is None and now - started >= timeout:
+                break
+
+            if not project_watched and project_dir.exists():
+                project_watched = watcher.add(project_dir)
+            deadline = settle_until if settle_until is not None else started + timeout
+            remaining = deadline - now
+            if pidfd is None:
+                remaining = min(remaining, POLL_INTERVAL)
+            watcher.wait(min(remaining, WATCH_RECHECK_INTERVAL), (pidfd,) if pidfd is not None else ())
+    if pidfd is not None:
+        os.close(pidfd)
 
-    # Check log file
-    has_logs = log_file.exists() and log_file.stat().st_size > 0
     elapsed = datetime.now() - start_time
 
     # Read first lines of log
@@ -618,23 +3931,20 @@ def ensure_start(pid: int, log_path: str) -> bool:
         for line in log_lines
     )
 
-    # Get session ID - for ensure-start, we want the most recently CREATED/MODIFIED file
-    # since the user message might not be written to disk yet
-    helper = ClaudeHelper()
+    # Get session ID - prefer the transcript the process had open, then the new
+    # transcript paired with it by start time (several agents may have been
+    # launched side by side), then the only transcript created since the launch.
+    # Never guess from other transcripts: their writes may be another agent's
     session_id = None
-    try:
-        # Find all session files
-        session_files = []
-        for project_dir in helper.projects_dir.iterdir():
-            if project_dir.is_dir():
-                session_files.extend([f for f in project_dir.glob("*.jsonl") if not f.name.startswith('agent-')])
-        
-        if session_files:
-            # Sort by modification time (most recent first) - this catches newly created sessions
-            session_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-            session_id = session_files[0].stem
-    except:
-        pass
+    if open_transcript:
+        session_id = open_transcript.stem
+    else:
+        created = new_transcripts()
+        own = find_transcript_for_pid(pid, helper.projects_dir) if is_alive else None
+        if own is not None and own.name in created:
+            session_id = own.stem
+        elif len(created) == 1:
+            session_id = Path(created[0]).stem
 
     # Print results
     print()
@@ -648,6 +3958,10 @@ def ensure_start(pid: int, log_path: str) -> bool:
     print(f"Log File:        {log_path} ({log_file.stat().st_size if has_logs else 0} bytes)")
     print(f"Session ID:      {session_id or 'Not yet available'}")
     print(f"Start Time:      {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    if ready_reason:
+        print(f"Ready After:     {ready_after:.2f}s ({ready_reason})")
+    else:
+        print(f"Ready After:     not detected within {timeout:g}s")
     print(f"Elapsed:         {elapsed.total_seconds():.1f}s")
     print()
 
@@ -744,23 +4058,72 @@ Get session ID:
   $ claude-helper get-id                # Latest
   $ claude-helper get-id --nth 2        # 2nd most recent
   $ claude-helper get-id --cwd /path    # Latest in specific directory
+  $ claude-helper get-id --pid $PID     # Session of a running claude process
 
 List sessions:
   $ claude-helper list
   $ claude-helper list --limit 50 --json
   $ claude-helper list --cwd /project   # Filter by directory
+  $ claude-helper list --json --cursor  # {cursor, sessions}; poll with:
+  $ claude-helper list --json --since-cursor $CURSOR   # only added/changed sessions
 
 Session details:
   $ claude-helper info 7a2c19a1-8555-4a4b-942f-8a5a5def79ea
 
+Find the session where something was discussed:
+  $ claude-helper search "rate limiter"
+  $ claude-helper search Bash --tools --cwd /project
+  $ claude-helper search 'auth* NEAR(token expiry)' --raw
+
+Token usage and estimated cost:
+  $ claude-helper usage                          # Most expensive sessions
+  $ claude-helper usage --by cwd --since 7d
+  $ claude-helper usage --by month --json
+
+Interleaved view of agents working side by side (merged by timestamp):
+  $ claude-helper timeline $API_SESSION $UI_SESSION $TESTS_SESSION
+  $ claude-helper timeline --cwd /project --since 2h --format ndjson
+
+Find slow or failing tools (tool_use paired with its tool_result):
+  $ claude-helper tool-stats SESSION_ID
+  $ claude-helper tool-stats --cwd /project --since 1d
+
+React to sessions starting, talking and finishing instead of polling list:
+  $ claude-helper watch                          # NDJSON: created, user, assistant, idle, closed
+  $ claude-helper watch --cwd /project --idle 120
+
+Make metadata queries on huge finished sessions O(1):
+  $ claude-helper compact                        # summaries for every finished session
+  $ claude-helper compact --min-mb 100           # only big transcripts
+  info, list, usage and tool-stats then read the summary instead of the transcript
+  until it changes (a resumed session falls back to scanning until compacted again).
+
+Reclaim disk space from old transcripts (all commands keep reading them):
+  $ claude-helper archive --older-than 30d --dry-run
+  $ claude-helper archive --older-than 30d --format zst
+  Note: claude itself cannot resume an archived session; decompress it first
+  (gunzip / unzstd the .jsonl.gz / .jsonl.zst file) before `claude --resume`.
+
+Filter raw events across sessions (NDJSON, one event per line):
+  $ claude-helper query --where tool_use.name=Bash --since 1d --fields session_id,timestamp,tool_use.input.command
+  $ claude-helper query --where type=assistant --where message.model~opus --cwd /project --limit 50
+  $ claude-helper query --where tool_result.is_error=true --fields session_id,timestamp
+
 View conversation (alternative to reading logs):
   $ claude-helper show-conversation 7a2c19a1-8555-4a4b-942f-8a5a5def79ea
   $ claude-helper show-conversation SESSION_ID --format ndjson
+  $ claude-helper show-conversation SESSION_ID --tail 20    # Last 20 messages
+  $ claude-helper show-conversation SESSION_ID --from 40 --to 60
+  $ claude-helper show-conversation SESSION_ID --page 3 --page-size 25
+  $ claude-helper show-conversation SESSION_ID --tail 5 --follow   # Watch a live session
   
   Note: This shows the actual conversation history with Claude,
   including user prompts and assistant responses. Useful for checking
   what work was done in background tasks.
 
+Session metadata is cached in ~/.cache/claude-helper/index.sqlite and only
+changed transcripts are re-read. The cache is safe to delete at any time.
+
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 📊 MONITORING
@@ -810,10 +4173,10 @@ claude -p --dangerously-skip-permissions "Write tests" > /tmp/tests.log 2>&1 &
 TESTS_PID=$!
 claude-helper ensure-start --pid $TESTS_PID --logs /tmp/tests.log
 
-# Get their session IDs
-API_SESSION=$(claude-helper get-id --nth 3)
-UI_SESSION=$(claude-helper get-id --nth 2)
-TESTS_SESSION=$(claude-helper get-id --nth 1)
+# Get their session IDs (by PID, so concurrent starts cannot be mixed up)
+API_SESSION=$(claude-helper get-id --pid $API_PID)
+UI_SESSION=$(claude-helper get-id --pid $UI_PID)
+TESTS_SESSION=$(claude-helper get-id --pid $TESTS_PID)
 
 # Monitor
 claude-helper list --limit 3
@@ -869,12 +4232,33 @@ wait $API_PID $UI_PID $TESTS_PID
 🛠️  claude-helper Commands
 
   get-id [--nth N] [--cwd PATH]                Get Nth most recent session ID
+  get-id --pid PID                             Get the session a running process writes to
   list [--limit N] [--cwd PATH] [--json]       List recent sessions
+    [--cursor | --since-cursor CURSOR]         Incremental polling: only sessions changed since CURSOR
   info <session-id>                            Get detailed session info
+  search <query> [--cwd PATH] [--tools]        Full-text search of messages (ranked, with snippets)
+  query --where F=V [--since T] [--fields F,..]  Stream matching events across sessions (NDJSON)
+  usage [--by session|cwd|day|month|model]     Token usage and estimated cost
+  tool-stats [SESSION_ID..] [--cwd] [--since]  Tool latency p50/p95/max and error rate
+  timeline [SESSION_ID..] [--cwd PATH]         Messages of several sessions interleaved by time
+  watch [--idle SEC] [--cwd PATH]              Stream session lifecycle events (NDJSON)
+  compact [SESSION_ID..] [--cwd] [--min-mb N]  Summarize finished sessions for O(1) info/list/usage/tool-stats
+  archive --older-than AGE [--format gz|zst]   Compress old transcripts in place
+    [--dry-run] [--cwd PATH]                   (keeps mtime and index rows; no --follow on archives)
   show-conversation <session-id> [--format]    Display conversation (markdown/ndjson)
+    [--tail N | --from N [--to M] | --page N]  Only show some messages (numbered as in full output)
+    [--follow]                                 Keep printing new messages as they are appended
   ensure-start --pid <PID> --logs <PATH>       Verify task started successfully
+    [--timeout SEC]                            Returns as soon as ready (default: up to 10s)
+  bench-json [FILES] [--max-mb N]              Benchmark JSON backends (MB/s, s/GB)
   guide                                        Show this guide
 
+  get-id, list, search, query, usage, tool-stats and compact accept --jobs N to scan changed transcripts in parallel
+  (default: number of CPUs).
+
+  Parsing uses orjson or pysimdjson when installed (stdlib json otherwise);
+  force one with CLAUDE_HELPER_JSON=orjson|simdjson|json.
+
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 """
@@ -909,6 +4293,17 @@ def main():
         type=str,
         help="Filter sessions by working directory"
     )
+    getid_parser.add_argument(
+        "--pid",
+        type=int,
+        help="Session of a running claude process (ignores --nth/--cwd)"
+    )
+    getid_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for scanning changed transcripts (default: {DEFAULT_JOBS})"
+    )
 
     # list command
     list_parser = subparsers.add_parser(
@@ -931,6 +4326,23 @@ def main():
         type=str,
         help="Filter sessions by working directory"
     )
+    list_parser.add_argument(
+        "--cursor",
+        action="store_true",
+        help="Also print a cursor for a later --since-cursor call (with --json: {cursor, sessions})"
+    )
+    list_parser.add_argument(
+        "--since-cursor",
+        type=str,
+        metavar="CURSOR",
+        help="Only sessions added or changed since CURSOR was printed (ignores --limit, prints the next cursor)"
+    )
+    list_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for scanning changed transcripts (default: {DEFAULT_JOBS})"
+    )
 
     # info command
     info_parser = subparsers.add_parser(
@@ -942,12 +4354,336 @@ def main():
         help="Session ID to look up"
     )
 
+    # usage command
+    usage_parser = subparsers.add_parser(
+        "usage",
+        help="Token usage and estimated cost per session, cwd, day, month or model"
+    )
+    usage_parser.add_argument(
+        "--by",
+        choices=['session', 'cwd', 'day', 'month', 'model'],
+        default='session',
+        help="Grouping (default: session)"
+    )
+    usage_parser.add_argument(
+        "--since",
+        type=str,
+        help="First day to include (e.g. 30d, 2025-11-01)"
+    )
+    usage_parser.add_argument(
+        "--until",
+        type=str,
+        help="Last day to include"
+    )
+    usage_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only sessions of this working directory"
+    )
+    usage_parser.add_argument(
+        "--session",
+        type=str,
+        help="Only this session"
+    )
+    usage_parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Maximum number of rows (most expensive first; 0 = all)"
+    )
+    usage_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+    usage_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for reading changed transcripts (default: {DEFAULT_JOBS})"
+    )
+
+    # tool-stats command
+    toolstats_parser = subparsers.add_parser(
+        "tool-stats",
+        help="Per-tool latency percentiles and error rates"
+    )
+    toolstats_parser.add_argument(
+        "session_ids",
+        nargs="*",
+        help="Sessions to analyse (default: all sessions, or those of --cwd)"
+    )
+    toolstats_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only sessions of this working directory"
+    )
+    toolstats_parser.add_argument(
+        "--since",
+        type=str,
+        help="Only tool calls at or after this time (e.g. 1d, 2025-11-10)"
+    )
+    toolstats_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+    toolstats_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for scanning transcripts (default: {DEFAULT_JOBS})"
+    )
+
+    # timeline command
+    timeline_parser = subparsers.add_parser(
+        "timeline",
+        help="Interleave the messages of several sessions by time"
+    )
+    timeline_parser.add_argument(
+        "session_ids",
+        nargs="*",
+        help="Sessions to merge (default: all sessions of --cwd)"
+    )
+    timeline_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Merge all sessions of this working directory (default: current directory)"
+    )
+    timeline_parser.add_argument(
+        "--since",
+        type=str,
+        help="Only messages at or after this time (e.g. 2h, 2025-11-10T12:00:00Z)"
+    )
+    timeline_parser.add_argument(
+        "--until",
+        type=str,
+        help="Only messages at or before this time"
+    )
+    timeline_parser.add_argument(
+        "--limit",
+        type=int,
+        help="Stop after N messages"
+    )
+    timeline_parser.add_argument(
+        "--format",
+        type=str,
+        choices=['text', 'ndjson'],
+        default='text',
+        help="Output format (default: text)"
+    )
+
+    # query command
+    query_parser = subparsers.add_parser(
+        "query",
+        help="Stream events matching field predicates across sessions (NDJSON)"
+    )
+    query_parser.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        metavar="FIELD=VALUE",
+        help="Predicate on a dotted field path: FIELD=VALUE, FIELD!=VALUE or FIELD~REGEX "
+             "(repeatable; tool_use.name / tool_result.is_error select message content items)"
+    )
+    query_parser.add_argument(
+        "--since",
+        type=str,
+        help="Only events at or after this time (e.g. 1d, 6h, 2025-11-10T12:00:00Z)"
+    )
+    query_parser.add_argument(
+        "--until",
+        type=str,
+        help="Only events at or before this time"
+    )
+    query_parser.add_argument(
+        "--fields",
+        type=str,
+        help="Comma-separated dotted paths to output instead of whole events (e.g. session_id,timestamp,tool_use.name)"
+    )
+    query_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only sessions of this working directory"
+    )
+    query_parser.add_argument(
+        "--session",
+        action="append",
+        dest="sessions",
+        metavar="SESSION_ID",
+        help="Only this session (repeatable)"
+    )
+    query_parser.add_argument(
+        "--limit",
+        type=int,
+        help="Stop after N events"
+    )
+    query_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for scanning transcripts (default: {DEFAULT_JOBS})"
+    )
+
+    # search command
+    search_parser = subparsers.add_parser(
+        "search",
+        help="Full-text search over session messages"
+    )
+    search_parser.add_argument(
+        "query",
+        help="Words to search for (all must match)"
+    )
+    search_parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Maximum number of hits to show"
+    )
+    search_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only search sessions of this working directory"
+    )
+    search_parser.add_argument(
+        "--tools",
+        action="store_true",
+        help="Also match tool names"
+    )
+    search_parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Pass the query to SQLite FTS5 as-is (OR, NEAR, \"phrases\", prefix*)"
+    )
+    search_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+    search_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for indexing changed transcripts (default: {DEFAULT_JOBS})"
+    )
+
+    # watch command
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Stream session lifecycle events (created, turns, idle, closed) as NDJSON"
+    )
+    watch_parser.add_argument(
+        "--idle",
+        type=float,
+        default=60.0,
+        help="Seconds without writes before an idle event (default: 60)"
+    )
+    watch_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only watch sessions of this working directory"
+    )
+
+    # compact command
+    compact_parser = subparsers.add_parser(
+        "compact",
+        help="Write summaries of finished sessions so metadata queries skip their transcripts"
+    )
+    compact_parser.add_argument(
+        "session_ids",
+        nargs="*",
+        metavar="SESSION_ID",
+        help="Sessions to compact (default: all finished sessions)"
+    )
+    compact_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only compact sessions of this working directory"
+    )
+    compact_parser.add_argument(
+        "--min-mb",
+        type=float,
+        default=0.0,
+        help="Skip transcripts smaller than this many MB"
+    )
+    compact_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild summaries that are still current"
+    )
+    compact_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+    compact_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for summarizing transcripts (default: {DEFAULT_JOBS})"
+    )
+
+    # archive command
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="Compress transcripts not modified for a while (.jsonl.gz / .jsonl.zst)"
+    )
+    archive_parser.add_argument(
+        "--older-than",
+        type=str,
+        required=True,
+        help="Archive transcripts last modified before this (e.g. 30d, 2w, 2025-11-01)"
+    )
+    archive_parser.add_argument(
+        "--format",
+        choices=["gz", "zst"],
+        default="gz",
+        help="Compression format (zst needs Python 3.14+ or the zstandard package; default: gz)"
+    )
+    archive_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only list the transcripts that would be compressed"
+    )
+    archive_parser.add_argument(
+        "--cwd",
+        type=str,
+        help="Only archive sessions of this working directory"
+    )
+    archive_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+
     # guide command
     guide_parser = subparsers.add_parser(
         "guide",
         help="Show comprehensive guide for AI agents"
     )
 
+    # bench-json command
+    bench_parser = subparsers.add_parser(
+        "bench-json",
+        help="Benchmark JSON decode throughput of installed backends"
+    )
+    bench_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Files to sample (default: largest transcripts)"
+    )
+    bench_parser.add_argument(
+        "--max-mb",
+        type=int,
+        default=256,
+        help="Maximum megabytes to sample (default: 256)"
+    )
+    bench_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+
     # show-conversation command
     show_parser = subparsers.add_parser(
         "show-conversation",
@@ -964,6 +4700,44 @@ def main():
         default='markdown',
         help="Output format (default: markdown)"
     )
+    range_group = show_parser.add_mutually_exclusive_group()
+    range_group.add_argument(
+        "--tail",
+        type=int,
+        metavar="N",
+        help="Show only the last N messages"
+    )
+    range_group.add_argument(
+        "--from",
+        dest="first",
+        type=int,
+        metavar="N",
+        help="First message number to show (1-based)"
+    )
+    range_group.add_argument(
+        "--page",
+        type=int,
+        metavar="N",
+        help="Show page N (1-based) of --page-size messages"
+    )
+    show_parser.add_argument(
+        "--to",
+        dest="last",
+        type=int,
+        metavar="N",
+        help="Last message number to show (inclusive)"
+    )
+    show_parser.add_argument(
+        "--follow", "-f",
+        action="store_true",
+        help="Keep running and print messages as they are appended (Ctrl-C to stop)"
+    )
+    show_parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f"Messages per page for --page (default: {DEFAULT_PAGE_SIZE})"
+    )
 
     # ensure-start command
     ensure_parser = subparsers.add_parser(
@@ -982,6 +4756,12 @@ def main():
         required=True,
         help="Path to the log file"
     )
+    ensure_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        help="Maximum seconds to wait for the task to become ready (default: 10)"
+    )
 
     args = parser.parse_args()
 
@@ -989,11 +4769,16 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    helper = ClaudeHelper()
+    helper = ClaudeHelper(jobs=max(1, getattr(args, 'jobs', DEFAULT_JOBS)))
 
     try:
         if args.command == "get-id":
-            session_id = helper.get_latest_session_id(args.nth, show_time=True, cwd=getattr(args, 'cwd', None))
+            if args.pid is not None:
+                session_id = helper.get_session_id_for_pid(args.pid)
+                if not session_id:
+                    print(f"ERROR: No session found for PID {args.pid}", file=sys.stderr)
+            else:
+                session_id = helper.get_latest_session_id(args.nth, show_time=True, cwd=getattr(args, 'cwd', None))
             if session_id:
                 print(session_id)
                 sys.exit(0)
@@ -1001,13 +4786,29 @@ def main():
                 sys.exit(1)
 
         elif args.command == "list":
-            sessions = helper.list_sessions(args.limit, cwd=getattr(args, 'cwd', None))
-            if not sessions:
-                print("No sessions found", file=sys.stderr)
-                sys.exit(1)
+            cursor = None
+            if args.since_cursor:
+                try:
+                    since_mtime_ns = parse_list_cursor(args.since_cursor)
+                except ValueError as e:
+                    parser.error(str(e))
+                cursor = new_list_cursor()
+                sessions = helper.list_changed_sessions(since_mtime_ns, cwd=args.cwd)
+                if sessions is None:
+                    sys.exit(1)
+            else:
+                if args.cursor:
+                    cursor = new_list_cursor()
+                sessions = helper.list_sessions(args.limit, cwd=getattr(args, 'cwd', None))
+                if not sessions:
+                    print("No sessions found", file=sys.stderr)
+                    sys.exit(1)
 
             if args.json:
-                print(json.dumps(sessions, indent=2))
+                if cursor is not None:
+                    print(json_dumps({'cursor': cursor, 'sessions': sessions}, indent=True))
+                else:
+                    print(json_dumps(sessions, indent=True))
             else:
                 print(f"\n{'SESSION ID':<37} {'TIME':<18} {'CWD':<30} {'PROMPT':<40}")
                 print("─" * 130)
@@ -1029,6 +4830,9 @@ def main():
 
                     print(f"{session_id:<37} {time_ago_str:<18} {cwd:<30} {prompt:<40}")
                 print()
+                if cursor is not None:
+                    print(f"Cursor: {cursor}")
+                    print()
 
         elif args.command == "info":
             info = helper.get_session_info(args.session_id)
@@ -1043,22 +4847,202 @@ def main():
                 print(f"AI Messages:    {info.get('assistant_messages', 0)}")
                 print(f"Modified:       {info.get('modified_at', 'N/A')}")
                 print(f"First Prompt:   {info.get('first_prompt', 'N/A')}")
+                if 'last_prompt' in info:
+                    print(f"Last Prompt:    {info['last_prompt']}")
+                    print(f"CLI Version:    {info['version'] or 'N/A'}")
+                    print(f"Tool Calls:     {info['tool_calls']}")
                 print(f"File:           {info.get('file_path', 'N/A')}")
                 print()
                 sys.exit(0)
             else:
                 sys.exit(1)
 
+        elif args.command == "usage":
+            rows = helper.get_usage(args.by, since=args.since, until=args.until,
+                                    cwd=args.cwd, session_id=args.session)
+            if rows is None:
+                sys.exit(1)
+            if not rows:
+                print("No usage found", file=sys.stderr)
+                sys.exit(1)
+            if args.limit > 0:
+                # Most recent periods for day/month, most expensive groups otherwise
+                rows = rows[-args.limit:] if args.by in ('day', 'month') else rows[:args.limit]
+
+            if args.json:
+                print(json_dumps(rows, indent=True))
+            else:
+                label = args.by.upper()
+                width = 37 if args.by in ('session', 'cwd', 'model') else 12
+                print(f"\n{label:<{width}} {'MSGS':>7} {'INPUT':>12} {'CACHE WRITE':>12} {'CACHE READ':>14} {'OUTPUT':>12} {'EST. COST':>11}")
+                print("─" * (width + 77))
+                totals = [0] * 6
+                for row in rows:
+                    group = str(row[args.by] or 'N/A')
+                    if len(group) > width - 1:
+                        group = '...' + group[-(width - 4):]
+                    values = [row['messages'], row['input_tokens'], row['cache_creation_tokens'],
+                              row['cache_read_tokens'], row['output_tokens'], row['estimated_cost_usd']]
+                    totals = [total + value for total, value in zip(totals, values)]
+                    cost = f"${row['estimated_cost_usd']:.2f}" + ('*' if row['unpriced_models'] else '')
+                    print(f"{group:<{width}} {values[0]:>7} {values[1]:>12,} {values[2]:>12,} {values[3]:>14,} {values[4]:>12,} {cost:>11}")
+                print("─" * (width + 77))
+                print(f"{'TOTAL':<{width}} {totals[0]:>7} {totals[1]:>12,} {totals[2]:>12,} {totals[3]:>14,} {totals[4]:>12,} {'$' + format(totals[5], '.2f'):>11}")
+                if any(row['unpriced_models'] for row in rows):
+                    print("\n* includes models without a known price (not counted in the cost)")
+                print("\nCosts are estimates at list prices and exclude any discounts.")
+                print()
+            sys.exit(0)
+
+        elif args.command == "tool-stats":
+            stats = helper.tool_stats(args.session_ids or None, cwd=args.cwd, since=args.since)
+            if stats is None:
+                sys.exit(1)
+            if not stats:
+                print("No tool calls found", file=sys.stderr)
+                sys.exit(1)
+
+            if args.json:
+                print(json_dumps(stats, indent=True))
+            else:
+                def seconds(value):
+                    return f"{value:.2f}s" if value is not None else 'N/A'
+
+                print(f"\n{'TOOL':<30} {'CALLS':>7} {'ERRORS':>7} {'ERR %':>7} {'P50':>9} {'P95':>9} {'MAX':>9} {'TOTAL':>10}")
+                print("─" * 95)
+                for row in stats:
+                    error_rate = f"{row['error_rate'] * 100:.1f}" if row['error_rate'] is not None else 'N/A'
+                    print(f"{row['tool'][:29]:<30} {row['calls']:>7} {row['errors']:>7} {error_rate:>7} "
+                          f"{seconds(row['p50_s']):>9} {seconds(row['p95_s']):>9} {seconds(row['max_s']):>9} {seconds(row['total_s']):>10}")
+                pending = sum(row['calls'] - row['completed'] for row in stats)
+                if pending:
+                    print(f"\n{pending} call(s) without a result yet are excluded from latency and error rate.")
+                print()
+            sys.exit(0)
+
+        elif args.command == "timeline":
+            result = helper.show_timeline(
+                args.session_ids or None, cwd=args.cwd, since=args.since, until=args.until,
+                limit=args.limit, output_format=args.format
+            )
+            sys.exit(0 if result else 1)
+
+        elif args.command == "query":
+            try:
+                predicates = [parse_where(expression) for expression in args.where]
+            except (ValueError, re.error) as e:
+                parser.error(str(e))
+            fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+            result = helper.query_events(
+                predicates, since=args.since, until=args.until, fields=fields,
+                cwd=args.cwd, session_ids=args.sessions, limit=args.limit
+            )
+            sys.exit(0 if result else 1)
+
+        elif args.command == "search":
+            hits = helper.search_sessions(args.query, args.limit, cwd=args.cwd,
+                                          include_tools=args.tools, raw=args.raw)
+            if hits is None:
+                sys.exit(1)
+            if not hits:
+                print("No matches found", file=sys.stderr)
+                sys.exit(1)
+
+            if args.json:
+                print(json_dumps(hits, indent=True))
+            else:
+                for hit in hits:
+                    print(f"{hit['session_id']}  {hit['timestamp'] or 'N/A'}  {hit['role']}")
+                    print(f"    {hit['snippet']}")
+                print()
+            sys.exit(0)
+
         elif args.command == "show-conversation":
-            result = helper.show_conversation(args.session_id, args.format)
+            if (args.tail is not None or args.page is not None) and args.last is not None:
+                parser.error("--to can only be combined with --from")
+            if args.page is not None and (args.page < 1 or args.page_size < 1):
+                parser.error("--page and --page-size must be at least 1")
+            if args.tail is not None and args.tail < 0:
+                parser.error("--tail must not be negative")
+            result = helper.show_conversation(
+                args.session_id, args.format,
+                tail=args.tail, first=args.first, last=args.last,
+                page=args.page, page_size=args.page_size, follow=args.follow
+            )
             sys.exit(0 if result else 1)
 
+        elif args.command == "watch":
+            sys.exit(0 if helper.watch_sessions(idle_seconds=args.idle, cwd=args.cwd) else 1)
+
+        elif args.command == "compact":
+            compacted = helper.compact_sessions(args.session_ids or None, cwd=args.cwd,
+                                                min_bytes=int(args.min_mb * 1e6), force=args.force)
+            if compacted is None:
+                sys.exit(1)
+            if args.json:
+                print(json_dumps(compacted, indent=True))
+                sys.exit(0)
+            if not compacted:
+                print("No sessions to compact", file=sys.stderr)
+                sys.exit(0)
+            for entry in compacted:
+                print(f"{entry['session_id']}  {entry['size'] / 1e6:>9.2f} MB  {entry['event_count']:>8} events  {entry['tool_calls']:>6} tool calls")
+            print(f"\nCompacted {len(compacted)} session(s), {sum(entry['size'] for entry in compacted) / 1e6:.2f} MB of transcripts")
+            sys.exit(0)
+
+        elif args.command == "archive":
+            archived = helper.archive_sessions(args.older_than, fmt=args.format,
+                                               dry_run=args.dry_run, cwd=args.cwd)
+            if archived is None:
+                sys.exit(1)
+            if args.json:
+                print(json_dumps(archived, indent=True))
+                sys.exit(0)
+            if not archived:
+                print("No transcripts to archive", file=sys.stderr)
+                sys.exit(0)
+            for entry in archived:
+                if args.dry_run:
+                    print(f"{entry['session_id']}  {entry['size'] / 1e6:>9.2f} MB")
+                else:
+                    ratio = entry['compressed_size'] / entry['size'] if entry['size'] else 1.0
+                    print(f"{entry['session_id']}  {entry['size'] / 1e6:>9.2f} MB -> {entry['compressed_size'] / 1e6:>8.2f} MB  ({ratio:.0%})")
+            before = sum(entry['size'] for entry in archived)
+            if args.dry_run:
+                print(f"\n{len(archived)} transcript(s), {before / 1e6:.2f} MB would be compressed")
+            else:
+                after = sum(entry['compressed_size'] for entry in archived)
+                print(f"\nArchived {len(archived)} transcript(s): {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+            sys.exit(0)
+
         elif args.command == "guide":
             print_guide()
             sys.exit(0)
 
+        elif args.command == "bench-json":
+            if args.files:
+                paths = [Path(f) for f in args.files]
+            else:
+                paths = sorted(helper._find_session_files(), key=lambda p: p.stat().st_size, reverse=True)
+            results = benchmark_json(paths, args.max_mb)
+            if not results:
+                print("No transcript data to benchmark", file=sys.stderr)
+                sys.exit(1)
+
+            if args.json:
+                print(json_dumps(results, indent=True))
+            else:
+                sample = results[0]
+                print(f"\nSample: {sample['bytes'] / 1e6:.1f} MB, {sample['lines']} lines (active backend: {JSON_BACKEND})")
+                print(f"\n{'BACKEND':<12} {'MB/s':>10} {'s/GB':>10} {'ERRORS':>8}")
+                print("─" * 44)
+                for result in results:
+                    print(f"{result['backend']:<12} {result['mb_per_s']:>10.1f} {result['seconds_per_gb']:>10.2f} {result['errors']:>8}")
+                print()
+            sys.exit(0)
+
         elif args.command == "ensure-start":
-            result = ensure_start(args.pid, args.logs)
+            result = ensure_start(args.pid, args.logs, timeout=args.timeout)
             sys.exit(0 if result else 1)
 
     except KeyboardInterrupt:
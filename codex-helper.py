@@ -11,13 +11,125 @@ AI agents should call codex commands directly and use this for queries only.
 """
 
 import argparse
+import base64
+import ctypes
+import ctypes.util
+import gzip
+import io
+import itertools
 import json
+import re
+import select
+import shutil
+import sqlite3
+import struct
 import sys
 import time
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
+
+DEFAULT_JOBS = os.cpu_count() or 1
+
+# Large buffered reads for forward scans of rollout files
+SCAN_BUFFER_SIZE = 1024 * 1024
+
+# Seconds between checks when inotify is unavailable (and safety re-check interval otherwise)
+POLL_INTERVAL = 0.5
+WATCH_RECHECK_INTERVAL = 5.0
+
+# Grace period after a task looks ready, to catch immediate crashes
+STARTUP_SETTLE_SECONDS = 0.5
+
+# Newest rollouts remembered by ensure-start to spot the one a task creates
+RECENT_ROLLOUTS = 64
+
+# Rollout files indexed per batch (and commit) when updating the search index
+SEARCH_BATCH_FILES = 64
+
+# File timestamps come from a coarse kernel clock; list cursors start this much
+# before the scan so a write racing the scan is reported again rather than lost
+CURSOR_SLACK_NS = 1_000_000_000
+
+# rollout-2025-11-10T12-34-56-<uuid>.jsonl (.jsonl.gz / .jsonl.zst once archived)
+ROLLOUT_NAME_RE = re.compile(
+    r'^rollout-(\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2})-'
+    r'([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\.jsonl(?:\.gz|\.zst)?$'
+)
+
+# Rollout file names: live sessions, and sessions compressed by archive
+ROLLOUT_SUFFIXES = ('.jsonl', '.jsonl.gz', '.jsonl.zst')
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
+
+# Optional fast JSON backends, preferred in this order when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# zstd for archived rollouts: the stdlib module (Python 3.14+) or the zstandard package
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _stdlib_dumps(obj, indent: bool = False) -> str:
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def _orjson_dumps(obj, indent: bool = False) -> str:
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+
+
+def available_json_backends() -> Dict[str, Tuple[Callable, Callable]]:
+    """Installed JSON backends as name -> (loads, dumps), fastest first."""
+    backends = {}
+    if orjson is not None:
+        backends['orjson'] = (orjson.loads, _orjson_dumps)
+    if simdjson is not None:
+        # pysimdjson only parses; encoding goes through the best other backend
+        backends['simdjson'] = (simdjson.loads, _orjson_dumps if orjson is not None else _stdlib_dumps)
+    backends['json'] = (json.loads, _stdlib_dumps)
+    return backends
+
+
+def select_json_backend(name: Optional[str] = None) -> str:
+    """
+    Bind json_loads/json_dumps to a backend.
+
+    Args:
+        name: Backend name (orjson, simdjson, json); defaults to the fastest installed one
+
+    Returns:
+        Name of the selected backend
+    """
+    global json_loads, json_dumps, JSON_BACKEND
+    backends = available_json_backends()
+    if name and name not in backends:
+        print(f"WARNING: JSON backend '{name}' is not installed, using {next(iter(backends))}", file=sys.stderr)
+        name = None
+    JSON_BACKEND = name or next(iter(backends))
+    json_loads, json_dumps = backends[JSON_BACKEND]
+    return JSON_BACKEND
+
+
+json_loads = json.loads
+json_dumps = _stdlib_dumps
+JSON_BACKEND = 'json'
+select_json_backend(os.environ.get('CODEX_HELPER_JSON'))
 
 
 def time_ago(timestamp_str: str) -> str:
@@ -63,154 +175,1594 @@ def time_ago(timestamp_str: str) -> str:
         return "unknown time ago"
 
 
+def parse_time_bound(value: str) -> Tuple[str, float]:
+    """
+    Resolve a time bound to (ISO timestamp, epoch seconds).
+
+    Accepts relative ages (30m, 12h, 7d, 2w) or ISO timestamps/dates in UTC.
+
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    match = re.fullmatch(r'(\d+)([smhdw])', value.strip())
+    if match:
+        unit = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}[match.group(2)]
+        moment = datetime.now(timezone.utc) - timedelta(**{unit: int(match.group(1))})
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z", moment.timestamp()
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}' (use e.g. 2d, 12h, 2025-11-10 or 2025-11-10T12:00:00Z)")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return value, moment.timestamp()
+
+
+def new_list_cursor() -> str:
+    """
+    Opaque cursor for list --since-cursor, taken before the listing it belongs to.
+
+    Encodes a modification-time watermark: a later listing with this cursor
+    reports every rollout file whose mtime is at or after it.
+    """
+    watermark = time.time_ns() - CURSOR_SLACK_NS
+    return base64.urlsafe_b64encode(json.dumps({'v': 1, 'mtime_ns': watermark}).encode()).decode().rstrip('=')
+
+
+def parse_list_cursor(cursor: str) -> int:
+    """
+    Watermark (mtime in ns) of a cursor made by new_list_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if data.get('v') != 1:
+            raise ValueError
+        return int(data['mtime_ns'])
+    except Exception:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def run_parallel(func: Callable, items: List, jobs: int = 1, use_processes: bool = False) -> List:
+    """
+    Apply func to every item on a worker pool, preserving input order.
+
+    Threads suit I/O-bound work such as stat calls; processes suit
+    JSON-heavy file scans that would otherwise serialize on the GIL.
+    With a single job (or item) everything runs inline.
+
+    Args:
+        func: Module-level callable (must be picklable for processes)
+        items: Work items
+        jobs: Maximum number of workers
+        use_processes: Use a process pool instead of a thread pool
+
+    Returns:
+        List of results in the same order as items
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    workers = min(jobs, len(items))
+    if use_processes:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items, chunksize=max(1, len(items) // (workers * 4))))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def is_candidate_line(line: bytes, need_sandbox: bool, need_prompt: bool) -> bool:
+    """
+    Cheap byte-level check whether a rollout line can carry the sandbox or first prompt.
+
+    Lines that cannot be a turn_context or a user response_item are rejected
+    without json.loads; most lines are large tool outputs and reasoning items.
+    """
+    if need_sandbox and b'turn_context' in line:
+        return True
+    return need_prompt and b'response_item' in line and b'"user"' in line
+
+
+def count_remaining_lines(f) -> int:
+    """Count the lines left in a binary file by counting newlines in large blocks."""
+    count = 0
+    last = b''
+    while True:
+        block = f.read(SCAN_BUFFER_SIZE)
+        if not block:
+            break
+        count += block.count(b'\n')
+        last = block
+    if last and not last.endswith(b'\n'):
+        count += 1
+    return count
+
+
+def scan_rollout_file(session_file: Path) -> Optional[Dict]:
+    """
+    Extract list metadata (id, cwd, first prompt, sandbox) from a rollout file.
+
+    Args:
+        session_file: Path to the rollout .jsonl file
+
+    Returns:
+        Session dict, or None if the file is empty
+    """
+    with open_rollout_file(session_file) as f:
+        first_line = f.readline()
+        if not first_line:
+            return None
+
+        data = json_loads(first_line)
+        payload = data.get('payload', {})
+
+        # Extract first prompt and sandbox from events
+        first_prompt = None
+        sandbox_policy = None
+        for line in itertools.chain([first_line], f):
+            if not is_candidate_line(line, need_sandbox=not sandbox_policy, need_prompt=True):
+                continue
+            try:
+                event = json_loads(line)
+                # Get sandbox from turn_context
+                if not sandbox_policy and event.get('type') == 'turn_context':
+                    sp = event.get('payload', {}).get('sandbox_policy')
+                    if isinstance(sp, dict):
+                        sandbox_policy = sp.get('mode')
+                    elif isinstance(sp, str):
+                        sandbox_policy = sp
+                # Get first actual user message (skip environment_context)
+                if event.get('type') == 'response_item':
+                    event_payload = event.get('payload', {})
+                    if event_payload.get('role') == 'user':
+                        content = event_payload.get('content', [])
+                        if content and len(content) > 0:
+                            text = content[0].get('text', '') or ''
+                            # Skip environment_context messages
+                            if text and '<environment_context>' not in text:
+                                first_prompt = text.strip()[:50]
+                                if first_prompt and sandbox_policy:
+                                    break
+            except:
+                continue
+
+        timestamp = payload.get('timestamp')
+        return {
+            'session_id': payload.get('id'),
+            'timestamp': timestamp,
+            'time_ago': time_ago(timestamp) if timestamp else 'unknown',
+            'cwd': payload.get('cwd'),
+            'model_provider': payload.get('model_provider'),
+            'source': payload.get('source'),
+            'sandbox_policy': sandbox_policy,
+            'first_prompt': first_prompt or '',
+            'file_path': str(session_file),
+            'modified_at': datetime.fromtimestamp(session_file.stat().st_mtime).isoformat()
+        }
+
+
+def _scan_rollout_job(path: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """Worker entry point: scan one rollout file, returning (session, error)."""
+    try:
+        return scan_rollout_file(Path(path)), None
+    except Exception as e:
+        return None, str(e)
+
+
+def read_rollout_info(session_file: Path) -> Dict:
+    """
+    Detailed metadata of a rollout file (info): session_meta fields, sandbox,
+    first prompt and event count.
+
+    Decoding stops once the sandbox and first prompt are known; the rest of
+    the file is only counted.
+    """
+    with open_rollout_file(session_file) as f:
+        first_line = f.readline()
+        payload = json_loads(first_line).get('payload', {}) if first_line else {}
+
+        # Extract additional info
+        event_count = 0
+        first_prompt = None
+        sandbox_policy = None
+
+        for line in itertools.chain([first_line] if first_line else [], f):
+            event_count += 1
+            if not is_candidate_line(line, need_sandbox=not sandbox_policy, need_prompt=not first_prompt):
+                continue
+            try:
+                event = json_loads(line)
+                # Get sandbox from turn_context
+                if not sandbox_policy and event.get('type') == 'turn_context':
+                    sp = event.get('payload', {}).get('sandbox_policy')
+                    if isinstance(sp, dict):
+                        sandbox_policy = sp.get('mode')
+                    elif isinstance(sp, str):
+                        sandbox_policy = sp
+                # Get first actual user message (skip environment_context)
+                if not first_prompt and event.get('type') == 'response_item':
+                    event_payload = event.get('payload', {})
+                    if event_payload.get('role') == 'user':
+                        content = event_payload.get('content', [])
+                        if content and len(content) > 0:
+                            text = content[0].get('text', '') or ''
+                            if text and '<environment_context>' not in text:
+                                first_prompt = text.strip()[:100]
+            except:
+                continue
+            if first_prompt and sandbox_policy:
+                # Nothing left to decode - just count events
+                event_count += count_remaining_lines(f)
+                break
+
+    return {
+        'timestamp': payload.get('timestamp'),
+        'cwd': payload.get('cwd'),
+        'model_provider': payload.get('model_provider'),
+        'cli_version': payload.get('cli_version'),
+        'source': payload.get('source'),
+        'sandbox_policy': sandbox_policy,
+        'first_prompt': first_prompt or 'N/A',
+        'event_count': event_count,
+    }
+
+
+def read_rollout_activity(session_file: Path) -> Dict:
+    """
+    Last user prompt, tool calls per tool name and latest token usage of a rollout file.
+
+    Returns:
+        Dict with last_prompt, tool_calls ({name: count}) and token_usage
+        (total_token_usage of the last token_count event, None if there is none)
+    """
+    last_prompt = None
+    tool_calls = {}
+    token_usage = None
+    with open_rollout_file(session_file) as f:
+        for line in f:
+            if b'"token_count"' in line:
+                try:
+                    info = json_loads(line).get('payload', {}).get('info') or {}
+                except Exception:
+                    continue
+                token_usage = info.get('total_token_usage') or token_usage
+                continue
+            if b'response_item' not in line:
+                continue
+            try:
+                event = json_loads(line)
+            except Exception:
+                continue
+            if event.get('type') != 'response_item':
+                continue
+            payload = event.get('payload', {})
+            if payload.get('type') in ('function_call', 'custom_tool_call') and payload.get('name'):
+                tool_calls[payload['name']] = tool_calls.get(payload['name'], 0) + 1
+            elif payload.get('role') == 'user':
+                content = payload.get('content') or []
+                text = (content[0].get('text', '') or '') if content and isinstance(content[0], dict) else ''
+                if text.strip() and '<environment_context>' not in text:
+                    last_prompt = text.strip()[:100]
+    return {'last_prompt': last_prompt, 'tool_calls': tool_calls, 'token_usage': token_usage}
+
+
+def extract_search_rows(session_file: Path, offset: int = 0) -> Tuple[List[Tuple[str, str, str, str]], int]:
+    """
+    Searchable messages and tool calls in a rollout file from byte offset on.
+
+    Only complete lines are read, so an append in progress is picked up by
+    the next call starting at the returned offset. environment_context
+    messages are skipped.
+
+    Args:
+        session_file: Rollout file to read
+        offset: Line-aligned byte offset to start at
+
+    Returns:
+        ([(timestamp, role, text, tool names)], offset after the last complete line)
+    """
+    rows = []
+    pos = offset
+    with open_rollout_file(session_file) as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            pos += len(line)
+            if b'response_item' not in line:
+                continue
+            try:
+                event = json_loads(line)
+            except Exception:
+                continue
+            if event.get('type') != 'response_item':
+                continue
+            payload = event.get('payload', {})
+            timestamp = event.get('timestamp', '')
+            item_type = payload.get('type')
+            if item_type == 'message' and payload.get('role') in ('user', 'assistant'):
+                content = payload.get('content') or []
+                text = '\n'.join(
+                    item.get('text', '') or '' for item in content
+                    if isinstance(item, dict) and item.get('type') in ('input_text', 'output_text')
+                ).strip()
+                if text and '<environment_context>' not in text:
+                    rows.append((timestamp, payload['role'], text, ''))
+            elif item_type in ('function_call', 'custom_tool_call') and payload.get('name'):
+                rows.append((timestamp, 'assistant', '', payload['name']))
+    return rows, pos
+
+
+def _search_scan_job(item: Tuple[str, int]) -> Tuple[Optional[List], int, Optional[str]]:
+    """Worker entry point: extract searchable rows, returning (rows, new offset, error)."""
+    path, offset = item
+    try:
+        rows, pos = extract_search_rows(Path(path), offset)
+        return rows, pos, None
+    except Exception as e:
+        return None, offset, str(e)
+
+
+def benchmark_json(paths: List[Path], max_mb: int = 256) -> List[Dict]:
+    """
+    Measure transcript decode throughput of every installed JSON backend.
+
+    Lines are loaded into memory first so only decoding is timed.
+
+    Args:
+        paths: Transcript files to sample, in order
+        max_mb: Stop sampling after this many megabytes
+
+    Returns:
+        One result dict per backend (bytes, lines, seconds, mb_per_s, seconds_per_gb)
+    """
+    budget = max_mb * 1024 * 1024
+    lines = []
+    total = 0
+    for path in paths:
+        if total >= budget:
+            break
+        try:
+            with open_rollout_file(path) as f:
+                for line in f:
+                    lines.append(line)
+                    total += len(line)
+                    if total >= budget:
+                        break
+        except OSError as e:
+            print(f"WARNING: Cannot read {path}: {e}", file=sys.stderr)
+
+    results = []
+    if not total:
+        return results
+
+    for name, (loads, _) in available_json_backends().items():
+        errors = 0
+        start = time.perf_counter()
+        for line in lines:
+            try:
+                loads(line)
+            except ValueError:
+                errors += 1
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        results.append({
+            'backend': name,
+            'bytes': total,
+            'lines': len(lines),
+            'errors': errors,
+            'seconds': round(elapsed, 4),
+            'mb_per_s': round(total / elapsed / 1e6, 1),
+            'seconds_per_gb': round(elapsed * 1e9 / total, 2),
+        })
+    return results
+
+
+def parse_rollout_name(name: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a rollout file name into its start time and session ID.
+
+    Args:
+        name: File name such as rollout-2025-11-10T12-34-56-<uuid>.jsonl
+
+    Returns:
+        (start time as YYYY-MM-DDTHH-MM-SS, session ID), or None for other names
+    """
+    match = ROLLOUT_NAME_RE.match(name)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def iter_rollouts_newest_first(sessions_dir: Path):
+    """
+    Yield rollout files ordered by session start time, newest first.
+
+    Walks the YYYY/MM/DD partitions in descending order and sorts each day by
+    the start time in the file name, so callers that stop after N sessions
+    only list the newest few day directories.
+
+    Yields:
+        Paths of rollout files
+    """
+    def subdirs(path: str) -> List[str]:
+        try:
+            return sorted(
+                (entry.path for entry in os.scandir(path) if entry.is_dir() and entry.name.isdigit()),
+                reverse=True
+            )
+        except OSError:
+            return []
+
+    for year_dir in subdirs(str(sessions_dir)):
+        for month_dir in subdirs(year_dir):
+            for day_dir in subdirs(month_dir):
+                try:
+                    names = [entry.name for entry in os.scandir(day_dir) if entry.name.endswith(ROLLOUT_SUFFIXES)]
+                except OSError:
+                    continue
+                # Newest start time first; unrecognised names go after all parsed ones of the day
+                names.sort(key=lambda n: (parse_rollout_name(n) is not None, n), reverse=True)
+                for name in names:
+                    yield Path(day_dir) / name
+
+
+def is_compressed(session_file) -> bool:
+    """True for rollouts compressed by archive (read-only, never appended to)."""
+    return str(session_file).endswith(COMPRESSED_SUFFIXES)
+
+
+def open_rollout_file(session_file: Path, buffering: int = SCAN_BUFFER_SIZE):
+    """
+    Open a rollout file for binary reading, decompressing .gz and .zst on the fly.
+
+    Compressed streams support forward seeks only (by decompressing up to
+    the offset), which is all the sequential readers need.
+
+    Raises:
+        OSError: If the file cannot be opened, or it is .zst and neither
+            compression.zstd nor the zstandard package is available
+    """
+    name = str(session_file)
+    if name.endswith('.gz'):
+        return gzip.open(session_file, 'rb')
+    if name.endswith('.zst'):
+        if zstd is not None:
+            return zstd.open(session_file, 'rb')
+        if zstandard is not None:
+            reader = zstandard.ZstdDecompressor().stream_reader(open(session_file, 'rb'), closefd=True)
+            return io.BufferedReader(reader, SCAN_BUFFER_SIZE)
+        raise OSError(f"{session_file}: reading .zst needs Python 3.14+ or the zstandard package")
+    return open(session_file, 'rb', buffering=buffering)
+
+
+def compress_rollout(session_file: Path, fmt: str = 'gz') -> Path:
+    """
+    Replace a rollout file with a compressed copy that keeps its mtime.
+
+    The copy is written to a temporary name and renamed into place; the
+    original is only removed if it did not change while being compressed.
+
+    Args:
+        session_file: Plain .jsonl rollout file
+        fmt: 'gz' or 'zst'
+
+    Returns:
+        Path of the compressed file
+
+    Raises:
+        OSError: If compression fails, zstd is unavailable or the file changed meanwhile
+    """
+    target = session_file.with_name(f"{session_file.name}.{fmt}")
+    tmp = session_file.with_name(f".{target.name}.{os.getpid()}.tmp")
+    before = session_file.stat()
+    try:
+        with open(session_file, 'rb') as src:
+            if fmt == 'gz':
+                dst = gzip.open(tmp, 'wb', compresslevel=6)
+            elif zstd is not None:
+                dst = zstd.open(tmp, 'wb')
+            elif zstandard is not None:
+                dst = zstandard.ZstdCompressor(level=10).stream_writer(open(tmp, 'wb'), closefd=True)
+            else:
+                raise OSError("writing .zst needs Python 3.14+ or the zstandard package")
+            with dst:
+                shutil.copyfileobj(src, dst, SCAN_BUFFER_SIZE)
+        after = session_file.stat()
+        if (after.st_ino, after.st_size, after.st_mtime_ns) != (before.st_ino, before.st_size, before.st_mtime_ns):
+            raise OSError(f"{session_file} changed while being compressed")
+        os.utime(tmp, ns=(before.st_atime_ns, before.st_mtime_ns))
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    session_file.unlink()
+    return target
+
+
+def get_cache_dir() -> Path:
+    """Directory for helper-owned caches (honours XDG_CACHE_HOME)."""
+    base = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / ".cache")
+    return Path(base) / "codex-helper"
+
+
+def read_rollout_id(session_file: Path) -> Optional[str]:
+    """Session ID of a rollout file: from its name, else from the session_meta header."""
+    parsed = parse_rollout_name(session_file.name)
+    if parsed:
+        return parsed[1]
+    try:
+        with open_rollout_file(session_file, buffering=-1) as f:
+            first_line = f.readline()
+        return json_loads(first_line).get('payload', {}).get('id') if first_line else None
+    except Exception:
+        return None
+
+
+def read_rollout_meta(session_file: Path) -> Dict:
+    """Payload of a rollout's session_meta header (id, timestamp, cwd, ...), {} if unreadable."""
+    try:
+        with open_rollout_file(session_file, buffering=-1) as f:
+            first_line = f.readline()
+        payload = json_loads(first_line).get('payload') if first_line else None
+    except Exception:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def meta_start_time(meta: Dict) -> Optional[float]:
+    """Epoch seconds of a session_meta timestamp, None if missing or invalid."""
+    try:
+        moment = datetime.fromisoformat(meta['timestamp'].replace('Z', '+00:00'))
+    except (KeyError, AttributeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+# Compaction summaries written by compact; bumped whenever their fields change
+SUMMARY_VERSION = 1
+
+
+def summary_path(session_id: str) -> Path:
+    """Sidecar file holding the compaction summary of a session."""
+    return get_cache_dir() / "summaries" / f"{session_id}.json"
+
+
+def build_session_summary(session_file: Path) -> Optional[Dict]:
+    """
+    Everything list and info need from a rollout file, in one dict.
+
+    Built with the same scanners the commands use, so answers from a summary
+    match a scan of the raw file. The size and mtime are taken before
+    reading: if the file grows meanwhile, the summary is simply never used.
+
+    Returns:
+        Summary dict, or None for an empty file
+    """
+    st = session_file.stat()
+    listed = scan_rollout_file(session_file)
+    if listed is None:
+        return None
+    return {
+        'summary_version': SUMMARY_VERSION,
+        'session_id': read_rollout_id(session_file),
+        'file_path': str(session_file),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'list': listed,
+        'info': read_rollout_info(session_file),
+        **read_rollout_activity(session_file),
+    }
+
+
+def _summary_job(path: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """Worker entry point: build one compaction summary, returning (summary, error)."""
+    try:
+        return build_session_summary(Path(path)), None
+    except Exception as e:
+        return None, str(e)
+
+
+def write_session_summary(summary: Dict):
+    """Store a compaction summary (atomically replacing an older one)."""
+    sidecar = summary_path(summary['session_id'])
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(json_dumps(summary))
+    os.replace(tmp, sidecar)
+
+
+def load_session_summary(session_file: Path, st: os.stat_result) -> Optional[Dict]:
+    """
+    Compaction summary of a rollout file, if one was written for its current contents.
+
+    Args:
+        session_file: Rollout file (its session ID names the sidecar)
+        st: Current stat of the file; size and mtime must match the summary
+
+    Returns:
+        Summary dict, or None if there is none or the file changed since
+    """
+    session_id = read_rollout_id(session_file)
+    if not session_id:
+        return None
+    try:
+        with open(summary_path(session_id), 'rb') as f:
+            summary = json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(summary, dict) or summary.get('summary_version') != SUMMARY_VERSION \
+            or summary.get('size') != st.st_size or summary.get('mtime_ns') != st.st_mtime_ns:
+        return None
+    return summary
+
+
+def move_session_summary(old_stat: os.stat_result, new_file: Path):
+    """Point a current summary at the compressed file that replaced its rollout."""
+    summary = load_session_summary(new_file, old_stat)
+    if summary is None:
+        return
+    st = new_file.stat()
+    summary.update(file_path=str(new_file), size=st.st_size, mtime_ns=st.st_mtime_ns)
+    summary['list']['file_path'] = str(new_file)
+    try:
+        write_session_summary(summary)
+    except OSError:
+        pass
+
+
+class SessionIndex:
+    """
+    Persistent SQLite map of session ID -> rollout file.
+
+    Kept current incrementally: a directory's mtime changes whenever an entry
+    is added or removed, so a sync only lists directories whose mtime moved.
+    IDs come from file names; only rollout files with unrecognised names have
+    their header read.
+    """
+
+    SCHEMA_VERSION = 2
+
+    TABLES = ('dirs', 'session_paths', 'search_files', 'search_fts')
+
+    # Directories modified this recently may still change within the same mtime tick
+    RACY_MTIME_NS = 2 * 10**9
+
+    # sessions/YYYY/MM/DD/rollout-*.jsonl
+    TREE_DEPTH = 3
+
+    def __init__(self, db_path: Path, jobs: int = 1):
+        self.db_path = db_path
+        self.jobs = jobs
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(db_path), timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self._init_schema()
+        except (sqlite3.Error, OSError) as e:
+            # Cache is an optimization only - keep working without persistence
+            print(f"WARNING: Session index unavailable ({e}), using in-memory index", file=sys.stderr)
+            self.conn = sqlite3.connect(":memory:")
+            self._init_schema()
+
+    def _init_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            for table in self.TABLES:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        # Directory mtimes seen by the last sync; unchanged dirs are not re-listed
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                dir_path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_paths (
+                file_path TEXT PRIMARY KEY,
+                session_id TEXT,
+                dir_path TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS session_paths_id ON session_paths (session_id)")
+        # Full-text search: bytes of each rollout already indexed, and the messages
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_files (
+                file_path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                offset INTEGER NOT NULL
+            )
+        """)
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                    text, tools,
+                    session_id UNINDEXED, file_path UNINDEXED, timestamp UNINDEXED, role UNINDEXED
+                )
+            """)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5
+            self.has_fts = False
+        self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def lookup_session(self, session_id: str, sessions_dir: Path) -> Optional[Path]:
+        """
+        Resolve a session ID to its rollout file.
+
+        Answers from the id->path map when the recorded file still exists;
+        otherwise syncs the map with the directory tree and tries again.
+
+        Args:
+            session_id: Session ID from the session_meta header
+            sessions_dir: ~/.codex/sessions
+
+        Returns:
+            Path of the rollout file, or None if no such session exists
+        """
+        for _ in range(2):
+            for (path,) in self.conn.execute(
+                "SELECT file_path FROM session_paths WHERE session_id = ?", (session_id,)
+            ).fetchall():
+                if os.path.exists(path):
+                    return Path(path)
+            if not self.sync_session_paths(sessions_dir):
+                break
+        return None
+
+    def sync_session_paths(self, sessions_dir: Path) -> bool:
+        """
+        Bring the id->path map up to date with the sessions tree.
+
+        Returns:
+            True if anything changed
+        """
+        known = dict(self.conn.execute("SELECT dir_path, mtime_ns FROM dirs"))
+        children = {}
+        for dir_path in known:
+            children.setdefault(os.path.dirname(dir_path), []).append(dir_path)
+        seen = set()
+        changed = False
+        # Racy mtimes are recorded as 0 so the directory is listed again next time
+        racy_after = time.time_ns() - self.RACY_MTIME_NS
+
+        def visit(dir_path: str, level: int):
+            nonlocal changed
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                return
+            seen.add(dir_path)
+            unchanged = known.get(dir_path) == mtime
+
+            if level < self.TREE_DEPTH:
+                if unchanged:
+                    subdirs = children.get(dir_path, [])
+                else:
+                    subdirs = [entry.path for entry in os.scandir(dir_path) if entry.is_dir()]
+                for subdir in subdirs:
+                    visit(subdir, level + 1)
+            elif not unchanged:
+                # Leaf day directory: keep IDs of files already mapped, read headers of new ones
+                mapped = dict(self.conn.execute(
+                    "SELECT file_path, session_id FROM session_paths WHERE dir_path = ?", (dir_path,)
+                ))
+                current = [entry.path for entry in os.scandir(dir_path) if entry.name.endswith(ROLLOUT_SUFFIXES)]
+                self.conn.execute("DELETE FROM session_paths WHERE dir_path = ?", (dir_path,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO session_paths VALUES (?, ?, ?)",
+                    [
+                        (path, mapped[path] if path in mapped else read_rollout_id(Path(path)), dir_path)
+                        for path in current
+                    ]
+                )
+
+            if not unchanged:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dirs VALUES (?, ?)", (dir_path, mtime if mtime < racy_after else 0)
+                )
+                changed = True
+
+        visit(str(sessions_dir), 0)
+
+        for gone in set(known) - seen:
+            self.conn.execute("DELETE FROM dirs WHERE dir_path = ?", (gone,))
+            self.conn.execute("DELETE FROM session_paths WHERE dir_path = ?", (gone,))
+            changed = True
+
+        if changed:
+            self.conn.commit()
+        return changed
+
+
+    def sync_search(self, session_files: List[Path], under: Path) -> int:
+        """
+        Bring the full-text index up to date with the given rollout files.
+
+        Each file is indexed from the offset recorded last time, so only
+        appended messages are read. Replaced (new inode) or truncated files
+        are re-indexed from the start; files below `under` that are no longer
+        listed are dropped. Compressed rollouts are indexed in one go and
+        recorded with their file size as the offset.
+
+        Returns:
+            Number of files that were (re)indexed
+        """
+        known = {path: (inode, offset) for path, inode, offset in self.conn.execute(
+            "SELECT file_path, inode, offset FROM search_files"
+        )}
+        pending = []
+        listed = set()
+        for session_file in session_files:
+            path = str(session_file)
+            listed.add(path)
+            try:
+                st = session_file.stat()
+            except OSError:
+                continue
+            inode, offset = known.get(path, (None, 0))
+            if inode == st.st_ino and offset == st.st_size:
+                continue
+            if inode is not None and (inode != st.st_ino or offset > st.st_size or is_compressed(path)):
+                self.conn.execute("DELETE FROM search_fts WHERE file_path = ?", (path,))
+                offset = 0
+            pending.append((path, offset, st.st_ino, st.st_size))
+
+        prefix = str(under) + os.sep
+        for gone in [path for path in known if path.startswith(prefix) and path not in listed]:
+            self.conn.execute("DELETE FROM search_fts WHERE file_path = ?", (gone,))
+            self.conn.execute("DELETE FROM search_files WHERE file_path = ?", (gone,))
+
+        # Batches bound the rows held in memory on a first full build
+        for start in range(0, len(pending), SEARCH_BATCH_FILES):
+            batch = pending[start:start + SEARCH_BATCH_FILES]
+            results = run_parallel(_search_scan_job, [(path, offset) for path, offset, _, _ in batch],
+                                   jobs=self.jobs, use_processes=True)
+            for (path, offset, inode, size), (rows, pos, error) in zip(batch, results):
+                if error is not None:
+                    print(f"WARNING: Failed to index {path}: {error}", file=sys.stderr)
+                    continue
+                if is_compressed(path):
+                    # Compressed files are complete; their size marks them as fully indexed
+                    pos = size
+                session_id = read_rollout_id(Path(path))
+                self.conn.executemany(
+                    "INSERT INTO search_fts (text, tools, session_id, file_path, timestamp, role) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(text, tools, session_id, path, timestamp, role) for timestamp, role, text, tools in rows]
+                )
+                self.conn.execute("INSERT OR REPLACE INTO search_files VALUES (?, ?, ?)", (path, inode, pos))
+            self.conn.commit()
+        self.conn.commit()
+        return len(pending)
+
+    def search(self, query: str, limit: int = 20, under: Optional[Path] = None,
+               include_tools: bool = False, raw: bool = False) -> List[Dict]:
+        """
+        Ranked full-text search over indexed messages and tool calls.
+
+        Args:
+            query: Words to find (all must match), or an FTS5 expression if raw
+            limit: Maximum number of hits
+            under: Only return hits from rollout files below this directory
+            include_tools: Also match tool names
+            raw: Pass query to FTS5 unchanged (phrases, OR, NEAR, prefix*)
+
+        Returns:
+            Hits (session_id, timestamp, role, snippet, score), best first
+
+        Raises:
+            sqlite3.OperationalError: If a raw query is not valid FTS5 syntax
+        """
+        if not raw:
+            query = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+        if not query:
+            return []
+        columns = '{text tools}' if include_tools else 'text'
+        sql = (
+            "SELECT session_id, timestamp, role, snippet(search_fts, -1, '[', ']', '…', 16), bm25(search_fts) "
+            "FROM search_fts WHERE search_fts MATCH ?"
+        )
+        params = [f"{columns} : ({query})"]
+        if under is not None:
+            prefix = str(under) + os.sep
+            sql += " AND substr(file_path, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        sql += " ORDER BY rank, timestamp DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                'session_id': session_id,
+                'timestamp': timestamp,
+                'role': role,
+                'snippet': snippet.replace('\n', ' '),
+                'score': round(-score, 3),
+            }
+            for session_id, timestamp, role, snippet, score in self.conn.execute(sql, params)
+        ]
+
+    def rename_rollout(self, old: Path, old_stat: os.stat_result, new: Path):
+        """
+        Move the rows of a rollout file that was compressed in place to its new path.
+
+        A search row that was current for the old file describes the new one
+        as well, so it is kept (with the new file's size and inode) instead of
+        being rebuilt on the next sync; a stale one is dropped.
+        """
+        old_path, new_path = str(old), str(new)
+        st = new.stat()
+        self.conn.execute(
+            "UPDATE OR REPLACE session_paths SET file_path = ? WHERE file_path = ?", (new_path, old_path)
+        )
+        current = self.conn.execute(
+            "SELECT 1 FROM search_files WHERE file_path = ? AND inode = ? AND offset = ?",
+            (old_path, old_stat.st_ino, old_stat.st_size)
+        ).fetchone()
+        for path in (new_path,) if current else (old_path, new_path):
+            self.conn.execute("DELETE FROM search_files WHERE file_path = ?", (path,))
+            if self.has_fts:
+                self.conn.execute("DELETE FROM search_fts WHERE file_path = ?", (path,))
+        if current:
+            self.conn.execute(
+                "UPDATE search_files SET file_path = ?, inode = ?, offset = ? WHERE file_path = ?",
+                (new_path, st.st_ino, st.st_size, old_path)
+            )
+            if self.has_fts:
+                self.conn.execute("UPDATE search_fts SET file_path = ? WHERE file_path = ?", (new_path, old_path))
+        self.conn.commit()
+
+class FileWatcher:
+    """
+    Block until watched files or directories change.
+
+    Uses inotify (through ctypes) on Linux and falls back to sleeping for
+    POLL_INTERVAL elsewhere or when inotify cannot be set up. Either way the
+    caller re-checks the files after wait() returns, so a missed or
+    coalesced event only delays, never loses, an update.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    def __init__(self):
+        self.fd = -1
+        self._libc = None
+        self._paths = {}
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd >= 0:
+            self.fd = fd
+            self._libc = libc
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self.fd >= 0
+
+    def add(self, path: Path) -> bool:
+        """Watch a file or directory; returns False if it cannot be watched."""
+        if not self.uses_inotify:
+            return False
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), self.WATCH_MASK)
+        if wd < 0:
+            return False
+        self._paths[wd] = Path(path)
+        return True
+
+    def wait(self, timeout: float, extra_fds: Tuple[int, ...] = ()) -> bool:
+        """
+        Wait up to timeout seconds for a change.
+
+        Args:
+            timeout: Maximum seconds to block
+            extra_fds: Other descriptors that should also end the wait when
+                readable (e.g. a pidfd that signals process exit)
+
+        Returns:
+            True if inotify or an extra fd reported an event, False on timeout
+            or when polling
+        """
+        if not self.uses_inotify:
+            timeout = min(timeout, POLL_INTERVAL)
+            if not extra_fds:
+                time.sleep(max(0.0, timeout))
+                return False
+        fds = ([self.fd] if self.uses_inotify else []) + list(extra_fds)
+        ready, _, _ = select.select(fds, [], [], max(0.0, timeout))
+        if self.fd not in ready:
+            return bool(ready)
+        # Drain queued events; callers re-check state rather than decode them
+        while True:
+            try:
+                if not os.read(self.fd, 64 * 1024):
+                    break
+            except BlockingIOError:
+                break
+        return True
+
+    def wait_events(self, timeout: float) -> Optional[List[Tuple[Path, int]]]:
+        """
+        Wait up to timeout seconds and report what changed.
+
+        Returns:
+            [(path, mask)] where path is the watched file or the entry inside a
+            watched directory; [] on timeout; None when polling or after the
+            kernel queue overflowed (callers must re-check everything)
+        """
+        if not self.uses_inotify:
+            time.sleep(max(0.0, min(timeout, POLL_INTERVAL)))
+            return None
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return []
+        events = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            pos = 0
+            # struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+            while pos + 16 <= len(data):
+                wd, mask, _, name_len = struct.unpack_from('iIII', data, pos)
+                name = data[pos + 16:pos + 16 + name_len].rstrip(b'\0')
+                pos += 16 + name_len
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                base = self._paths.get(wd)
+                if base is not None:
+                    events.append((base / os.fsdecode(name) if name else base, mask))
+        return None if overflow else events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class CodexHelper:
     """Read-only helper to query Codex CLI session data"""
 
-    def __init__(self):
+    def __init__(self, jobs: int = DEFAULT_JOBS):
         self.codex_dir = Path.home() / ".codex"
         self.sessions_dir = self.codex_dir / "sessions"
+        self.jobs = jobs
+        self._index = None
+
+    @property
+    def index(self) -> SessionIndex:
+        """Session ID index, opened on first use."""
+        if self._index is None:
+            self._index = SessionIndex(get_cache_dir() / "index.sqlite", jobs=self.jobs)
+        return self._index
+
+    def get_latest_session_id(self, nth: int = 1, show_time: bool = False) -> Optional[str]:
+        """
+        Extract the Nth most recent session ID from codex storage.
+
+        Sessions are ranked by start time as encoded in the rollout file name.
+
+        Args:
+            nth: Which session to get (1 = most recent, 2 = second most recent, etc.)
+            show_time: If True, include time ago in output
+
+        Returns:
+            Session ID string or None if not found
+        """
+        if not self.sessions_dir.exists():
+            print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
+            print("Is Codex CLI installed and initialized?", file=sys.stderr)
+            return None
+
+        try:
+            # Walk date partitions newest first and stop at the nth session
+            session_files = list(itertools.islice(iter_rollouts_newest_first(self.sessions_dir), nth))
+            if not session_files:
+                print("ERROR: No session files found in ~/.codex/sessions/", file=sys.stderr)
+                return None
+
+            if nth > len(session_files):
+                print(f"ERROR: Only {len(session_files)} sessions exist, cannot get #{nth}", file=sys.stderr)
+                return None
+
+            target_file = session_files[nth - 1]
+
+            # Read the session_meta header for the start timestamp (and the ID if the name has none)
+            with open_rollout_file(target_file, buffering=-1) as f:
+                first_line = f.readline()
+            if not first_line:
+                print(f"ERROR: Session file is empty: {target_file}", file=sys.stderr)
+                return None
+
+            data = json_loads(first_line)
+            parsed = parse_rollout_name(target_file.name)
+            session_id = parsed[1] if parsed else data.get('payload', {}).get('id')
+            timestamp = data.get('payload', {}).get('timestamp')
+
+            if not session_id:
+                print(f"ERROR: No session ID in file: {target_file}", file=sys.stderr)
+                return None
+
+            if show_time and timestamp:
+                time_str = time_ago(timestamp)
+                return f"{session_id}; started {time_str}"
+            return session_id
+
+        except Exception as e:
+            print(f"ERROR: Failed to extract session ID: {e}", file=sys.stderr)
+            return None
+
+    def get_session_id_for_pid(self, pid: int) -> Optional[str]:
+        """
+        Session ID of the rollout a running codex process writes to.
+
+        Uses the rollout file the process (or a child) has open; otherwise the
+        one of its working directory created after the process started, if
+        that is unambiguous (see assign_rollouts).
+
+        Args:
+            pid: Process ID of the codex command
+
+        Returns:
+            Session ID string or None if it cannot be determined
+        """
+        rollout = find_rollout_for_pid(pid, self.sessions_dir)
+        return read_rollout_id(rollout) if rollout else None
+
+    def list_sessions(self, limit: int = 20) -> List[Dict]:
+        """
+        List recent codex sessions with metadata.
+
+        Args:
+            limit: Maximum number of sessions to return
+
+        Returns:
+            List of session dictionaries with metadata
+        """
+        if not self.sessions_dir.exists():
+            print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
+            return []
+
+        try:
+            # Walk date partitions newest first and stop once limit is reached
+            targets = list(itertools.islice(iter_rollouts_newest_first(self.sessions_dir), limit))
+            return self._scan_rollouts(targets)
+
+        except Exception as e:
+            print(f"ERROR: Failed to list sessions: {e}", file=sys.stderr)
+            return []
+
+    def list_changed_sessions(self, since_mtime_ns: int) -> Optional[List[Dict]]:
+        """
+        List sessions added or changed since a list cursor was taken.
+
+        Rollout files are append-only, so a file is unchanged exactly when its
+        mtime is older than the cursor's watermark; every rollout is stat'ed
+        but only the changed ones are opened.
+
+        Args:
+            since_mtime_ns: Watermark from parse_list_cursor
+
+        Returns:
+            Changed sessions, newest first (as list_sessions), or None on error
+        """
+        if not self.sessions_dir.exists():
+            print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
+            return None
+
+        try:
+            targets = []
+            for path in iter_rollouts_newest_first(self.sessions_dir):
+                try:
+                    if path.stat().st_mtime_ns >= since_mtime_ns:
+                        targets.append(path)
+                except OSError:
+                    continue
+            return self._scan_rollouts(targets)
+
+        except Exception as e:
+            print(f"ERROR: Failed to list sessions: {e}", file=sys.stderr)
+            return None
+
+    def _scan_rollouts(self, targets: List[Path]) -> List[Dict]:
+        """
+        List metadata of the given rollout files, in order, skipping unreadable ones.
+
+        Compacted files that are unchanged since are answered from their summary.
+        """
+        if not targets:
+            return []
 
-    def get_latest_session_id(self, nth: int = 1, show_time: bool = False) -> Optional[str]:
+        # One slot per file: a session from its summary, or None for a file to scan
+        slots = []
+        pending = []
+        for session_file in targets:
+            try:
+                st = session_file.stat()
+            except OSError:
+                continue
+            summary = load_session_summary(session_file, st)
+            if summary is None:
+                slots.append((session_file, None))
+                pending.append(str(session_file))
+                continue
+            timestamp = summary['list']['timestamp']
+            slots.append((session_file, (dict(
+                summary['list'],
+                time_ago=time_ago(timestamp) if timestamp else 'unknown',
+                modified_at=datetime.fromtimestamp(st.st_mtime).isoformat()
+            ), None)))
+
+        results = iter(run_parallel(_scan_rollout_job, pending, jobs=self.jobs, use_processes=True))
+
+        sessions = []
+        for session_file, result in slots:
+            session, error = result or next(results)
+            if error is not None:
+                print(f"WARNING: Failed to parse {session_file}: {error}", file=sys.stderr)
+                continue
+            if session is not None:
+                sessions.append(session)
+        return sessions
+
+    def search_sessions(self, query: str, limit: int = 20, include_tools: bool = False,
+                        raw: bool = False) -> Optional[List[Dict]]:
         """
-        Extract the Nth most recent session ID from codex storage.
+        Full-text search across all rollout files.
+
+        The FTS index is updated incrementally before querying, so only
+        events appended since the last search are read.
 
         Args:
-            nth: Which session to get (1 = most recent, 2 = second most recent, etc.)
-            show_time: If True, include time ago in output
+            query: Words to search for (or FTS5 syntax with raw)
+            limit: Maximum number of hits
+            include_tools: Also match tool names
+            raw: Treat query as an FTS5 expression
 
         Returns:
-            Session ID string or None if not found
+            List of hits, or None on error
         """
         if not self.sessions_dir.exists():
             print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
-            print("Is Codex CLI installed and initialized?", file=sys.stderr)
+            return None
+        if not self.index.has_fts:
+            print("ERROR: search requires SQLite with FTS5 support", file=sys.stderr)
             return None
 
-        # Find all session files
         try:
-            session_files = list(self.sessions_dir.glob("*/*/*/*.jsonl"))
-            if not session_files:
-                print("ERROR: No session files found in ~/.codex/sessions/", file=sys.stderr)
-                return None
-
-            # Sort by modification time, newest first
-            session_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+            self.index.sync_search(list(iter_rollouts_newest_first(self.sessions_dir)), self.sessions_dir)
+            return self.index.search(query, limit, include_tools=include_tools, raw=raw)
+        except sqlite3.OperationalError as e:
+            print(f"ERROR: Invalid search query: {e}", file=sys.stderr)
+            return None
 
-            if nth > len(session_files):
-                print(f"ERROR: Only {len(session_files)} sessions exist, cannot get #{nth}", file=sys.stderr)
-                return None
+    def watch_sessions(self, idle_seconds: float = 60.0) -> bool:
+        """
+        Stream session lifecycle events as NDJSON until interrupted.
+
+        One inotify instance watches the sessions directory tree (year, month
+        and day directories, adding new ones as they appear); each wake-up
+        reads only the bytes appended to the rollouts that changed. Without
+        inotify, or after the event queue overflowed, the tree is re-listed
+        instead. Sessions that already exist are followed from their current
+        end without emitting events for past turns.
+
+        Events (all carry event, session_id and time):
+            created     a new rollout file appeared (with its path)
+            user        a prompt typed by the user (timestamp, text preview)
+            assistant   an assistant message (timestamp)
+            idle        no writes for idle_seconds (once per quiet period)
+            closed      codex closed the rollout file (the process exited);
+                        without inotify, no running codex process has it open
 
-            target_file = session_files[nth - 1]
+        Args:
+            idle_seconds: Quiet period before an idle event
 
-            # Extract session ID from first line
-            with open(target_file, 'r') as f:
-                first_line = f.readline()
-                if not first_line:
-                    print(f"ERROR: Session file is empty: {target_file}", file=sys.stderr)
-                    return None
+        Returns:
+            True when stopped with Ctrl-C, False if the sessions directory is missing
+        """
+        if not self.sessions_dir.exists():
+            print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
+            return False
+        sessions = {}
+
+        def emit(event: str, state: Dict, **fields):
+            now = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+            print(json_dumps({'event': event, 'session_id': state['session_id'], 'time': now, **fields}))
+            sys.stdout.flush()
+
+        def track(path: Path, existing: bool):
+            parsed = parse_rollout_name(path.name)
+            if parsed is None or is_compressed(path):
+                return
+            try:
+                st = path.stat()
+            except OSError:
+                return
+            state = {
+                'session_id': parsed[1], 'inode': st.st_ino, 'pos': 0, 'size': 0,
+                'active': time.monotonic(), 'idle': False, 'open': True,
+            }
+            if existing:
+                # Follow from the start of the last (possibly incomplete) line
+                state['pos'] = state['size'] = st.st_size
+                if st.st_size:
+                    with open(path, 'rb') as f:
+                        f.seek(max(0, st.st_size - 64 * 1024))
+                        tail = f.read()
+                    nl = tail.rfind(b'\n')
+                    state['pos'] = st.st_size - len(tail) + nl + 1 if nl >= 0 else st.st_size
+                quiet = time.time() - st.st_mtime
+                state['active'] -= quiet
+                state['idle'] = quiet >= idle_seconds
+            sessions[str(path)] = state
+            if not existing:
+                emit('created', state, path=str(path))
+
+        def read_new(path: str, state: Dict):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+            if st.st_ino != state['inode'] or st.st_size < state['pos']:
+                # Replaced or truncated: start over
+                state['inode'], state['pos'], state['size'] = st.st_ino, 0, 0
+            if st.st_size == state['size']:
+                return
+            state['size'] = st.st_size
+            with open(path, 'rb') as f:
+                f.seek(state['pos'])
+                data = f.read()
+            if not data:
+                return
+            state['active'], state['idle'], state['open'] = time.monotonic(), False, True
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].split(b'\n')[:-1]:
+                turn = turn_event(line)
+                if turn is not None:
+                    emit(turn[0], state, **turn[1])
+            state['pos'] += end
+
+        def scan_tree(watcher: FileWatcher, dir_path: Path, existing: bool):
+            # sessions/YYYY/MM/DD/rollout-*.jsonl
+            watcher.add(dir_path)
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = [(entry.name, entry.is_dir()) for entry in it]
+            except OSError:
+                return
+            for name, is_dir in entries:
+                path = dir_path / name
+                if is_dir:
+                    if len(path.relative_to(self.sessions_dir).parts) <= 3:
+                        scan_tree(watcher, path, existing)
+                    continue
+                if str(path) not in sessions:
+                    track(path, existing)
+                if str(path) in sessions:
+                    read_new(str(path), sessions[str(path)])
 
-                data = json.loads(first_line)
-                session_id = data.get('payload', {}).get('id')
-                timestamp = data.get('payload', {}).get('timestamp')
+        try:
+            with FileWatcher() as watcher:
+                scan_tree(watcher, self.sessions_dir, existing=True)
+                live = live_rollouts(self.sessions_dir)
+                if live is not None:
+                    for path, state in sessions.items():
+                        state['open'] = path in live
+                last_check = time.monotonic()
+
+                while True:
+                    now = time.monotonic()
+                    deadlines = [state['active'] + idle_seconds for state in sessions.values() if not state['idle']]
+                    timeout = min([WATCH_RECHECK_INTERVAL] + [deadline - now for deadline in deadlines])
+                    events = watcher.wait_events(max(0.0, timeout))
+
+                    if events is None:
+                        scan_tree(watcher, self.sessions_dir, existing=False)
+                        for path in [path for path in sessions if not os.path.exists(path)]:
+                            del sessions[path]
+                    else:
+                        for path, mask in events:
+                            if mask & FileWatcher.IN_ISDIR:
+                                if mask & (FileWatcher.IN_CREATE | FileWatcher.IN_MOVED_TO):
+                                    scan_tree(watcher, path, existing=False)
+                                continue
+                            key = str(path)
+                            if mask & (FileWatcher.IN_DELETE | FileWatcher.IN_MOVED_FROM):
+                                state = sessions.pop(key, None)
+                                if state and state['open']:
+                                    emit('closed', state)
+                                continue
+                            if key not in sessions:
+                                track(path, existing=False)
+                            if key not in sessions:
+                                continue
+                            state = sessions[key]
+                            read_new(key, state)
+                            # codex keeps its rollout open until it exits
+                            if mask & FileWatcher.IN_CLOSE_WRITE and state['open']:
+                                state['open'] = False
+                                emit('closed', state)
+
+                    now = time.monotonic()
+                    for state in sessions.values():
+                        if not state['idle'] and now - state['active'] >= idle_seconds:
+                            state['idle'] = True
+                            emit('idle', state, seconds=int(now - state['active']))
+
+                    if not watcher.uses_inotify and now - last_check >= WATCH_RECHECK_INTERVAL:
+                        last_check = now
+                        if any(state['open'] for state in sessions.values()):
+                            live = live_rollouts(self.sessions_dir)
+                            if live is not None:
+                                for path, state in sessions.items():
+                                    if state['open'] and path not in live:
+                                        state['open'] = False
+                                        emit('closed', state)
+        except KeyboardInterrupt:
+            return True
+
+    def compact_sessions(self, session_ids: Optional[List[str]] = None, min_bytes: int = 0,
+                         force: bool = False) -> Optional[List[Dict]]:
+        """
+        Write compaction summaries for finished sessions.
 
-                if not session_id:
-                    print(f"ERROR: No session ID in file: {target_file}", file=sys.stderr)
-                    return None
+        A summary holds the list and info fields, last prompt, tool call
+        counts and token usage of a rollout file. list and info read it
+        instead of the rollout for as long as the file's size and mtime are
+        unchanged. Rollouts of running codex processes are skipped (they would
+        outdate the summary at once), as are sessions that already have a
+        current one unless force is set.
 
-                if show_time and timestamp:
-                    time_str = time_ago(timestamp)
-                    return f"{session_id}; started {time_str}"
-                return session_id
+        Args:
+            session_ids: Only these sessions (default: all)
+            min_bytes: Skip rollouts smaller than this
+            force: Rebuild summaries that are still current
 
-        except Exception as e:
-            print(f"ERROR: Failed to extract session ID: {e}", file=sys.stderr)
+        Returns:
+            One dict per compacted session (session_id, size, event_count, tool_calls), or None on error
+        """
+        if not self.sessions_dir.exists():
+            print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
             return None
 
-    def list_sessions(self, limit: int = 20) -> List[Dict]:
+        if session_ids:
+            paths = []
+            for session_id in session_ids:
+                session_file = self.index.lookup_session(session_id, self.sessions_dir)
+                if session_file is None:
+                    print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
+                    return None
+                paths.append(session_file)
+        else:
+            paths = list(iter_rollouts_newest_first(self.sessions_dir))
+        live = live_rollouts(self.sessions_dir) or set()
+
+        targets = []
+        for path in paths:
+            if str(path) in live:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_size < min_bytes or (not force and load_session_summary(path, st) is not None):
+                continue
+            targets.append(path)
+
+        compacted = []
+        results = run_parallel(_summary_job, [str(path) for path in targets], jobs=self.jobs, use_processes=True)
+        for path, (summary, error) in zip(targets, results):
+            if error is not None:
+                print(f"WARNING: Failed to summarize {path}: {error}", file=sys.stderr)
+                continue
+            if summary is None or not summary['session_id']:
+                continue
+            try:
+                write_session_summary(summary)
+            except OSError as e:
+                print(f"WARNING: Failed to write summary of {path}: {e}", file=sys.stderr)
+                continue
+            compacted.append({
+                'session_id': summary['session_id'], 'size': summary['size'],
+                'event_count': summary['info']['event_count'], 'tool_calls': sum(summary['tool_calls'].values()),
+            })
+        return compacted
+
+    def archive_sessions(self, older_than: str, fmt: str = 'gz', dry_run: bool = False) -> Optional[List[Dict]]:
         """
-        List recent codex sessions with metadata.
+        Compress rollout files that have not been written to for a while.
+
+        Each file is replaced by rollout-...jsonl.<fmt> with the same mtime.
+        Search rows that were up to date move along with it, so already
+        indexed sessions are not rescanned. Rollouts of running codex
+        processes are left alone.
 
         Args:
-            limit: Maximum number of sessions to return
+            older_than: Last modification before this (relative age or ISO date)
+            fmt: 'gz' or 'zst'
+            dry_run: Only report what would be compressed
 
         Returns:
-            List of session dictionaries with metadata
+            One dict per rollout (session_id, path, size, compressed_size), or None on error
         """
         if not self.sessions_dir.exists():
             print("ERROR: ~/.codex/sessions/ directory not found", file=sys.stderr)
-            return []
-
+            return None
+        if fmt == 'zst' and zstd is None and zstandard is None:
+            print("ERROR: --format zst needs Python 3.14+ or the zstandard package", file=sys.stderr)
+            return None
         try:
-            session_files = list(self.sessions_dir.glob("*/*/*/*.jsonl"))
-            if not session_files:
-                return []
-
-            # Sort by modification time, newest first
-            session_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-
-            sessions = []
-            for session_file in session_files[:limit]:
-                try:
-                    with open(session_file, 'r') as f:
-                        first_line = f.readline()
-                        if not first_line:
-                            continue
-
-                        data = json.loads(first_line)
-                        payload = data.get('payload', {})
-
-                        # Extract first prompt and sandbox from events
-                        first_prompt = None
-                        sandbox_policy = None
-                        f.seek(0)
-                        user_messages_seen = 0
-                        for line in f:
-                            try:
-                                event = json.loads(line)
-                                # Get sandbox from turn_context
-                                if not sandbox_policy and event.get('type') == 'turn_context':
-                                    sp = event.get('payload', {}).get('sandbox_policy')
-                                    if isinstance(sp, dict):
-                                        sandbox_policy = sp.get('mode')
-                                    elif isinstance(sp, str):
-                                        sandbox_policy = sp
-                                # Get first actual user message (skip environment_context)
-                                if event.get('type') == 'response_item':
-                                    event_payload = event.get('payload', {})
-                                    if event_payload.get('role') == 'user':
-                                        content = event_payload.get('content', [])
-                                        if content and len(content) > 0:
-                                            text = content[0].get('text', '') or ''
-                                            # Skip environment_context messages
-                                            if text and '<environment_context>' not in text:
-                                                first_prompt = text.strip()[:50]
-                                                if first_prompt and sandbox_policy:
-                                                    break
-                            except:
-                                continue
-
-                        timestamp = payload.get('timestamp')
-                        sessions.append({
-                            'session_id': payload.get('id'),
-                            'timestamp': timestamp,
-                            'time_ago': time_ago(timestamp) if timestamp else 'unknown',
-                            'cwd': payload.get('cwd'),
-                            'model_provider': payload.get('model_provider'),
-                            'source': payload.get('source'),
-                            'sandbox_policy': sandbox_policy,
-                            'first_prompt': first_prompt or '',
-                            'file_path': str(session_file),
-                            'modified_at': datetime.fromtimestamp(session_file.stat().st_mtime).isoformat()
-                        })
-                except Exception as e:
-                    print(f"WARNING: Failed to parse {session_file}: {e}", file=sys.stderr)
-                    continue
-
-            return sessions
+            cutoff_ns = int(parse_time_bound(older_than)[1] * 1e9)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return None
 
-        except Exception as e:
-            print(f"ERROR: Failed to list sessions: {e}", file=sys.stderr)
-            return []
+        live = live_rollouts(self.sessions_dir) or set()
+        candidates = []
+        for path in iter_rollouts_newest_first(self.sessions_dir):
+            if is_compressed(path) or str(path) in live:
+                continue
+            try:
+                if path.stat().st_mtime_ns < cutoff_ns:
+                    candidates.append(path)
+            except OSError:
+                continue
+        candidates.reverse()
+        if dry_run:
+            return [
+                {'session_id': read_rollout_id(path), 'path': str(path), 'size': path.stat().st_size, 'compressed_size': None}
+                for path in candidates
+            ]
+
+        archived = []
+        for path in candidates:
+            try:
+                before = path.stat()
+                target = compress_rollout(path, fmt)
+            except OSError as e:
+                print(f"WARNING: Failed to archive {path}: {e}", file=sys.stderr)
+                continue
+            self.index.rename_rollout(path, before, target)
+            move_session_summary(before, target)
+            archived.append({
+                'session_id': read_rollout_id(target), 'path': str(target),
+                'size': before.st_size, 'compressed_size': target.stat().st_size,
+            })
+        return archived
 
     def get_session_info(self, session_id: str) -> Optional[Dict]:
         """
@@ -227,105 +1779,397 @@ class CodexHelper:
             return None
 
         try:
-            # Search for session file containing this ID
-            for session_file in self.sessions_dir.glob("*/*/*/*.jsonl"):
-                try:
-                    with open(session_file, 'r') as f:
-                        first_line = f.readline()
-                        if not first_line:
-                            continue
-
-                        data = json.loads(first_line)
-                        payload = data.get('payload', {})
-
-                        if payload.get('id') == session_id:
-                            # Extract additional info
-                            f.seek(0)
-                            event_count = 0
-                            first_prompt = None
-                            sandbox_policy = None
-
-                            for line in f:
-                                event_count += 1
-                                try:
-                                    event = json.loads(line)
-                                    # Get sandbox from turn_context
-                                    if not sandbox_policy and event.get('type') == 'turn_context':
-                                        sp = event.get('payload', {}).get('sandbox_policy')
-                                        if isinstance(sp, dict):
-                                            sandbox_policy = sp.get('mode')
-                                        elif isinstance(sp, str):
-                                            sandbox_policy = sp
-                                    # Get first actual user message (skip environment_context)
-                                    if not first_prompt and event.get('type') == 'response_item':
-                                        event_payload = event.get('payload', {})
-                                        if event_payload.get('role') == 'user':
-                                            content = event_payload.get('content', [])
-                                            if content and len(content) > 0:
-                                                text = content[0].get('text', '') or ''
-                                                if text and '<environment_context>' not in text:
-                                                    first_prompt = text.strip()[:100]
-                                except:
-                                    continue
-
-                            timestamp = payload.get('timestamp')
-                            return {
-                                'session_id': session_id,
-                                'timestamp': timestamp,
-                                'time_ago': time_ago(timestamp) if timestamp else 'unknown',
-                                'cwd': payload.get('cwd'),
-                                'model_provider': payload.get('model_provider'),
-                                'cli_version': payload.get('cli_version'),
-                                'source': payload.get('source'),
-                                'sandbox_policy': sandbox_policy,
-                                'first_prompt': first_prompt or 'N/A',
-                                'file_path': str(session_file),
-                                'event_count': event_count,
-                                'modified_at': datetime.fromtimestamp(session_file.stat().st_mtime).isoformat()
-                            }
-                except Exception:
-                    continue
+            session_file = self.index.lookup_session(session_id, self.sessions_dir)
+            if session_file is None:
+                print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
+                return None
 
-            print(f"ERROR: Session '{session_id}' not found", file=sys.stderr)
-            return None
+            st = session_file.stat()
+            summary = load_session_summary(session_file, st)
+            details = summary['info'] if summary is not None else read_rollout_info(session_file)
+
+            timestamp = details['timestamp']
+            info = {
+                'session_id': session_id,
+                'timestamp': timestamp,
+                'time_ago': time_ago(timestamp) if timestamp else 'unknown',
+                'cwd': details['cwd'],
+                'model_provider': details['model_provider'],
+                'cli_version': details['cli_version'],
+                'source': details['source'],
+                'sandbox_policy': details['sandbox_policy'],
+                'first_prompt': details['first_prompt'],
+                'file_path': str(session_file),
+                'event_count': details['event_count'],
+                'modified_at': datetime.fromtimestamp(st.st_mtime).isoformat()
+            }
+            if summary is not None:
+                # Only kept for compacted sessions
+                info['last_prompt'] = summary['last_prompt'] or 'N/A'
+                info['tool_calls'] = summary['tool_calls']
+                info['token_usage'] = summary['token_usage']
+            return info
 
         except Exception as e:
             print(f"ERROR: Failed to get session info: {e}", file=sys.stderr)
             return None
 
 
-def ensure_start(pid: int, log_path: str) -> bool:
+def process_alive(pid: int) -> bool:
+    """True if the process exists and is not a zombie."""
+    try:
+        os.kill(pid, 0)  # Signal 0 just checks if process exists
+    except (ProcessLookupError, OSError):
+        return False
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            # State follows the parenthesised command name
+            return f.read().rsplit(b')', 1)[1].split()[0] != b'Z'
+    except (OSError, IndexError):
+        return True
+
+
+def process_cwd(pid: int) -> Optional[str]:
+    """Working directory of a process (Linux /proc only)."""
+    try:
+        return os.readlink(f"/proc/{pid}/cwd")
+    except OSError:
+        return None
+
+
+def process_start_time(pid: int) -> Optional[float]:
+    """
+    Epoch seconds at which a process started (Linux /proc only).
+
+    Truncated to clock ticks, so never later than the real start.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            # starttime (field 22, clock ticks after boot) follows the parenthesised command name
+            ticks = int(f.read().rsplit(b')', 1)[1].split()[19])
+        if hasattr(time, 'CLOCK_BOOTTIME'):
+            boot_time = time.time() - time.clock_gettime(time.CLOCK_BOOTTIME)
+        else:
+            with open("/proc/stat", 'rb') as f:
+                boot_time = next(int(line.split()[1]) for line in f if line.startswith(b'btime '))
+    except (OSError, IndexError, ValueError, StopIteration):
+        return None
+    return boot_time + ticks / os.sysconf('SC_CLK_TCK')
+
+
+def iter_process_tree(pid: int):
+    """Yield pid and all of its descendants (Linux /proc only)."""
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        yield current
+        try:
+            tids = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for tid in tids:
+            try:
+                with open(f"/proc/{current}/task/{tid}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except (OSError, ValueError):
+                continue
+
+
+def find_open_rollout(pid: int, root: Path) -> Optional[Path]:
+    """
+    Rollout file under root that pid (or one of its children) has open.
+
+    Reads the /proc/<pid>/fd symlinks, so the cost depends on the number of
+    open descriptors rather than the number of rollouts on disk.
+
+    Args:
+        pid: Process to inspect
+        root: Directory rollout files live under
+
+    Returns:
+        Path of the open .jsonl file, or None if none is open (or /proc is unavailable)
+    """
+    prefix = str(root) + os.sep
+    for proc in iter_process_tree(pid):
+        try:
+            fds = os.listdir(f"/proc/{proc}/fd")
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(f"/proc/{proc}/fd/{fd}")
+            except OSError:
+                continue
+            if target.startswith(prefix) and target.endswith('.jsonl') and parse_rollout_name(os.path.basename(target)) is not None:
+                return Path(target)
+    return None
+
+
+def running_codex_pids(cwd: Optional[str] = None) -> Optional[List[int]]:
+    """
+    PIDs of running codex processes (matched on the first two argv entries).
+
+    Args:
+        cwd: Only processes running in this working directory
+
+    Returns:
+        List of PIDs, or None where /proc is unavailable
+    """
+    try:
+        pids = [name for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return None
+    found = []
+    for pid in pids:
+        if cwd is not None and process_cwd(int(pid)) != cwd:
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                argv = f.read().split(b'\0')
+        except OSError:
+            continue
+        if any(os.path.basename(arg) == b'codex' for arg in argv[:2]):
+            found.append(int(pid))
+    return found
+
+
+def assign_rollouts(pids: List[int], sessions_dir: Path) -> Dict[int, Path]:
+    """
+    Rollout file each of the given codex processes writes to, where it can be told.
+
+    A rollout the process has open settles it. Before codex has opened its
+    rollout (right after launch), the processes of each working directory
+    are paired, in start order, with the recent rollouts of that cwd created
+    after they started: each takes the earliest one no process has claimed.
+    A pairing is dropped as ambiguous when another process of the directory
+    could equally have written that rollout (both were running when it was
+    created) or could own it for lack of a rollout of its own.
+
+    Args:
+        pids: Codex processes to resolve (others running in the same
+            directories should be included, or their rollouts may be taken)
+        sessions_dir: ~/.codex/sessions
+
+    Returns:
+        {pid: rollout path} for the processes that could be resolved
+    """
+    assigned = {}
+    waiting = []
+    for pid in pids:
+        path = find_open_rollout(pid, sessions_dir)
+        if path is not None:
+            assigned[pid] = path
+            continue
+        cwd = process_cwd(pid)
+        start = process_start_time(pid)
+        if cwd and start is not None:
+            waiting.append((start, pid, cwd))
+    if not waiting:
+        return assigned
+    claimed = set(assigned.values())
+
+    # (creation time, path, cwd) of the rollouts created since the first start;
+    # file names carry whole seconds, so the walk stops a second past it
+    earliest = min(start for start, _, _ in waiting)
+    created = []
+    for path in itertools.islice(iter_rollouts_newest_first(sessions_dir), RECENT_ROLLOUTS):
+        meta = read_rollout_meta(path)
+        created_at = meta_start_time(meta)
+        if created_at is None:
+            continue
+        if created_at < earliest - 1:
+            break
+        if created_at >= earliest and path not in claimed:
+            created.append((created_at, str(path), path, meta.get('cwd')))
+    created.sort()
+
+    waiting.sort()
+    matches = []
+    for start, pid, cwd in waiting:
+        match = next(((created_at, path) for created_at, _, path, rollout_cwd in created
+                      if rollout_cwd == cwd and created_at >= start and path not in claimed), None)
+        if match is not None:
+            claimed.add(match[1])
+        matches.append(match)
+
+    for index, (start, pid, cwd) in enumerate(waiting):
+        if matches[index] is None:
+            continue
+        created_at, path = matches[index]
+        rivals = [i for i, (_, _, other_cwd) in enumerate(waiting) if other_cwd == cwd and i != index]
+        # A later process already running when this rollout was created could own it,
+        # and so could an earlier one whose own rollout is missing or came after our start
+        if any(waiting[i][0] <= created_at for i in rivals if i > index):
+            continue
+        if any(matches[i] is None or matches[i][0] >= start for i in rivals if i < index):
+            continue
+        assigned[pid] = path
+    return assigned
+
+
+def find_rollout_for_pid(pid: int, sessions_dir: Path) -> Optional[Path]:
+    """
+    Rollout file a codex process (or a codex child of it) writes to, None if unknown.
+
+    An open rollout settles it from /proc/<pid>/fd alone. Otherwise it is
+    resolved together with the other codex processes running in the same
+    directory (see assign_rollouts), which costs one pass over /proc and a
+    header read of the rollouts created since the earliest of them started.
+    """
+    path = find_open_rollout(pid, sessions_dir)
+    if path is not None:
+        return path
+    cwd = process_cwd(pid)
+    if not cwd:
+        return None
+    tree = set(iter_process_tree(pid))
+    others = [other for other in running_codex_pids(cwd) or [] if other not in tree]
+    return assign_rollouts(others + [pid], sessions_dir).get(pid)
+
+
+def live_rollouts(sessions_dir: Path) -> Optional[set]:
+    """
+    Rollout files that a running codex process has open.
+
+    Returns:
+        Set of rollout path strings, or None where /proc is unavailable
+    """
+    pids = running_codex_pids()
+    if pids is None:
+        return None
+    live = set()
+    for pid in pids:
+        path = find_open_rollout(pid, sessions_dir)
+        if path is not None:
+            live.add(str(path))
+    return live
+
+
+def turn_event(line: bytes) -> Optional[Tuple[str, Dict]]:
+    """
+    Classify a rollout line for the watch event stream.
+
+    Returns:
+        ('user', fields) for a prompt typed by the user, ('assistant', fields)
+        for an assistant message, or None for tool calls, environment_context
+        and other items
+    """
+    if b'response_item' not in line or b'"message"' not in line:
+        return None
+    try:
+        event = json_loads(line)
+    except Exception:
+        return None
+    payload = event.get('payload') or {}
+    if event.get('type') != 'response_item' or payload.get('type') != 'message':
+        return None
+    role = payload.get('role')
+    if role not in ('user', 'assistant'):
+        return None
+    text = '\n'.join(
+        item.get('text', '') or '' for item in payload.get('content') or []
+        if isinstance(item, dict) and item.get('type') in ('input_text', 'output_text')
+    )
+    if role == 'user':
+        if not text.strip() or '<environment_context>' in text or '<user_instructions>' in text:
+            return None
+        return 'user', {'timestamp': event.get('timestamp', ''), 'text': ' '.join(text.split())[:200]}
+    return 'assistant', {'timestamp': event.get('timestamp', '')}
+
+
+def open_pidfd(pid: int) -> Optional[int]:
+    """A descriptor that becomes readable when pid exits, where supported."""
+    try:
+        return os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return None
+
+
+def ensure_start(pid: int, log_path: str, timeout: float = 3.0) -> bool:
     """
     Verify that a codex task started successfully.
-    
+
+    Instead of sleeping for a fixed time, watches the log file and today's
+    session directory and returns as soon as the outcome is known: the
+    process is alive, has written log output and its rollout file exists,
+    or the process has exited. timeout bounds the wait.
+
     Checks:
-    1. Process is still alive after sleep
+    1. Process is still alive
     2. Log file exists and has content
     3. No startup errors in first lines
-    
+
     Args:
         pid: Process ID to check
         log_path: Path to log file
-    
+        timeout: Maximum seconds to wait for the task to become ready
+
     Returns:
         True if all checks pass, False otherwise
     """
     log_file = Path(log_path)
     start_time = datetime.now()
+    started = time.monotonic()
 
-    # Sleep 3 seconds to let process initialize
-    print(f"⌛ Waiting 3 seconds for initialization...", file=sys.stderr)
-    time.sleep(3)
+    helper = CodexHelper()
 
-    # Check if process is still alive
-    try:
-        os.kill(pid, 0)  # Signal 0 just checks if process exists
-        is_alive = True
-    except (ProcessLookupError, OSError):
-        is_alive = False
+    def watch_day_dirs(watcher: FileWatcher):
+        # Today's partition (local and UTC dates), or its deepest existing parent
+        for day in {datetime.now().date(), datetime.now(timezone.utc).date()}:
+            path = helper.sessions_dir / f"{day:%Y}" / f"{day:%m}" / f"{day:%d}"
+            while not path.exists() and path != helper.sessions_dir.parent:
+                path = path.parent
+            if path not in watched:
+                watched.add(path)
+                watcher.add(path)
+
+    print(f"⌛ Waiting up to {timeout:g} seconds for initialization...", file=sys.stderr)
+
+    pidfd = open_pidfd(pid)
+    ready_reason = None
+    ready_after = None
+    rollout = None
+    watched = set()
+    with FileWatcher() as watcher:
+        # Directory watches also report writes to the files inside them
+        watcher.add(log_file.parent)
+        settle_until = None
+        while True:
+            watch_day_dirs(watcher)
+            is_alive = process_alive(pid)
+            has_logs = log_file.exists() and log_file.stat().st_size > 0
+            if is_alive and rollout is None:
+                # Other codex processes may be starting alongside, so only the
+                # rollout the process has open or was paired with counts
+                rollout = find_rollout_for_pid(pid, helper.sessions_dir)
+            now = time.monotonic()
+
+            if ready_reason is None:
+                if not is_alive:
+                    ready_reason = "process exited"
+                elif has_logs and rollout:
+                    ready_reason = "log output and rollout file"
+                    settle_until = now + STARTUP_SETTLE_SECONDS
+                if ready_reason:
+                    ready_after = now - started
+
+            if not is_alive or (settle_until is not None and now >= settle_until):
+                break
+            if ready_reason is None and now - started >= timeout:
+                break
+
+            deadline = settle_until if settle_until is not None else started + timeout
+            remaining = deadline - now
+            if pidfd is None:
+                remaining = min(remaining, POLL_INTERVAL)
+            watcher.wait(min(remaining, WATCH_RECHECK_INTERVAL), (pidfd,) if pidfd is not None else ())
+    if pidfd is not None:
+        os.close(pidfd)
 
-    # Check log file
-    has_logs = log_file.exists() and log_file.stat().st_size > 0
     elapsed = datetime.now() - start_time
 
     # Read first lines of log
@@ -351,9 +2195,8 @@ def ensure_start(pid: int, log_path: str) -> bool:
         for line in log_lines
     )
 
-    # Get session ID
-    helper = CodexHelper()
-    session_id = helper.get_latest_session_id(1, show_time=False)
+    # Get session ID - never guessed from other rollouts: they may be another agent's
+    session_id = read_rollout_id(rollout) if rollout else None
 
     # Print results
     print()
@@ -367,6 +2210,10 @@ def ensure_start(pid: int, log_path: str) -> bool:
     print(f"Log File:        {log_path} ({log_file.stat().st_size if has_logs else 0} bytes)")
     print(f"Session ID:      {session_id or 'Not yet available'}")
     print(f"Start Time:      {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    if ready_reason:
+        print(f"Ready After:     {ready_after:.2f}s ({ready_reason})")
+    else:
+        print(f"Ready After:     not detected within {timeout:g}s")
     print(f"Elapsed:         {elapsed.total_seconds():.1f}s")
     print()
 
@@ -456,14 +2303,40 @@ Check if process finished:
 Get session ID:
   $ codex-helper get-id                # Latest
   $ codex-helper get-id --nth 2        # 2nd most recent
+  $ codex-helper get-id --pid $PID     # Session of a running codex process
 
 List sessions:
   $ codex-helper list
   $ codex-helper list --limit 50 --json
+  $ codex-helper list --json --cursor   # {cursor, sessions}; poll with:
+  $ codex-helper list --json --since-cursor $CURSOR    # only added/changed sessions
 
 Session details:
   $ codex-helper info 019a7174-1f4c-7482-8846-b2f7bd5d2d3e
 
+Find the session where something was discussed:
+  $ codex-helper search "rate limiter"
+  $ codex-helper search shell --tools
+
+React to sessions starting, talking and finishing instead of polling list:
+  $ codex-helper watch                           # NDJSON: created, user, assistant, idle, closed
+  $ codex-helper watch --idle 120
+
+Make list and info O(1) on huge finished sessions:
+  $ codex-helper compact                         # summaries for every finished session
+  $ codex-helper compact --min-mb 100            # only big rollouts
+  list and info then read the summary instead of the rollout until it
+  changes (a resumed session falls back to scanning until compacted again).
+
+Reclaim disk space from old rollouts (all commands keep reading them):
+  $ codex-helper archive --older-than 30d --dry-run
+  $ codex-helper archive --older-than 30d --format zst
+  Note: codex itself cannot resume an archived session; decompress it first
+  (gunzip / unzstd the .jsonl.gz / .jsonl.zst file) before `codex ... resume`.
+
+  Session ID lookups are cached in ~/.cache/codex-helper/index.sqlite
+  (safe to delete at any time).
+
 Continue conversation by session ID (always verify task is done first!):
   $ kill -0 $PREV_PID 2>/dev/null || codex exec "follow up message" --full-auto --cd /project resume $SESSION_ID
   
@@ -487,13 +2360,21 @@ View logs:
 
 # Start 3 concurrent agents
 codex exec "Build API" --full-auto --cd /project > /tmp/api.log 2>&1 &
-codex-helper ensure-start --pid $! --logs /tmp/api.log
+API_PID=$!
+codex-helper ensure-start --pid $API_PID --logs /tmp/api.log
 
 codex exec "Build UI" --full-auto --cd /project > /tmp/ui.log 2>&1 &
-codex-helper ensure-start --pid $! --logs /tmp/ui.log
+UI_PID=$!
+codex-helper ensure-start --pid $UI_PID --logs /tmp/ui.log
 
 codex exec "Write tests" --full-auto --cd /project > /tmp/tests.log 2>&1 &
-codex-helper ensure-start --pid $! --logs /tmp/tests.log
+TESTS_PID=$!
+codex-helper ensure-start --pid $TESTS_PID --logs /tmp/tests.log
+
+# Get their session IDs (by PID, so concurrent starts cannot be mixed up)
+API_SESSION=$(codex-helper get-id --pid $API_PID)
+UI_SESSION=$(codex-helper get-id --pid $UI_PID)
+TESTS_SESSION=$(codex-helper get-id --pid $TESTS_PID)
 
 # Monitor
 codex-helper list --limit 3
@@ -536,11 +2417,26 @@ wait $API_PID $UI_PID $TESTS_PID
 🛠️  codex-helper Commands
 
   get-id [--nth N]                             Get Nth most recent session ID
+  get-id --pid PID                             Get the session a running process writes to
   list [--limit N] [--json]                    List recent sessions
+    [--cursor | --since-cursor CURSOR]         Incremental polling: only sessions changed since CURSOR
   info <session-id>                            Get detailed session info
+  search <query> [--tools] [--raw]             Full-text search of messages (ranked, with snippets)
+  watch [--idle SEC]                           Stream session lifecycle events (NDJSON)
+  compact [SESSION_ID..] [--min-mb N]          Summarize finished sessions for O(1) list/info
+  archive --older-than AGE [--format gz|zst]   Compress old rollouts in place
+    [--dry-run]                                (keeps mtime and search index rows)
   ensure-start --pid <PID> --logs <PATH>       Verify task started successfully
+    [--timeout SEC]                            Returns as soon as ready (default: up to 3s)
+  bench-json [FILES] [--max-mb N]              Benchmark JSON backends (MB/s, s/GB)
   guide                                        Show this guide
 
+  get-id, list, search and compact accept --jobs N to scan session files in parallel
+  (default: number of CPUs).
+
+  Parsing uses orjson or pysimdjson when installed (stdlib json otherwise);
+  force one with CODEX_HELPER_JSON=orjson|simdjson|json.
+
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 ⚠️  LIMITATIONS & NOTES
@@ -582,6 +2478,17 @@ def main():
         default=1,
         help="Which session (1=most recent, 2=second, etc.)"
     )
+    getid_parser.add_argument(
+        "--pid",
+        type=int,
+        help="Session of a running codex process (ignores --nth)"
+    )
+    getid_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for scanning session files (default: {DEFAULT_JOBS})"
+    )
 
     # list command
     list_parser = subparsers.add_parser(
@@ -599,6 +2506,23 @@ def main():
         action="store_true",
         help="Output as JSON"
     )
+    list_parser.add_argument(
+        "--cursor",
+        action="store_true",
+        help="Also print a cursor for a later --since-cursor call (with --json: {cursor, sessions})"
+    )
+    list_parser.add_argument(
+        "--since-cursor",
+        type=str,
+        metavar="CURSOR",
+        help="Only sessions added or changed since CURSOR was printed (ignores --limit, prints the next cursor)"
+    )
+    list_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for scanning session files (default: {DEFAULT_JOBS})"
+    )
 
     # info command
     info_parser = subparsers.add_parser(
@@ -610,12 +2534,145 @@ def main():
         help="Session ID to look up"
     )
 
+    # search command
+    search_parser = subparsers.add_parser(
+        "search",
+        help="Full-text search over session messages"
+    )
+    search_parser.add_argument(
+        "query",
+        help="Words to search for (all must match)"
+    )
+    search_parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Maximum number of hits to show"
+    )
+    search_parser.add_argument(
+        "--tools",
+        action="store_true",
+        help="Also match tool (function call) names"
+    )
+    search_parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Pass the query to SQLite FTS5 as-is (OR, NEAR, \"phrases\", prefix*)"
+    )
+    search_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+    search_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for indexing changed rollout files (default: {DEFAULT_JOBS})"
+    )
+
+    # watch command
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Stream session lifecycle events (created, turns, idle, closed) as NDJSON"
+    )
+    watch_parser.add_argument(
+        "--idle",
+        type=float,
+        default=60.0,
+        help="Seconds without writes before an idle event (default: 60)"
+    )
+
+    # compact command
+    compact_parser = subparsers.add_parser(
+        "compact",
+        help="Write summaries of finished sessions so list and info skip their rollouts"
+    )
+    compact_parser.add_argument(
+        "session_ids",
+        nargs="*",
+        metavar="SESSION_ID",
+        help="Sessions to compact (default: all finished sessions)"
+    )
+    compact_parser.add_argument(
+        "--min-mb",
+        type=float,
+        default=0.0,
+        help="Skip rollouts smaller than this many MB"
+    )
+    compact_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild summaries that are still current"
+    )
+    compact_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+    compact_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Parallel workers for summarizing rollouts (default: {DEFAULT_JOBS})"
+    )
+
+    # archive command
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="Compress rollouts not modified for a while (.jsonl.gz / .jsonl.zst)"
+    )
+    archive_parser.add_argument(
+        "--older-than",
+        type=str,
+        required=True,
+        help="Archive rollouts last modified before this (e.g. 30d, 2w, 2025-11-01)"
+    )
+    archive_parser.add_argument(
+        "--format",
+        choices=["gz", "zst"],
+        default="gz",
+        help="Compression format (zst needs Python 3.14+ or the zstandard package; default: gz)"
+    )
+    archive_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only list the rollouts that would be compressed"
+    )
+    archive_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+
     # guide command
     guide_parser = subparsers.add_parser(
         "guide",
         help="Show comprehensive guide for AI agents"
     )
 
+    # bench-json command
+    bench_parser = subparsers.add_parser(
+        "bench-json",
+        help="Benchmark JSON decode throughput of installed backends"
+    )
+    bench_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Files to sample (default: largest rollout files)"
+    )
+    bench_parser.add_argument(
+        "--max-mb",
+        type=int,
+        default=256,
+        help="Maximum megabytes to sample (default: 256)"
+    )
+    bench_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output as JSON"
+    )
+
     # ensure-start command
     ensure_parser = subparsers.add_parser(
         "ensure-start",
@@ -633,6 +2690,12 @@ def main():
         required=True,
         help="Path to the log file"
     )
+    ensure_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=3.0,
+        help="Maximum seconds to wait for the task to become ready (default: 3)"
+    )
 
     args = parser.parse_args()
 
@@ -640,11 +2703,16 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    helper = CodexHelper()
+    helper = CodexHelper(jobs=max(1, getattr(args, 'jobs', DEFAULT_JOBS)))
 
     try:
         if args.command == "get-id":
-            session_id = helper.get_latest_session_id(args.nth, show_time=True)
+            if args.pid is not None:
+                session_id = helper.get_session_id_for_pid(args.pid)
+                if not session_id:
+                    print(f"ERROR: No session found for PID {args.pid}", file=sys.stderr)
+            else:
+                session_id = helper.get_latest_session_id(args.nth, show_time=True)
             if session_id:
                 print(session_id)
                 sys.exit(0)
@@ -652,13 +2720,29 @@ def main():
                 sys.exit(1)
 
         elif args.command == "list":
-            sessions = helper.list_sessions(args.limit)
-            if not sessions:
-                print("No sessions found", file=sys.stderr)
-                sys.exit(1)
+            cursor = None
+            if args.since_cursor:
+                try:
+                    since_mtime_ns = parse_list_cursor(args.since_cursor)
+                except ValueError as e:
+                    parser.error(str(e))
+                cursor = new_list_cursor()
+                sessions = helper.list_changed_sessions(since_mtime_ns)
+                if sessions is None:
+                    sys.exit(1)
+            else:
+                if args.cursor:
+                    cursor = new_list_cursor()
+                sessions = helper.list_sessions(args.limit)
+                if not sessions:
+                    print("No sessions found", file=sys.stderr)
+                    sys.exit(1)
 
             if args.json:
-                print(json.dumps(sessions, indent=2))
+                if cursor is not None:
+                    print(json_dumps({'cursor': cursor, 'sessions': sessions}, indent=True))
+                else:
+                    print(json_dumps(sessions, indent=True))
             else:
                 print(f"\n{'SESSION ID':<37} {'TIME':<10} {'SANDBOX':<12} {'PROMPT':<50}")
                 print("─" * 115)
@@ -682,6 +2766,26 @@ def main():
 
                     print(f"{session_id:<37} {timestamp:<10} {sandbox:<12} {prompt:<50}")
                 print()
+                if cursor is not None:
+                    print(f"Cursor: {cursor}")
+                    print()
+
+        elif args.command == "search":
+            hits = helper.search_sessions(args.query, args.limit, include_tools=args.tools, raw=args.raw)
+            if hits is None:
+                sys.exit(1)
+            if not hits:
+                print("No matches found", file=sys.stderr)
+                sys.exit(1)
+
+            if args.json:
+                print(json_dumps(hits, indent=True))
+            else:
+                for hit in hits:
+                    print(f"{hit['session_id']}  {hit['timestamp'] or 'N/A'}  {hit['role']}")
+                    print(f"    {hit['snippet']}")
+                print()
+            sys.exit(0)
 
         elif args.command == "info":
             info = helper.get_session_info(args.session_id)
@@ -698,18 +2802,90 @@ def main():
                 print(f"Events:         {info.get('event_count', 0)}")
                 print(f"Modified:       {info.get('modified_at', 'N/A')}")
                 print(f"First Prompt:   {info.get('first_prompt', 'N/A')}")
+                if 'last_prompt' in info:
+                    tools = ', '.join(f"{name} x{count}" for name, count in
+                                      sorted(info['tool_calls'].items(), key=lambda item: -item[1]))
+                    print(f"Last Prompt:    {info['last_prompt']}")
+                    print(f"Tool Calls:     {tools or 'none'}")
+                    if info['token_usage']:
+                        print(f"Tokens:         {info['token_usage'].get('total_tokens', 'N/A')}")
                 print(f"File:           {info.get('file_path', 'N/A')}")
                 print()
                 sys.exit(0)
             else:
                 sys.exit(1)
 
+        elif args.command == "watch":
+            sys.exit(0 if helper.watch_sessions(idle_seconds=args.idle) else 1)
+
+        elif args.command == "compact":
+            compacted = helper.compact_sessions(args.session_ids or None, min_bytes=int(args.min_mb * 1e6),
+                                                force=args.force)
+            if compacted is None:
+                sys.exit(1)
+            if args.json:
+                print(json_dumps(compacted, indent=True))
+                sys.exit(0)
+            if not compacted:
+                print("No sessions to compact", file=sys.stderr)
+                sys.exit(0)
+            for entry in compacted:
+                print(f"{entry['session_id']}  {entry['size'] / 1e6:>9.2f} MB  {entry['event_count']:>8} events  {entry['tool_calls']:>6} tool calls")
+            print(f"\nCompacted {len(compacted)} session(s), {sum(entry['size'] for entry in compacted) / 1e6:.2f} MB of rollouts")
+            sys.exit(0)
+
+        elif args.command == "archive":
+            archived = helper.archive_sessions(args.older_than, fmt=args.format, dry_run=args.dry_run)
+            if archived is None:
+                sys.exit(1)
+            if args.json:
+                print(json_dumps(archived, indent=True))
+                sys.exit(0)
+            if not archived:
+                print("No rollouts to archive", file=sys.stderr)
+                sys.exit(0)
+            for entry in archived:
+                if args.dry_run:
+                    print(f"{entry['session_id']}  {entry['size'] / 1e6:>9.2f} MB")
+                else:
+                    ratio = entry['compressed_size'] / entry['size'] if entry['size'] else 1.0
+                    print(f"{entry['session_id']}  {entry['size'] / 1e6:>9.2f} MB -> {entry['compressed_size'] / 1e6:>8.2f} MB  ({ratio:.0%})")
+            before = sum(entry['size'] for entry in archived)
+            if args.dry_run:
+                print(f"\n{len(archived)} rollout(s), {before / 1e6:.2f} MB would be compressed")
+            else:
+                after = sum(entry['compressed_size'] for entry in archived)
+                print(f"\nArchived {len(archived)} rollout(s): {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+            sys.exit(0)
+
         elif args.command == "guide":
             print_guide()
             sys.exit(0)
 
+        elif args.command == "bench-json":
+            if args.files:
+                paths = [Path(f) for f in args.files]
+            else:
+                paths = sorted(list(helper.sessions_dir.glob("*/*/*/*.jsonl")), key=lambda p: p.stat().st_size, reverse=True)
+            results = benchmark_json(paths, args.max_mb)
+            if not results:
+                print("No transcript data to benchmark", file=sys.stderr)
+                sys.exit(1)
+
+            if args.json:
+                print(json_dumps(results, indent=True))
+            else:
+                sample = results[0]
+                print(f"\nSample: {sample['bytes'] / 1e6:.1f} MB, {sample['lines']} lines (active backend: {JSON_BACKEND})")
+                print(f"\n{'BACKEND':<12} {'MB/s':>10} {'s/GB':>10} {'ERRORS':>8}")
+                print("─" * 44)
+                for result in results:
+                    print(f"{result['backend']:<12} {result['mb_per_s']:>10.1f} {result['seconds_per_gb']:>10.2f} {result['errors']:>8}")
+                print()
+            sys.exit(0)
+
         elif args.command == "ensure-start":
-            result = ensure_start(args.pid, args.logs)
+            result = ensure_start(args.pid, args.logs, timeout=args.timeout)
             sys.exit(0 if result else 1)
 
     except KeyboardInterrupt: